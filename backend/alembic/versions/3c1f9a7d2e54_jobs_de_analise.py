@@ -0,0 +1,64 @@
+"""jobs de analise
+
+Revision ID: 3c1f9a7d2e54
+Revises: 8183188808f9
+Create Date: 2026-10-18 15:02:11.418305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c1f9a7d2e54'
+down_revision: Union[str, Sequence[str], None] = '8183188808f9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('jobs_analise',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('usuario_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('processados', sa.Integer(), nullable=False),
+    sa.Column('falhas', sa.Integer(), nullable=False),
+    sa.Column('tentativas', sa.Integer(), nullable=False),
+    sa.Column('erro', sa.Text(), nullable=True),
+    sa.Column('disponivel_em', sa.DateTime(), nullable=True),
+    sa.Column('worker', sa.String(), nullable=True),
+    sa.Column('heartbeat_em', sa.DateTime(), nullable=True),
+    sa.Column('criado_em', sa.DateTime(), nullable=True),
+    sa.Column('iniciado_em', sa.DateTime(), nullable=True),
+    sa.Column('concluido_em', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['usuario_id'], ['usuarios.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_jobs_analise_status'), 'jobs_analise', ['status'], unique=False)
+    op.create_index(op.f('ix_jobs_analise_usuario_id'), 'jobs_analise', ['usuario_id'], unique=False)
+    op.create_table('jobs_analise_itens',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('job_id', sa.Integer(), nullable=False),
+    sa.Column('indice', sa.Integer(), nullable=False),
+    sa.Column('texto', sa.Text(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('analysis_id', sa.Integer(), nullable=True),
+    sa.Column('erro', sa.String(), nullable=True),
+    sa.ForeignKeyConstraint(['analysis_id'], ['analyses.id'], ),
+    sa.ForeignKeyConstraint(['job_id'], ['jobs_analise.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_jobs_analise_itens_job_id'), 'jobs_analise_itens', ['job_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_jobs_analise_itens_job_id'), table_name='jobs_analise_itens')
+    op.drop_table('jobs_analise_itens')
+    op.drop_index(op.f('ix_jobs_analise_usuario_id'), table_name='jobs_analise')
+    op.drop_index(op.f('ix_jobs_analise_status'), table_name='jobs_analise')
+    op.drop_table('jobs_analise')
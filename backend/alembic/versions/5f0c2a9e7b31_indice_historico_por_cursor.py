@@ -0,0 +1,28 @@
+"""indice do historico por cursor
+
+Revision ID: 5f0c2a9e7b31
+Revises: e7a41c0b5f28
+Create Date: 2026-10-18 18:12:09.481553
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f0c2a9e7b31'
+down_revision: Union[str, Sequence[str], None] = 'e7a41c0b5f28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_analyses_usuario_criado_em_id', 'analyses', ['usuario_id', 'criado_em', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_analyses_usuario_criado_em_id', table_name='analyses')
@@ -0,0 +1,36 @@
+"""cache de resultados de nlp
+
+Revision ID: 8183188808f9
+Revises: 0699e5323ba7
+Create Date: 2026-10-18 13:36:25.236984
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8183188808f9'
+down_revision: Union[str, Sequence[str], None] = '0699e5323ba7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('cache_resultados',
+    sa.Column('chave', sa.String(length=64), nullable=False),
+    sa.Column('versao', sa.String(length=64), nullable=False),
+    sa.Column('resultado', sa.JSON(), nullable=False),
+    sa.Column('criado_em', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('chave')
+    )
+    op.create_index(op.f('ix_cache_resultados_versao'), 'cache_resultados', ['versao'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_cache_resultados_versao'), table_name='cache_resultados')
+    op.drop_table('cache_resultados')
@@ -0,0 +1,65 @@
+"""estatisticas por usuario
+
+Revision ID: 9d3b6e1f4a27
+Revises: 5f0c2a9e7b31
+Create Date: 2026-10-18 19:03:51.226710
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d3b6e1f4a27'
+down_revision: Union[str, Sequence[str], None] = '5f0c2a9e7b31'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('estatisticas_usuario',
+    sa.Column('usuario_id', sa.Integer(), nullable=False),
+    sa.Column('total_analises', sa.Integer(), nullable=False),
+    sa.Column('total_palavras', sa.Integer(), nullable=False),
+    sa.Column('total_caracteres', sa.Integer(), nullable=False),
+    sa.Column('total_frases', sa.Integer(), nullable=False),
+    sa.Column('soma_pontuacao_sentimento', sa.Float(), nullable=False),
+    sa.Column('analises_com_pontuacao', sa.Integer(), nullable=False),
+    sa.Column('primeira_analise_em', sa.DateTime(), nullable=True),
+    sa.Column('ultima_analise_em', sa.DateTime(), nullable=True),
+    sa.Column('atualizado_em', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['usuario_id'], ['usuarios.id'], ),
+    sa.PrimaryKeyConstraint('usuario_id')
+    )
+    op.create_table('estatisticas_usuario_contagens',
+    sa.Column('usuario_id', sa.Integer(), nullable=False),
+    sa.Column('dimensao', sa.String(length=20), nullable=False),
+    sa.Column('valor', sa.String(), nullable=False),
+    sa.Column('quantidade', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['usuario_id'], ['usuarios.id'], ),
+    sa.PrimaryKeyConstraint('usuario_id', 'dimensao', 'valor')
+    )
+
+    #Preenche os agregados a partir das análises existentes
+    op.execute(
+        "INSERT INTO estatisticas_usuario (usuario_id, total_analises, total_palavras, total_caracteres, total_frases, "
+        "soma_pontuacao_sentimento, analises_com_pontuacao, primeira_analise_em, ultima_analise_em, atualizado_em) "
+        "SELECT usuario_id, COUNT(*), COALESCE(SUM(cont_palavras), 0), COALESCE(SUM(cont_caracteres), 0), "
+        "COALESCE(SUM(cont_frases), 0), COALESCE(SUM(pontuacao_sentimento), 0), COUNT(pontuacao_sentimento), "
+        "MIN(criado_em), MAX(criado_em), CURRENT_TIMESTAMP FROM analyses GROUP BY usuario_id"
+    )
+    for dimensao, coluna in (('sentimento', 'sentimento'), ('legibilidade', 'lvl_legibilidade')):
+        op.execute(
+            "INSERT INTO estatisticas_usuario_contagens (usuario_id, dimensao, valor, quantidade) "
+            f"SELECT usuario_id, '{dimensao}', {coluna}, COUNT(*) FROM analyses "
+            f"WHERE {coluna} IS NOT NULL GROUP BY usuario_id, {coluna}"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('estatisticas_usuario_contagens')
+    op.drop_table('estatisticas_usuario')
@@ -0,0 +1,117 @@
+"""textos deduplicados e comprimidos
+
+Revision ID: a3e8c6d1f925
+Revises: 9d3b6e1f4a27
+Create Date: 2026-10-18 20:14:07.530118
+
+"""
+import datetime
+import hashlib
+import zlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3e8c6d1f925'
+down_revision: Union[str, Sequence[str], None] = '9d3b6e1f4a27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+#Análises convertidas por vez
+LOTE = 1000
+TAMANHO_TRECHO = 160
+
+
+#Mesmo formato de app.core.compressao (cópia local: a migração não depende do código da aplicação)
+def _comprimir(texto: str) -> bytes:
+    dados = texto.encode("utf-8")
+    comprimido = zlib.compress(dados, 6)
+    return b"z" + comprimido if len(comprimido) < len(dados) else b"r" + dados
+
+
+def _descomprimir(conteudo: bytes) -> str:
+    conteudo = bytes(conteudo)
+    if conteudo[:1] == b"z":
+        return zlib.decompress(conteudo[1:]).decode("utf-8")
+    return conteudo[1:].decode("utf-8")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    textos = op.create_table('textos',
+    sa.Column('hash', sa.String(length=64), nullable=False),
+    sa.Column('conteudo', sa.LargeBinary(), nullable=False),
+    sa.Column('trecho', sa.String(), nullable=False),
+    sa.Column('tamanho', sa.Integer(), nullable=False),
+    sa.Column('tamanho_armazenado', sa.Integer(), nullable=False),
+    sa.Column('criado_em', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('hash')
+    )
+    op.add_column('analyses', sa.Column('texto_hash', sa.String(length=64), nullable=True))
+
+    #Move os textos existentes para "textos" (uma linha por conteúdo) em lotes de análises
+    conexao = op.get_bind()
+    agora = datetime.datetime.utcnow()
+    vistos = set()
+    ultimo_id = 0
+    while True:
+        linhas = conexao.execute(
+            sa.text("SELECT id, texto_original FROM analyses WHERE id > :ultimo ORDER BY id LIMIT :lote"),
+            {"ultimo": ultimo_id, "lote": LOTE},
+        ).all()
+        if not linhas:
+            break
+
+        novos, referencias = [], []
+        for id_analise, texto in linhas:
+            texto = texto or ""
+            hash_texto = hashlib.sha256(texto.encode("utf-8")).hexdigest()
+            if hash_texto not in vistos:
+                vistos.add(hash_texto)
+                conteudo = _comprimir(texto)
+                novos.append({
+                    "hash": hash_texto, "conteudo": conteudo, "trecho": texto[:TAMANHO_TRECHO],
+                    "tamanho": len(texto.encode("utf-8")), "tamanho_armazenado": len(conteudo), "criado_em": agora,
+                })
+            referencias.append({"id_analise": id_analise, "hash_texto": hash_texto})
+
+        if novos:
+            op.bulk_insert(textos, novos)
+        conexao.execute(sa.text("UPDATE analyses SET texto_hash = :hash_texto WHERE id = :id_analise"), referencias)
+        ultimo_id = linhas[-1][0]
+
+    with op.batch_alter_table('analyses') as batch_op:
+        batch_op.alter_column('texto_hash', existing_type=sa.String(length=64), nullable=False)
+        batch_op.create_index(batch_op.f('ix_analyses_texto_hash'), ['texto_hash'], unique=False)
+        batch_op.create_foreign_key('analyses_texto_hash_fkey', 'textos', ['texto_hash'], ['hash'])
+        batch_op.drop_column('texto_original')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('analyses', sa.Column('texto_original', sa.Text(), nullable=True))
+
+    #Devolve o texto descomprimido a cada análise, um lote de textos por vez
+    conexao = op.get_bind()
+    ultimo_hash = ""
+    while True:
+        linhas = conexao.execute(
+            sa.text("SELECT hash, conteudo FROM textos WHERE hash > :ultimo ORDER BY hash LIMIT :lote"),
+            {"ultimo": ultimo_hash, "lote": LOTE},
+        ).all()
+        if not linhas:
+            break
+        conexao.execute(
+            sa.text("UPDATE analyses SET texto_original = :texto WHERE texto_hash = :hash_texto"),
+            [{"texto": _descomprimir(conteudo), "hash_texto": hash_texto} for hash_texto, conteudo in linhas],
+        )
+        ultimo_hash = linhas[-1][0]
+
+    with op.batch_alter_table('analyses') as batch_op:
+        batch_op.drop_constraint('analyses_texto_hash_fkey', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_analyses_texto_hash'))
+        batch_op.drop_column('texto_hash')
+    op.drop_table('textos')
@@ -0,0 +1,136 @@
+"""busca por usuario
+
+Revision ID: a6d3f8b21c47
+Revises: e93c0b7a5d14
+Create Date: 2026-10-18 15:40:12.506183
+
+"""
+import zlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6d3f8b21c47'
+down_revision: Union[str, Sequence[str], None] = 'e93c0b7a5d14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+#Textos indexados por vez
+LOTE = 1000
+CONFIGURACAO = "portuguese"
+#Mesma faixa de rowid por usuário de app.services.busca_service
+BITS_SEQUENCIA = 32
+
+
+#Mesmo formato de app.core.compressao (cópia local: a migração não depende do código da aplicação)
+def _descomprimir(conteudo: bytes) -> str:
+    conteudo = bytes(conteudo)
+    if conteudo[:1] == b"z":
+        return zlib.decompress(conteudo[1:]).decode("utf-8")
+    return conteudo[1:].decode("utf-8")
+
+
+#Conteúdo dos textos, em lotes de hashes
+def _conteudos(conexao, hashes: list) -> dict:
+    consulta = sa.text("SELECT hash, conteudo FROM textos WHERE hash IN :hashes").bindparams(sa.bindparam("hashes", expanding=True))
+    conteudos = {}
+    for inicio in range(0, len(hashes), LOTE):
+        conteudos.update(
+            (hash_texto, _descomprimir(conteudo))
+            for hash_texto, conteudo in conexao.execute(consulta, {"hashes": hashes[inicio:inicio + LOTE]})
+        )
+    return conteudos
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    conexao = op.get_bind()
+    postgresql = conexao.dialect.name == "postgresql"
+    op.execute("DROP TABLE IF EXISTS textos_busca")
+    if postgresql:
+        op.execute(
+            "CREATE TABLE textos_busca ("
+            "id BIGINT GENERATED BY DEFAULT AS IDENTITY, "
+            "usuario_id INTEGER NOT NULL REFERENCES usuarios (id), "
+            "hash VARCHAR(64) NOT NULL REFERENCES textos (hash) ON DELETE CASCADE, "
+            "busca TSVECTOR NOT NULL, PRIMARY KEY (usuario_id, hash))"
+        )
+        inserir = sa.text(
+            "INSERT INTO textos_busca (usuario_id, hash, busca) "
+            "VALUES (:usuario_id, :hash, to_tsvector(CAST(:configuracao AS regconfig), :conteudo))"
+        )
+    else:
+        op.execute(
+            "CREATE VIRTUAL TABLE textos_busca USING fts5("
+            "hash, conteudo, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        inserir = sa.text("INSERT INTO textos_busca (rowid, hash, conteudo) VALUES (:id, :hash, :conteudo)")
+
+    #Indexa os textos distintos de cada usuário na ordem da primeira análise com o texto
+    usuarios = conexao.execute(sa.text("SELECT DISTINCT usuario_id FROM analyses ORDER BY usuario_id")).scalars().all()
+    for usuario_id in usuarios:
+        hashes = conexao.execute(
+            sa.text("SELECT texto_hash FROM analyses WHERE usuario_id = :usuario_id GROUP BY texto_hash ORDER BY MIN(id)"),
+            {"usuario_id": usuario_id},
+        ).scalars().all()
+        for inicio in range(0, len(hashes), LOTE):
+            lote = hashes[inicio:inicio + LOTE]
+            conteudos = _conteudos(conexao, lote)
+            conexao.execute(inserir, [
+                {
+                    "id": (usuario_id << BITS_SEQUENCIA) + inicio + posicao, "usuario_id": usuario_id,
+                    "hash": hash_texto, "conteudo": conteudos[hash_texto], "configuracao": CONFIGURACAO,
+                }
+                for posicao, hash_texto in enumerate(lote)
+            ])
+
+    #No PostgreSQL o índice GIN é criado depois da carga, que fica mais rápida
+    if postgresql:
+        op.execute("CREATE INDEX ix_textos_busca_busca ON textos_busca USING GIN (busca)")
+
+
+#Mesmo rowid da revisão anterior (d48a1f6c3b90): os primeiros 64 bits do SHA-256
+def _id_indice(hash_texto: str) -> int:
+    return int.from_bytes(bytes.fromhex(hash_texto[:16]), "big", signed=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    conexao = op.get_bind()
+    postgresql = conexao.dialect.name == "postgresql"
+    op.execute("DROP TABLE IF EXISTS textos_busca")
+    if postgresql:
+        op.execute(
+            "CREATE TABLE textos_busca ("
+            "hash VARCHAR(64) PRIMARY KEY REFERENCES textos (hash) ON DELETE CASCADE, busca TSVECTOR NOT NULL)"
+        )
+        inserir = sa.text(
+            "INSERT INTO textos_busca (hash, busca) VALUES (:hash, to_tsvector(CAST(:configuracao AS regconfig), :conteudo))"
+        )
+    else:
+        op.execute(
+            "CREATE VIRTUAL TABLE textos_busca USING fts5("
+            "hash UNINDEXED, conteudo, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        inserir = sa.text("INSERT INTO textos_busca (rowid, hash, conteudo) VALUES (:id, :hash, :conteudo)")
+
+    #Volta a um registro por texto distinto
+    ultimo_hash = ""
+    while True:
+        linhas = conexao.execute(
+            sa.text("SELECT hash, conteudo FROM textos WHERE hash > :ultimo ORDER BY hash LIMIT :lote"),
+            {"ultimo": ultimo_hash, "lote": LOTE},
+        ).all()
+        if not linhas:
+            break
+        conexao.execute(inserir, [
+            {"id": _id_indice(hash_texto), "hash": hash_texto, "conteudo": _descomprimir(conteudo), "configuracao": CONFIGURACAO}
+            for hash_texto, conteudo in linhas
+        ])
+        ultimo_hash = linhas[-1][0]
+
+    if postgresql:
+        op.execute("CREATE INDEX ix_textos_busca_busca ON textos_busca USING GIN (busca)")
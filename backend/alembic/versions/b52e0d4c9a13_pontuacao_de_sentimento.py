@@ -0,0 +1,28 @@
+"""pontuacao de sentimento
+
+Revision ID: b52e0d4c9a13
+Revises: 3c1f9a7d2e54
+Create Date: 2026-10-18 16:20:47.903112
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b52e0d4c9a13'
+down_revision: Union[str, Sequence[str], None] = '3c1f9a7d2e54'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('analyses', sa.Column('pontuacao_sentimento', sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('analyses', 'pontuacao_sentimento')
@@ -0,0 +1,62 @@
+"""registro de auditoria
+
+Revision ID: c71f4b8e2d06
+Revises: a3e8c6d1f925
+Create Date: 2026-10-18 20:52:19.004381
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c71f4b8e2d06'
+down_revision: Union[str, Sequence[str], None] = 'a3e8c6d1f925'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('eventos_auditoria',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('usuario_id', sa.Integer(), nullable=False),
+    sa.Column('acao', sa.String(length=20), nullable=False),
+    sa.Column('analysis_id', sa.Integer(), nullable=True),
+    sa.Column('origem', sa.String(length=20), nullable=False),
+    sa.Column('duracao_ms', sa.Float(), nullable=True),
+    sa.Column('criado_em', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_eventos_auditoria_usuario_criado_em', 'eventos_auditoria', ['usuario_id', 'criado_em'], unique=False)
+
+    #O histórico antigo só registrava criações; as linhas viram eventos "criar"
+    op.execute(
+        "INSERT INTO eventos_auditoria (usuario_id, acao, analysis_id, origem, criado_em) "
+        "SELECT usuario_id, 'criar', analysis_id, 'api', COALESCE(consultado_em, CURRENT_TIMESTAMP) "
+        "FROM analyses_historico WHERE usuario_id IS NOT NULL"
+    )
+    op.drop_table('analyses_historico')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_table('analyses_historico',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('analysis_id', sa.Integer(), nullable=True),
+    sa.Column('usuario_id', sa.Integer(), nullable=True),
+    sa.Column('consultado_em', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['analysis_id'], ['analyses.id'], ),
+    sa.ForeignKeyConstraint(['usuario_id'], ['usuarios.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    #Só as criações de análises que ainda existem (a tabela antiga tem chave estrangeira)
+    op.execute(
+        "INSERT INTO analyses_historico (analysis_id, usuario_id, consultado_em) "
+        "SELECT e.analysis_id, e.usuario_id, e.criado_em FROM eventos_auditoria e "
+        "WHERE e.acao = 'criar' AND e.analysis_id IN (SELECT id FROM analyses)"
+    )
+    op.drop_index('ix_eventos_auditoria_usuario_criado_em', table_name='eventos_auditoria')
+    op.drop_table('eventos_auditoria')
@@ -0,0 +1,80 @@
+"""busca textual
+
+Revision ID: d48a1f6c3b90
+Revises: f2b9d4a7c613
+Create Date: 2026-10-18 23:12:05.418337
+
+"""
+import zlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd48a1f6c3b90'
+down_revision: Union[str, Sequence[str], None] = 'f2b9d4a7c613'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+#Textos indexados por vez
+LOTE = 1000
+CONFIGURACAO = "portuguese"
+
+
+#Mesmo formato de app.core.compressao (cópia local: a migração não depende do código da aplicação)
+def _descomprimir(conteudo: bytes) -> str:
+    conteudo = bytes(conteudo)
+    if conteudo[:1] == b"z":
+        return zlib.decompress(conteudo[1:]).decode("utf-8")
+    return conteudo[1:].decode("utf-8")
+
+
+#Mesmo rowid de app.services.busca_service.id_indice
+def _id_indice(hash_texto: str) -> int:
+    return int.from_bytes(bytes.fromhex(hash_texto[:16]), "big", signed=True)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    conexao = op.get_bind()
+    postgresql = conexao.dialect.name == "postgresql"
+    if postgresql:
+        op.execute(
+            "CREATE TABLE textos_busca ("
+            "hash VARCHAR(64) PRIMARY KEY REFERENCES textos (hash) ON DELETE CASCADE, busca TSVECTOR NOT NULL)"
+        )
+        inserir = sa.text(
+            "INSERT INTO textos_busca (hash, busca) VALUES (:hash, to_tsvector(CAST(:configuracao AS regconfig), :conteudo))"
+        )
+    else:
+        op.execute(
+            "CREATE VIRTUAL TABLE textos_busca USING fts5("
+            "hash UNINDEXED, conteudo, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        inserir = sa.text("INSERT INTO textos_busca (rowid, hash, conteudo) VALUES (:id, :hash, :conteudo)")
+
+    #Indexa os textos existentes em lotes (descomprimidos aqui)
+    ultimo_hash = ""
+    while True:
+        linhas = conexao.execute(
+            sa.text("SELECT hash, conteudo FROM textos WHERE hash > :ultimo ORDER BY hash LIMIT :lote"),
+            {"ultimo": ultimo_hash, "lote": LOTE},
+        ).all()
+        if not linhas:
+            break
+        conexao.execute(inserir, [
+            {"id": _id_indice(hash_texto), "hash": hash_texto, "conteudo": _descomprimir(conteudo), "configuracao": CONFIGURACAO}
+            for hash_texto, conteudo in linhas
+        ])
+        ultimo_hash = linhas[-1][0]
+
+    #No PostgreSQL o índice GIN é criado depois da carga, que fica mais rápida
+    if postgresql:
+        op.execute("CREATE INDEX ix_textos_busca_busca ON textos_busca USING GIN (busca)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TABLE IF EXISTS textos_busca")
@@ -0,0 +1,75 @@
+"""revogacao de tokens por jti
+
+Revision ID: e7a41c0b5f28
+Revises: b52e0d4c9a13
+Create Date: 2026-10-18 17:05:32.114870
+
+"""
+import base64
+import datetime
+import hashlib
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a41c0b5f28'
+down_revision: Union[str, Sequence[str], None] = 'b52e0d4c9a13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+#Claims do JWT sem verificar a assinatura (os tokens já foram validados no logout)
+def _claims(token: str) -> dict:
+    try:
+        carga = token.split(".")[1]
+        return json.loads(base64.urlsafe_b64decode(carga + "=" * (-len(carga) % 4)))
+    except Exception:
+        return {}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    conexao = op.get_bind()
+    tokens = []
+    if sa.inspect(conexao).has_table('tokens_revogados'):
+        tokens = [linha[0] for linha in conexao.execute(sa.text("SELECT token FROM tokens_revogados")) if linha[0]]
+        op.drop_table('tokens_revogados')
+
+    tabela = op.create_table('tokens_revogados',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('jti', sa.String(length=64), nullable=False),
+    sa.Column('expira_em', sa.DateTime(), nullable=False),
+    sa.Column('revogado_em', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_tokens_revogados_jti'), 'tokens_revogados', ['jti'], unique=True)
+    op.create_index(op.f('ix_tokens_revogados_expira_em'), 'tokens_revogados', ['expira_em'], unique=False)
+
+    #Mantém apenas as revogações de tokens que ainda não expiraram
+    agora = datetime.datetime.utcnow()
+    linhas = {}
+    for token in tokens:
+        claims = _claims(token)
+        expira_em = datetime.datetime.utcfromtimestamp(claims.get("exp", 0))
+        if expira_em > agora:
+            jti = claims.get("jti") or hashlib.sha256(token.encode("utf-8")).hexdigest()
+            linhas[jti] = {"jti": jti, "expira_em": expira_em, "revogado_em": agora}
+    if linhas:
+        op.bulk_insert(tabela, list(linhas.values()))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_tokens_revogados_expira_em'), table_name='tokens_revogados')
+    op.drop_index(op.f('ix_tokens_revogados_jti'), table_name='tokens_revogados')
+    op.drop_table('tokens_revogados')
+    op.create_table('tokens_revogados',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('token', sa.String(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_tokens_revogados_token'), 'tokens_revogados', ['token'], unique=True)
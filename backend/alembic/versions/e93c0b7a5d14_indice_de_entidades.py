@@ -0,0 +1,97 @@
+"""indice de entidades
+
+Revision ID: e93c0b7a5d14
+Revises: d48a1f6c3b90
+Create Date: 2026-10-19 00:41:27.903164
+
+"""
+import datetime
+import json
+import unicodedata
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e93c0b7a5d14'
+down_revision: Union[str, Sequence[str], None] = 'd48a1f6c3b90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+#Análises indexadas por vez
+LOTE = 1000
+TAMANHO_CHAVE = 200
+
+
+#Mesma normalização de app.services.entidades_service (cópia local: a migração não depende do código da aplicação)
+def _normalizar(texto: str) -> str:
+    texto = ''.join(c for c in unicodedata.normalize('NFD', texto.lower()) if unicodedata.category(c) != 'Mn')
+    return " ".join(texto.split())[:TAMANHO_CHAVE]
+
+
+def _linhas(analysis_id, usuario_id, criado_em, entidades) -> list:
+    if isinstance(entidades, str):
+        entidades = json.loads(entidades)
+    linhas = {}
+    for entidade in entidades if isinstance(entidades, list) else []:
+        texto = " ".join(str(entidade.get("texto") or "").split())
+        tipo = entidade.get("tipo")
+        chave = _normalizar(texto)
+        if not tipo or not chave:
+            continue
+        if (tipo, chave) in linhas:
+            linhas[(tipo, chave)]["mencoes"] += 1
+        else:
+            linhas[(tipo, chave)] = {
+                "analysis_id": analysis_id, "usuario_id": usuario_id, "tipo": tipo, "chave": chave,
+                "texto": texto, "mencoes": 1, "criado_em": criado_em,
+            }
+    return list(linhas.values())
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    entidades = op.create_table('entidades_analises',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('analysis_id', sa.Integer(), nullable=False),
+    sa.Column('usuario_id', sa.Integer(), nullable=False),
+    sa.Column('tipo', sa.String(length=10), nullable=False),
+    sa.Column('chave', sa.String(length=200), nullable=False),
+    sa.Column('texto', sa.String(), nullable=False),
+    sa.Column('mencoes', sa.Integer(), nullable=False),
+    sa.Column('criado_em', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['analysis_id'], ['analyses.id'], ),
+    sa.ForeignKeyConstraint(['usuario_id'], ['usuarios.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+    #Copia as entidades do JSON das análises existentes, em lotes (índices criados depois da carga)
+    conexao = op.get_bind()
+    agora = datetime.datetime.utcnow()
+    ultimo_id = 0
+    while True:
+        analises = conexao.execute(
+            sa.text("SELECT id, usuario_id, criado_em, entidades FROM analyses WHERE id > :ultimo ORDER BY id LIMIT :lote")
+            .columns(criado_em=sa.DateTime()),
+            {"ultimo": ultimo_id, "lote": LOTE},
+        ).all()
+        if not analises:
+            break
+        linhas = []
+        for analysis_id, usuario_id, criado_em, valor in analises:
+            linhas.extend(_linhas(analysis_id, usuario_id, criado_em or agora, valor))
+        if linhas:
+            op.bulk_insert(entidades, linhas)
+        ultimo_id = analises[-1][0]
+
+    op.create_index(op.f('ix_entidades_analises_analysis_id'), 'entidades_analises', ['analysis_id'], unique=False)
+    op.create_index('ix_entidades_analises_usuario_tipo_chave', 'entidades_analises', ['usuario_id', 'tipo', 'chave', 'criado_em', 'analysis_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_entidades_analises_usuario_tipo_chave', table_name='entidades_analises')
+    op.drop_index(op.f('ix_entidades_analises_analysis_id'), table_name='entidades_analises')
+    op.drop_table('entidades_analises')
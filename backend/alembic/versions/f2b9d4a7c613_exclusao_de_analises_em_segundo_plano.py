@@ -0,0 +1,50 @@
+"""exclusao de analises em segundo plano
+
+Revision ID: f2b9d4a7c613
+Revises: c71f4b8e2d06
+Create Date: 2026-10-18 21:31:44.871205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b9d4a7c613'
+down_revision: Union[str, Sequence[str], None] = 'c71f4b8e2d06'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('exclusoes_analises',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('usuario_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('limite_id', sa.Integer(), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('removidas', sa.Integer(), nullable=False),
+    sa.Column('tentativas', sa.Integer(), nullable=False),
+    sa.Column('erro', sa.Text(), nullable=True),
+    sa.Column('worker', sa.String(), nullable=True),
+    sa.Column('heartbeat_em', sa.DateTime(), nullable=True),
+    sa.Column('criado_em', sa.DateTime(), nullable=True),
+    sa.Column('iniciado_em', sa.DateTime(), nullable=True),
+    sa.Column('concluido_em', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['usuario_id'], ['usuarios.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_exclusoes_analises_usuario_id'), 'exclusoes_analises', ['usuario_id'], unique=False)
+    op.create_index(op.f('ix_exclusoes_analises_status'), 'exclusoes_analises', ['status'], unique=False)
+    op.create_index(op.f('ix_jobs_analise_itens_analysis_id'), 'jobs_analise_itens', ['analysis_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_jobs_analise_itens_analysis_id'), table_name='jobs_analise_itens')
+    op.drop_index(op.f('ix_exclusoes_analises_status'), table_name='exclusoes_analises')
+    op.drop_index(op.f('ix_exclusoes_analises_usuario_id'), table_name='exclusoes_analises')
+    op.drop_table('exclusoes_analises')
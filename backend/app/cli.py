@@ -0,0 +1,133 @@
+#Comandos de linha de comando da aplicação
+#Uso (a partir de backend/): python -m app.cli <comando>
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from app.services import ml_service, treino_service
+
+
+#Treina o classificador de tópicos se o artefato da versão atual ainda não existir
+def treinar_topicos(args) -> int:
+    diretorio = Path(args.diretorio) if args.diretorio else ml_service.DIRETORIO_MODELOS
+    chave = ml_service.chave_treino()
+    caminho_modelo, _ = ml_service.caminhos_artefato(chave, diretorio)
+
+    if caminho_modelo.exists() and not args.forcar:
+        print(f"Modelo de tópicos {chave} já existe em {caminho_modelo}")
+        return 0
+
+    metadados = ml_service.treinar_e_salvar(diretorio)
+    print(json.dumps(metadados, ensure_ascii=False, indent=2))
+    return 0
+
+
+#Lista os artefatos do classificador de tópicos e indica qual corresponde à versão atual
+def listar_modelos(args) -> int:
+    diretorio = Path(args.diretorio) if args.diretorio else ml_service.DIRETORIO_MODELOS
+    chave_atual = ml_service.chave_treino()
+
+    for caminho in sorted(diretorio.glob("topicos-*.json")):
+        with open(caminho, encoding="utf-8") as arquivo:
+            metadados = json.load(arquivo)
+        marcador = "*" if metadados["chave"] == chave_atual else " "
+        print(f"{marcador} {metadados['chave']}  {metadados['criado_em']}  acurácia de treino {metadados['acuracia_treino']}")
+    return 0
+
+
+#Treina o modelo incremental lendo o corpus rotulado em mini-lotes
+def treinar_topicos_incremental(args) -> int:
+    diretorio = Path(args.diretorio) if args.diretorio else ml_service.DIRETORIO_MODELOS
+    metadados = treino_service.treinar_incremental(
+        Path(args.corpus),
+        formato=args.formato,
+        diretorio=diretorio,
+        topicos=args.topicos.split(",") if args.topicos else None,
+        tamanho_lote=args.tamanho_lote,
+        checkpoint_a_cada=args.checkpoint_a_cada,
+        retomar=args.retomar,
+    )
+    print(json.dumps(metadados, ensure_ascii=False, indent=2))
+    return 0
+
+
+#Recalcula as estatísticas agregadas por usuário a partir da tabela de análises
+def reconstruir_estatisticas(args) -> int:
+    from app.models.db import SessionLocal
+    from app.services.estatisticas_service import reconstruir_estatisticas as reconstruir
+
+    with SessionLocal() as session:
+        usuarios = reconstruir(session, args.usuario)
+        session.commit()
+    print(f"Estatísticas reconstruídas para {usuarios} usuário(s)")
+    return 0
+
+
+#Refaz o índice de entidades a partir das entidades gravadas nas análises
+def reconstruir_entidades(args) -> int:
+    from app.models.db import SessionLocal
+    from app.services.entidades_service import reconstruir_entidades as reconstruir
+
+    with SessionLocal() as session:
+        entidades = reconstruir(session, args.usuario)
+        session.commit()
+    print(f"{entidades} entidade(s) indexada(s)")
+    return 0
+
+
+#Mostra o espaço ocupado pelos textos analisados e, opcionalmente, remove os que não têm análise
+def relatorio_textos(args) -> int:
+    from app.models.db import SessionLocal
+    from app.services.textos_service import purgar_textos, relatorio_textos as relatorio
+
+    with SessionLocal() as session:
+        if args.purgar:
+            removidos = purgar_textos(session)
+            session.commit()
+            print(f"{removidos} texto(s) sem análise removido(s)")
+        print(json.dumps(relatorio(session), ensure_ascii=False, indent=2))
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    treinar = comandos.add_parser("treinar-topicos", help="treina e salva o classificador de tópicos")
+    treinar.add_argument("--diretorio", help="diretório dos artefatos")
+    treinar.add_argument("--forcar", action="store_true", help="treina mesmo se o artefato já existir")
+    treinar.set_defaults(funcao=treinar_topicos)
+
+    incremental = comandos.add_parser("treinar-topicos-incremental", help="treina o modelo incremental a partir de um corpus CSV/NDJSON")
+    incremental.add_argument("corpus", help="arquivo .csv ou .ndjson (opcionalmente .gz) com os campos texto e topico")
+    incremental.add_argument("--formato", choices=["csv", "ndjson"], help="formato do corpus (padrão: pela extensão)")
+    incremental.add_argument("--diretorio", help="diretório dos artefatos")
+    incremental.add_argument("--topicos", help="tópicos separados por vírgula (padrão: os do modelo básico)")
+    incremental.add_argument("--tamanho-lote", type=int, default=treino_service.TOPICOS_TAMANHO_LOTE_TREINO)
+    incremental.add_argument("--checkpoint-a-cada", type=int, default=treino_service.TOPICOS_CHECKPOINT_A_CADA, help="lotes entre checkpoints")
+    incremental.add_argument("--retomar", action="store_true", help="continua do último checkpoint do mesmo corpus")
+    incremental.set_defaults(funcao=treinar_topicos_incremental)
+
+    listar = comandos.add_parser("modelos", help="lista os artefatos do classificador de tópicos")
+    listar.add_argument("--diretorio", help="diretório dos artefatos")
+    listar.set_defaults(funcao=listar_modelos)
+
+    estatisticas = comandos.add_parser("reconstruir-estatisticas", help="recalcula as estatísticas por usuário a partir das análises")
+    estatisticas.add_argument("--usuario", type=int, help="id do usuário (padrão: todos)")
+    estatisticas.set_defaults(funcao=reconstruir_estatisticas)
+
+    entidades = comandos.add_parser("reconstruir-entidades", help="refaz o índice de entidades a partir das análises")
+    entidades.add_argument("--usuario", type=int, help="id do usuário (padrão: todos)")
+    entidades.set_defaults(funcao=reconstruir_entidades)
+
+    textos = comandos.add_parser("relatorio-textos", help="mostra o espaço economizado pela deduplicação e compressão dos textos")
+    textos.add_argument("--purgar", action="store_true", help="remove os textos que nenhuma análise referencia")
+    textos.set_defaults(funcao=relatorio_textos)
+
+    args = parser.parse_args(argv)
+    return args.funcao(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
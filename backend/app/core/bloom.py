@@ -0,0 +1,46 @@
+#Filtro de Bloom: responde "com certeza não está" ou "talvez esteja" usando poucos bits por item
+import hashlib
+import math
+from typing import Iterable
+
+
+class FiltroBloom:
+    def __init__(self, capacidade: int = 1024, taxa_falso_positivo: float = 0.01):
+        capacidade = max(capacidade, 1)
+        #Número de bits e de funções de hash ótimos para a capacidade e a taxa desejadas
+        self.bits = max(8, int(-capacidade * math.log(taxa_falso_positivo) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.bits / capacidade * math.log(2)))
+        self.capacidade = capacidade
+        self.taxa_falso_positivo = taxa_falso_positivo
+        self.itens = 0
+        self._vetor = bytearray((self.bits + 7) // 8)
+
+    #Posições dos bits da chave (hash duplo a partir de um único blake2b)
+    def _posicoes(self, chave: str):
+        resumo = hashlib.blake2b(chave.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(resumo[:8], "little")
+        h2 = int.from_bytes(resumo[8:], "little") | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def adicionar(self, chave: str) -> None:
+        for posicao in self._posicoes(chave):
+            self._vetor[posicao >> 3] |= 1 << (posicao & 7)
+        self.itens += 1
+
+    def adicionar_varios(self, chaves: Iterable[str]) -> None:
+        for chave in chaves:
+            self.adicionar(chave)
+
+    def __contains__(self, chave: str) -> bool:
+        vetor = self._vetor
+        return all(vetor[posicao >> 3] & (1 << (posicao & 7)) for posicao in self._posicoes(chave))
+
+    #Métricas do filtro
+    def estatisticas(self) -> dict:
+        return {
+            "itens": self.itens,
+            "capacidade": self.capacidade,
+            "bits": self.bits,
+            "hashes": self.hashes,
+            "taxa_falso_positivo": self.taxa_falso_positivo,
+        }
@@ -0,0 +1,76 @@
+#Cache em memória com política LRU e expiração por tempo (TTL)
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class CacheLRU:
+    def __init__(self, tamanho_max: int = 1024, ttl: Optional[float] = None):
+        self.tamanho_max = tamanho_max
+        self.ttl = ttl
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+
+        #Contadores expostos para métricas
+        self.acertos = 0
+        self.falhas = 0
+        self.remocoes = 0
+        self.expirados = 0
+
+    #Retorna o valor armazenado ou `padrao` se ausente/expirado
+    def obter(self, chave: Hashable, padrao: Any = None) -> Any:
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                self.falhas += 1
+                return padrao
+
+            valor, expira_em = item
+            if expira_em is not None and expira_em <= time.monotonic():
+                del self._itens[chave]
+                self.expirados += 1
+                self.falhas += 1
+                return padrao
+
+            self._itens.move_to_end(chave)
+            self.acertos += 1
+            return valor
+
+    #Armazena um valor, removendo o menos usado recentemente se necessário
+    def salvar(self, chave: Hashable, valor: Any) -> None:
+        expira_em = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._itens[chave] = (valor, expira_em)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.tamanho_max:
+                self._itens.popitem(last=False)
+                self.remocoes += 1
+
+    #Remove uma chave específica
+    def invalidar(self, chave: Hashable) -> None:
+        with self._lock:
+            self._itens.pop(chave, None)
+
+    #Remove todas as chaves
+    def limpar(self) -> None:
+        with self._lock:
+            self._itens.clear()
+
+    def __len__(self) -> int:
+        return len(self._itens)
+
+    #Métricas de uso do cache
+    def estatisticas(self) -> dict:
+        with self._lock:
+            consultas = self.acertos + self.falhas
+            return {
+                "itens": len(self._itens),
+                "tamanho_max": self.tamanho_max,
+                "ttl": self.ttl,
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "remocoes": self.remocoes,
+                "expirados": self.expirados,
+                "taxa_acerto": round(self.acertos / consultas, 4) if consultas else 0.0,
+            }
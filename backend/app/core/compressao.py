@@ -0,0 +1,40 @@
+#Compressão dos textos armazenados
+#O primeiro byte indica o formato ("z" = zlib, "r" = sem compressão), então textos curtos, que
+#não diminuem com o zlib, são guardados como estão e outros formatos podem ser adicionados depois
+import zlib
+
+from sqlalchemy.types import LargeBinary, TypeDecorator # type: ignore
+
+from app.core.config import TEXTOS_NIVEL_COMPRESSAO
+
+ZLIB = b"z"
+SEM_COMPRESSAO = b"r"
+
+
+def comprimir(texto: str, nivel: int = TEXTOS_NIVEL_COMPRESSAO) -> bytes:
+    dados = texto.encode("utf-8")
+    comprimido = zlib.compress(dados, nivel)
+    if len(comprimido) < len(dados):
+        return ZLIB + comprimido
+    return SEM_COMPRESSAO + dados
+
+
+def descomprimir(conteudo: bytes) -> str:
+    formato, dados = conteudo[:1], conteudo[1:]
+    if formato == ZLIB:
+        return zlib.decompress(dados).decode("utf-8")
+    if formato == SEM_COMPRESSAO:
+        return bytes(dados).decode("utf-8")
+    raise ValueError(f"Formato de texto armazenado desconhecido: {formato!r}")
+
+
+#Coluna que grava str comprimida e devolve str ao ler
+class TextoComprimido(TypeDecorator):
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, valor, dialeto):
+        return None if valor is None else comprimir(valor)
+
+    def process_result_value(self, valor, dialeto):
+        return None if valor is None else descomprimir(valor)
@@ -1,40 +1,201 @@
-import os
-from pydantic_settings import BaseSettings # type: ignore
-
-from typing import Optional
-
-class Settings(BaseSettings):
-    #Ambiente
-    ENVIRONMENT: str = os.getenv("ENVIRONMENT", "development")
-
-    #Banco de dados
-    DATABASE_URL: Optional[str] = None
-
-    #Segurança
-    SECRET_KEY: Optional[str] = os.getenv("SECRET_KEY", "dev-secret-change-in-production")
-    ALGORITHM: str = "HS256"
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
-
-    #Frontend URL
-    FRONTEND_URL: str = os.getenv("FRONTEND_URL", "https://insightstextanalysis.vercel.app")
-
-    class Config:
-        env_file = ".env"
-
-settings = Settings()
-
-#Configuração do banco de dados para desenvolvimento
-if not settings.DATABASE_URL:
-    if settings.ENVIRONMENT != 'production':
-        settings.DATABASE_URL = 'sqlite:///./analises.db'
-
-SECRET_KEY = settings.SECRET_KEY
-ALGORITHM = settings.ALGORITHM
-ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
-DATABASE_URL = settings.DATABASE_URL
-ENVIRONMENT = settings.ENVIRONMENT
-FRONTEND_URL = settings.FRONTEND_URL
-
-if ENVIRONMENT == "production":
-    if not SECRET_KEY or not DATABASE_URL:
-        raise RuntimeError("SECRET_KEY e DATABASE_URL devem estar definidas em produção.")
+import os
+from pydantic_settings import BaseSettings # type: ignore
+
+from typing import Optional
+
+class Settings(BaseSettings):
+    #Ambiente
+    ENVIRONMENT: str = os.getenv("ENVIRONMENT", "development")
+
+    #Banco de dados
+    DATABASE_URL: Optional[str] = None
+    #Pool de conexões do PostgreSQL (por processo): conexões mantidas, extras sob demanda,
+    #reciclagem (s), espera por uma conexão livre (s) e tempo máximo de cada consulta (ms, 0 = sem limite)
+    DB_POOL_TAMANHO: int = 10
+    DB_POOL_EXTRA: int = 20
+    DB_POOL_RECICLAR: int = 1800
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_TIMEOUT_CONSULTA: int = 30000
+    #SQLite: modo WAL, pragmas de cada conexão (cache em KiB, mmap em MiB, espera pela trava em ms)
+    #e commit em grupo das análises (espera máxima em ms para juntar requisições e tamanho máximo do grupo)
+    SQLITE_WAL: bool = True
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_CACHE_KB: int = 65536
+    SQLITE_MMAP_MB: int = 256
+    SQLITE_BUSY_TIMEOUT: int = 5000
+    SQLITE_COMMIT_EM_GRUPO: bool = True
+    SQLITE_COMMIT_ESPERA_MS: float = 2.0
+    SQLITE_COMMIT_MAX: int = 256
+
+    #Segurança
+    SECRET_KEY: Optional[str] = os.getenv("SECRET_KEY", "dev-secret-change-in-production")
+    ALGORITHM: str = "HS256"
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    #Cache de autenticação por processo (tokens validados e usuários); 0 itens desativa
+    #O TTL limita por quanto tempo outro processo pode aceitar um token revogado ou dados antigos do usuário
+    AUTH_CACHE_TAMANHO: int = 10000
+    AUTH_CACHE_TTL: int = 60
+    #Tokens revogados: taxa de falsos positivos do filtro de Bloom, intervalo (s) de sincronização
+    #do filtro com o banco e intervalo (s) da purga das revogações expiradas
+    REVOGACAO_BLOOM_FP: float = 0.01
+    REVOGACAO_SINCRONIZAR: float = 5.0
+    REVOGACAO_PURGA_INTERVALO: float = 3600.0
+
+    #Frontend URL
+    FRONTEND_URL: str = os.getenv("FRONTEND_URL", "https://insightstextanalysis.vercel.app")
+
+    #NLP
+    NLP_BATCH_SIZE: int = 64
+    NLP_N_PROCESS: int = 1
+    NLP_LOTE_MAX_TEXTOS: int = 500
+    NLP_LOTE_MAX_CARACTERES: int = 1000000
+    #Textos acima de NLP_LIMITE_CARACTERES são analisados em blocos de NLP_TAMANHO_BLOCO caracteres
+    NLP_LIMITE_CARACTERES: int = 20000
+    NLP_LIMITE_FLUXO: int = 200000
+    NLP_TAMANHO_BLOCO: int = 5000
+    #Perfil do pipeline do spaCy: "completo", "enxuto" ou "rapido"
+    NLP_PERFIL: str = "enxuto"
+    #Contagem de sílabas da legibilidade: "regras" (padrão) ou "pyphen"; palavras memorizadas por processo
+    NLP_SILABAS: str = "regras"
+    NLP_SILABAS_CACHE: int = 50000
+    #Pool de análise: processos dedicados (0 = thread no próprio processo), vagas extras na fila e timeout em segundos
+    NLP_POOL_PROCESSOS: int = 1
+    NLP_POOL_FILA_MAX: int = 32
+    NLP_POOL_TIMEOUT: float = 30.0
+    #Custo de admissão no pool: uma vaga (e um NLP_POOL_TIMEOUT) a cada tantos caracteres enviados
+    NLP_POOL_CARACTERES_POR_VAGA: int = 20000
+
+    #Diretório dos artefatos do classificador de tópicos (vazio = backend/modelos)
+    TOPICOS_DIRETORIO_MODELOS: Optional[str] = None
+    TOPICOS_LOTE_MAX_TEXTOS: int = 5000
+    #Modelo usado pela API: "basico" (TF-IDF treinado com os exemplos embutidos) ou "incremental"
+    TOPICOS_MODELO: str = "basico"
+    TOPICOS_VERIFICAR_INTERVALO: float = 30.0
+    #Treino incremental: dimensão do HashingVectorizer, exemplos por mini-lote e lotes entre checkpoints
+    TOPICOS_HASH_FEATURES: int = 2 ** 18
+    TOPICOS_TAMANHO_LOTE_TREINO: int = 10000
+    TOPICOS_CHECKPOINT_A_CADA: int = 50
+
+    #Jobs de análise em lote (intervalos em segundos)
+    JOBS_WORKERS: int = 2
+    JOBS_INTERVALO: float = 1.0
+    JOBS_TAMANHO_LOTE: int = 32
+    JOBS_MAX_TENTATIVAS: int = 3
+    JOBS_MAX_POR_USUARIO: int = 2
+    JOBS_MAX_TEXTOS: int = 10000
+    JOBS_HEARTBEAT_EXPIRA: int = 300
+    #Importação de arquivos como jobs: itens gravados por transação e linhas por arquivo
+    IMPORTACAO_LOTE: int = 1000
+    IMPORTACAO_MAX_LINHAS: int = 200000
+
+    #Exclusão de todas as análises em segundo plano: análises por transação e pausa (ms) entre
+    #os lotes para não monopolizar a escrita
+    EXCLUSAO_TAMANHO_LOTE: int = 1000
+    EXCLUSAO_PAUSA_MS: float = 5.0
+
+    #Exportação do histórico: linhas lidas do cursor do banco e enviadas por vez
+    EXPORTACAO_LOTE: int = 1000
+
+    #Registro de auditoria gravado em lote: tamanho do lote, intervalo máximo entre gravações (s)
+    #e eventos pendentes mantidos em memória (os mais antigos são descartados além disso)
+    AUDITORIA_HABILITADA: bool = True
+    AUDITORIA_TAMANHO_LOTE: int = 500
+    AUDITORIA_INTERVALO: float = 1.0
+    AUDITORIA_MAX_PENDENTES: int = 100000
+
+    #Armazenamento dos textos analisados (nível do zlib, de 1 a 9)
+    TEXTOS_NIVEL_COMPRESSAO: int = 6
+
+    #Busca textual: configuração de idioma do PostgreSQL (to_tsvector), palavras por trecho destacado
+    #e textos do usuário (os mais recentes que correspondem à consulta) ranqueados por busca
+    BUSCA_CONFIGURACAO: str = "portuguese"
+    BUSCA_PALAVRAS_TRECHO: int = 16
+    BUSCA_MAX_CANDIDATOS: int = 1000
+
+    #Cache de resultados de NLP (TTL em segundos; 0 desativa a expiração)
+    NLP_CACHE_TAMANHO: int = 2048
+    NLP_CACHE_TTL: int = 3600
+    NLP_CACHE_PERSISTENTE: bool = False
+
+    class Config:
+        env_file = ".env"
+
+settings = Settings()
+
+#Configuração do banco de dados para desenvolvimento
+if not settings.DATABASE_URL:
+    if settings.ENVIRONMENT != 'production':
+        settings.DATABASE_URL = 'sqlite:///./analises.db'
+
+SECRET_KEY = settings.SECRET_KEY
+ALGORITHM = settings.ALGORITHM
+ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
+AUTH_CACHE_TAMANHO = settings.AUTH_CACHE_TAMANHO
+AUTH_CACHE_TTL = settings.AUTH_CACHE_TTL
+REVOGACAO_BLOOM_FP = settings.REVOGACAO_BLOOM_FP
+REVOGACAO_SINCRONIZAR = settings.REVOGACAO_SINCRONIZAR
+REVOGACAO_PURGA_INTERVALO = settings.REVOGACAO_PURGA_INTERVALO
+DATABASE_URL = settings.DATABASE_URL
+DB_POOL_TAMANHO = settings.DB_POOL_TAMANHO
+DB_POOL_EXTRA = settings.DB_POOL_EXTRA
+DB_POOL_RECICLAR = settings.DB_POOL_RECICLAR
+DB_POOL_TIMEOUT = settings.DB_POOL_TIMEOUT
+DB_TIMEOUT_CONSULTA = settings.DB_TIMEOUT_CONSULTA
+SQLITE_WAL = settings.SQLITE_WAL
+SQLITE_SYNCHRONOUS = settings.SQLITE_SYNCHRONOUS
+SQLITE_CACHE_KB = settings.SQLITE_CACHE_KB
+SQLITE_MMAP_MB = settings.SQLITE_MMAP_MB
+SQLITE_BUSY_TIMEOUT = settings.SQLITE_BUSY_TIMEOUT
+SQLITE_COMMIT_EM_GRUPO = settings.SQLITE_COMMIT_EM_GRUPO
+SQLITE_COMMIT_ESPERA_MS = settings.SQLITE_COMMIT_ESPERA_MS
+SQLITE_COMMIT_MAX = settings.SQLITE_COMMIT_MAX
+ENVIRONMENT = settings.ENVIRONMENT
+FRONTEND_URL = settings.FRONTEND_URL
+NLP_BATCH_SIZE = settings.NLP_BATCH_SIZE
+NLP_N_PROCESS = settings.NLP_N_PROCESS
+NLP_LOTE_MAX_TEXTOS = settings.NLP_LOTE_MAX_TEXTOS
+NLP_LOTE_MAX_CARACTERES = settings.NLP_LOTE_MAX_CARACTERES
+NLP_LIMITE_CARACTERES = settings.NLP_LIMITE_CARACTERES
+NLP_LIMITE_FLUXO = settings.NLP_LIMITE_FLUXO
+NLP_TAMANHO_BLOCO = settings.NLP_TAMANHO_BLOCO
+NLP_PERFIL = settings.NLP_PERFIL
+NLP_SILABAS = settings.NLP_SILABAS
+NLP_SILABAS_CACHE = settings.NLP_SILABAS_CACHE
+NLP_POOL_PROCESSOS = settings.NLP_POOL_PROCESSOS
+NLP_POOL_FILA_MAX = settings.NLP_POOL_FILA_MAX
+NLP_POOL_TIMEOUT = settings.NLP_POOL_TIMEOUT
+NLP_POOL_CARACTERES_POR_VAGA = settings.NLP_POOL_CARACTERES_POR_VAGA
+TOPICOS_DIRETORIO_MODELOS = settings.TOPICOS_DIRETORIO_MODELOS
+TOPICOS_LOTE_MAX_TEXTOS = settings.TOPICOS_LOTE_MAX_TEXTOS
+TOPICOS_MODELO = settings.TOPICOS_MODELO
+TOPICOS_VERIFICAR_INTERVALO = settings.TOPICOS_VERIFICAR_INTERVALO
+TOPICOS_HASH_FEATURES = settings.TOPICOS_HASH_FEATURES
+TOPICOS_TAMANHO_LOTE_TREINO = settings.TOPICOS_TAMANHO_LOTE_TREINO
+TOPICOS_CHECKPOINT_A_CADA = settings.TOPICOS_CHECKPOINT_A_CADA
+JOBS_WORKERS = settings.JOBS_WORKERS
+JOBS_INTERVALO = settings.JOBS_INTERVALO
+JOBS_TAMANHO_LOTE = settings.JOBS_TAMANHO_LOTE
+JOBS_MAX_TENTATIVAS = settings.JOBS_MAX_TENTATIVAS
+JOBS_MAX_POR_USUARIO = settings.JOBS_MAX_POR_USUARIO
+JOBS_MAX_TEXTOS = settings.JOBS_MAX_TEXTOS
+JOBS_HEARTBEAT_EXPIRA = settings.JOBS_HEARTBEAT_EXPIRA
+IMPORTACAO_LOTE = settings.IMPORTACAO_LOTE
+IMPORTACAO_MAX_LINHAS = settings.IMPORTACAO_MAX_LINHAS
+EXCLUSAO_TAMANHO_LOTE = settings.EXCLUSAO_TAMANHO_LOTE
+EXCLUSAO_PAUSA_MS = settings.EXCLUSAO_PAUSA_MS
+EXPORTACAO_LOTE = settings.EXPORTACAO_LOTE
+AUDITORIA_HABILITADA = settings.AUDITORIA_HABILITADA
+AUDITORIA_TAMANHO_LOTE = settings.AUDITORIA_TAMANHO_LOTE
+AUDITORIA_INTERVALO = settings.AUDITORIA_INTERVALO
+AUDITORIA_MAX_PENDENTES = settings.AUDITORIA_MAX_PENDENTES
+TEXTOS_NIVEL_COMPRESSAO = settings.TEXTOS_NIVEL_COMPRESSAO
+BUSCA_CONFIGURACAO = settings.BUSCA_CONFIGURACAO
+BUSCA_PALAVRAS_TRECHO = settings.BUSCA_PALAVRAS_TRECHO
+BUSCA_MAX_CANDIDATOS = settings.BUSCA_MAX_CANDIDATOS
+NLP_CACHE_TAMANHO = settings.NLP_CACHE_TAMANHO
+NLP_CACHE_TTL = settings.NLP_CACHE_TTL
+NLP_CACHE_PERSISTENTE = settings.NLP_CACHE_PERSISTENTE
+
+if ENVIRONMENT == "production":
+    if not SECRET_KEY or not DATABASE_URL:
+        raise RuntimeError("SECRET_KEY e DATABASE_URL devem estar definidas em produção.")
@@ -0,0 +1,9 @@
+#INSERT com suporte a ON CONFLICT do dialeto da conexão (PostgreSQL ou SQLite)
+from sqlalchemy.dialects import postgresql, sqlite # type: ignore
+from sqlalchemy.engine import Connection # type: ignore
+
+
+def insert_dialeto(conexao: Connection, tabela):
+    if conexao.dialect.name == "postgresql":
+        return postgresql.insert(tabela)
+    return sqlite.insert(tabela)
@@ -0,0 +1,33 @@
+#Configuração das conexões SQLite para uso com escritas concorrentes
+#WAL permite leituras durante uma escrita e, com synchronous=NORMAL, o fsync acontece nos
+#checkpoints em vez de em todo commit; busy_timeout faz a conexão esperar pela trava em vez de
+#falhar na hora com "database is locked"
+from typing import List
+
+from app.core.config import SQLITE_WAL, SQLITE_SYNCHRONOUS, SQLITE_CACHE_KB, SQLITE_MMAP_MB, SQLITE_BUSY_TIMEOUT
+
+
+#Pragmas aplicados a cada nova conexão
+def pragmas_sqlite() -> List[str]:
+    pragmas = []
+    if SQLITE_WAL:
+        pragmas.append("PRAGMA journal_mode=WAL")
+    pragmas += [
+        f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}",
+        f"PRAGMA busy_timeout={int(SQLITE_BUSY_TIMEOUT)}",
+        #Valor negativo: tamanho do cache de páginas em KiB
+        f"PRAGMA cache_size=-{int(SQLITE_CACHE_KB)}",
+        f"PRAGMA mmap_size={int(SQLITE_MMAP_MB) * 1024 * 1024}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+    return pragmas
+
+
+#Listener do evento "connect" do SQLAlchemy (engines síncrona e assíncrona)
+def configurar_sqlite(conexao_dbapi, registro_conexao) -> None:
+    cursor = conexao_dbapi.cursor()
+    try:
+        for pragma in pragmas_sqlite():
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
@@ -1,65 +1,133 @@
-from fastapi import FastAPI, Request  # type: ignore
-from fastapi.middleware.cors import CORSMiddleware # type: ignore
-from app.routers.analysis import analysis_router
-from app.routers.auth import auth_router
-from slowapi import Limiter, _rate_limit_exceeded_handler # type: ignore
-from slowapi.util import get_remote_address # type: ignore
-from slowapi.errors import RateLimitExceeded # type: ignore
-from fastapi.responses import JSONResponse # type: ignore
-
-#Instacia de criação da aplicação FastAPI
-app = FastAPI()
-
-origins = [
-    "http://localhost:5173",
-    "https://insightstextanalysis.vercel.app",
-]
-
-#Configuração do middleware CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=origins,
-    allow_origin_regex=r"^https://.*\.vercel\.app$",
-    allow_credentials=True,
-    allow_methods=["*"],  
-    allow_headers=["*"],  
-    expose_headers=["Content-Length", "X-Request-ID"],
-    max_age=600,
-)
-
-
-@app.get('/cors-check')
-async def cors_check(request: Request):
-    # Retorna o header Origin recebido para confirmar que o CORS está permitindo
-    return JSONResponse({"origin_received": request.headers.get('origin')})
-
-#Inicializar limiter
-limiter = Limiter(key_func=get_remote_address)
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-
-#Health check endpoint
-@app.get("/health")
-@limiter.limit("100/minute")
-async def health_check(request: Request):
-    return {"status": "healthy"}
-
-@app.get("/info")
-async def info():
-    db_type = "sqlite" if "sqlite" in str(__import__('app.core.config', fromlist=['DATABASE_URL']).DATABASE_URL) else "postgres"
-    return {"environment": __import__('app.core.config', fromlist=['ENVIRONMENT']).ENVIRONMENT, "database": db_type}
-
-#Exemplo endpoint com rate limiting
-@app.get("/api/data")
-@limiter.limit("10/minute")
-async def get_data(request: Request):
-    return {"data": "..."}
-
-#Inclusão dos roteadores na aplicação
-app.include_router(analysis_router)
-app.include_router(auth_router)
-
-#Root endpoint
-@app.get("/")
-async def root():
+from fastapi import FastAPI, Request  # type: ignore
+from fastapi.middleware.cors import CORSMiddleware # type: ignore
+from app.routers.analysis import analysis_router, get_topic_classifier
+from app.routers.auth import auth_router
+from app.routers.jobs import jobs_router
+from slowapi import Limiter, _rate_limit_exceeded_handler # type: ignore
+from slowapi.util import get_remote_address # type: ignore
+from slowapi.errors import RateLimitExceeded # type: ignore
+from fastapi.responses import JSONResponse # type: ignore
+from app.services.pool_service import get_pool_analise, PoolCheioError, TempoEsgotadoError
+from app.services.job_service import get_executor_jobs
+from app.services.exclusao_service import get_executor_exclusoes
+from app.services.gravacao_service import get_gravador
+from app.services.auditoria_service import get_registro_auditoria
+from app.models.db import estatisticas_cache_autenticacao, SessionLocal, engine_async
+from app.services.revogacao_service import get_revogacoes, manter_revogacoes
+import asyncio
+import logging
+
+logger = logging.getLogger("uvicorn.error")
+
+#Instacia de criação da aplicação FastAPI
+app = FastAPI()
+
+origins = [
+    "http://localhost:5173",
+    "https://insightstextanalysis.vercel.app",
+]
+
+#Configuração do middleware CORS
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=origins,
+    allow_origin_regex=r"^https://.*\.vercel\.app$",
+    allow_credentials=True,
+    allow_methods=["*"],  
+    allow_headers=["*"],  
+    expose_headers=["Content-Length", "X-Request-ID", "X-Next-Cursor"],
+    max_age=600,
+)
+
+
+@app.get('/cors-check')
+async def cors_check(request: Request):
+    # Retorna o header Origin recebido para confirmar que o CORS está permitindo
+    return JSONResponse({"origin_received": request.headers.get('origin')})
+
+#Carrega e aquece o modelo de NLP antes de aceitar requisições
+@app.on_event("startup")
+async def carregar_modelos():
+    pool = get_pool_analise()
+    await pool.iniciar()
+    logger.info(
+        "Modelo de NLP carregado em %.2fs (aquecimento: %.2fs, processos: %d)",
+        pool.info_nlp["tempo_carregamento"],
+        pool.info_nlp["tempo_aquecimento"],
+        pool.processos,
+    )
+    classificador = get_topic_classifier()
+    logger.info("Modelo de tópicos %s carregado em %.3fs", classificador.informacoes()["chave"], classificador.tempo_carregamento)
+    get_executor_jobs().iniciar()
+    get_executor_exclusoes().iniciar()
+    get_gravador().iniciar()
+    get_registro_auditoria().iniciar()
+
+    #Filtro de tokens revogados carregado antes de aceitar requisições e mantido em segundo plano
+    revogacoes = get_revogacoes()
+    await asyncio.get_running_loop().run_in_executor(None, revogacoes.reconstruir, SessionLocal)
+    app.state.tarefa_revogacoes = asyncio.create_task(manter_revogacoes(revogacoes, SessionLocal))
+
+#Encerra os workers de jobs e de exclusão, os processos de análise, grava a auditoria pendente e fecha as conexões do pool assíncrono
+@app.on_event("shutdown")
+async def encerrar_pool():
+    tarefa = getattr(app.state, "tarefa_revogacoes", None)
+    if tarefa is not None:
+        tarefa.cancel()
+    get_executor_jobs().encerrar()
+    get_executor_exclusoes().encerrar()
+    get_pool_analise().encerrar()
+    await get_gravador().encerrar()
+    await get_registro_auditoria().encerrar()
+    await engine_async.dispose()
+
+#Fila de análise cheia: o cliente deve tentar novamente
+@app.exception_handler(PoolCheioError)
+async def pool_cheio_handler(request: Request, exc: PoolCheioError):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "5"})
+
+#Análise excedeu o tempo limite
+@app.exception_handler(TempoEsgotadoError)
+async def tempo_esgotado_handler(request: Request, exc: TempoEsgotadoError):
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
+#Inicializar limiter
+limiter = Limiter(key_func=get_remote_address)
+app.state.limiter = limiter
+app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+
+#Health check endpoint
+@app.get("/health")
+@limiter.limit("100/minute")
+async def health_check(request: Request):
+    return {"status": "healthy"}
+
+@app.get("/info")
+async def info():
+    db_type = "sqlite" if "sqlite" in str(__import__('app.core.config', fromlist=['DATABASE_URL']).DATABASE_URL) else "postgres"
+    return {
+        "environment": __import__('app.core.config', fromlist=['ENVIRONMENT']).ENVIRONMENT,
+        "database": db_type,
+        "nlp": get_pool_analise().informacoes(),
+        "topicos": get_topic_classifier().informacoes(),
+        "cache_autenticacao": estatisticas_cache_autenticacao(),
+        "revogacoes": get_revogacoes().estatisticas(),
+        "commit_em_grupo": get_gravador().estatisticas(),
+        "auditoria": get_registro_auditoria().estatisticas(),
+    }
+
+#Exemplo endpoint com rate limiting
+@app.get("/api/data")
+@limiter.limit("10/minute")
+async def get_data(request: Request):
+    return {"data": "..."}
+
+#Inclusão dos roteadores na aplicação (jobs antes de analysis por causa de /analysis/{analysis_id})
+app.include_router(jobs_router)
+app.include_router(analysis_router)
+app.include_router(auth_router)
+
+#Root endpoint
+@app.get("/")
+async def root():
     return {"message": "InsightsT API", "status": "online"}
\ No newline at end of file
@@ -1,74 +1,265 @@
-#Modelo de Análise de Texto usando SQLAlchemy
-import datetime
-from sqlalchemy import Integer, String, Boolean, ForeignKey, Column, Text, DateTime, JSON # type: ignore
-from sqlalchemy.orm import relationship, declarative_base # type: ignore
-
-#Base declarative class
-Base = declarative_base()
-
-#odelo para Análise de Texto
-class Analysis(Base):
-    __tablename__ = "analyses"
-
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    texto_original = Column(Text)
-    sentimento = Column(String)
-    palavra_mais_frequente = Column(String)
-    entidades = Column(JSON)
-    lvl_legibilidade = Column(String)
-    cont_palavras = Column(Integer)
-    cont_caracteres = Column(Integer)
-    cont_frases = Column(Integer)
-    criado_em = Column(DateTime, default=datetime.datetime.utcnow)
-    usuario_id = Column(Integer, ForeignKey('usuarios.id'), nullable=False)
-
-    usuario = relationship("Usuario", backref="analyses")
-
-    def __init__(self, usuario_id: int, texto_original: str, sentimento: str, palavra_mais_frequente: str, entidades: dict | list,
-                 lvl_legibilidade: str, cont_palavras: int,
-                 cont_caracteres: int, cont_frases: int) -> None:
-
-        self.usuario_id = usuario_id
-        self.texto_original = texto_original
-        self.sentimento = sentimento
-        self.palavra_mais_frequente = palavra_mais_frequente
-        self.entidades = entidades
-        self.lvl_legibilidade = lvl_legibilidade
-        self.cont_palavras = cont_palavras
-        self.cont_caracteres = cont_caracteres
-        self.cont_frases = cont_frases
-
-#Modelo de Usuário
-class Usuario(Base):
-    __tablename__ = "usuarios"
-
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    nome = Column('nome', String, nullable=False)
-    email = Column('email', String, unique=True, nullable=False)
-    senha = Column('senha', String, nullable=False)
-    admin = Column('admin', Boolean, default=False)
-
-    def __init__(self, nome: str, email: str, senha: str, admin: bool = False) -> None:
-        self.nome = nome
-        self.email = email
-        self.senha = senha
-        self.admin = admin
-
-#Modelo para Histórico de Análises
-class AnalysisHistorico(Base):
-    __tablename__ = "analyses_historico"
-
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    analysis_id = Column('analysis_id', Integer, ForeignKey('analyses.id'))
-    usuario_id = Column('usuario_id', Integer, ForeignKey('usuarios.id'))
-    consultado_em = Column(DateTime, default=datetime.datetime.utcnow)
-
-    analysis = relationship("Analysis", backref="historicos")
-    usuario = relationship("Usuario", backref="historicos")
-
-#Modelo para Tokens Revogados
-class TokenRevogado(Base):
-    __tablename__ = "tokens_revogados"
-
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    token = Column(String, unique=True, index=True)
\ No newline at end of file
+#Modelo de Análise de Texto usando SQLAlchemy
+import datetime
+import hashlib
+from sqlalchemy import Integer, String, Boolean, ForeignKey, Column, Text, DateTime, JSON, Float, Index, DDL, event # type: ignore
+from sqlalchemy.orm import relationship, declarative_base # type: ignore
+from app.core.compressao import TextoComprimido
+
+#Base declarative class
+Base = declarative_base()
+
+#odelo para Análise de Texto
+class Analysis(Base):
+    __tablename__ = "analyses"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    #O texto fica em "textos", uma vez por conteúdo (ver TextoArmazenado)
+    texto_hash = Column(String(64), ForeignKey('textos.hash'), nullable=False, index=True)
+    sentimento = Column(String)
+    pontuacao_sentimento = Column(Float)
+    palavra_mais_frequente = Column(String)
+    entidades = Column(JSON)
+    lvl_legibilidade = Column(String)
+    cont_palavras = Column(Integer)
+    cont_caracteres = Column(Integer)
+    cont_frases = Column(Integer)
+    criado_em = Column(DateTime, default=datetime.datetime.utcnow)
+    usuario_id = Column(Integer, ForeignKey('usuarios.id'), nullable=False)
+
+    usuario = relationship("Usuario", backref="analyses")
+    texto = relationship("TextoArmazenado", lazy="joined", innerjoin=True)
+
+    #Histórico paginado por cursor: (usuario_id, criado_em, id) na mesma ordem da consulta
+    __table_args__ = (
+        Index('ix_analyses_usuario_criado_em_id', 'usuario_id', 'criado_em', 'id'),
+    )
+
+    def __init__(self, usuario_id: int, texto_original: str, sentimento: str, palavra_mais_frequente: str, entidades: dict | list,
+                 lvl_legibilidade: str, cont_palavras: int,
+                 cont_caracteres: int, cont_frases: int, pontuacao_sentimento: float | None = None) -> None:
+
+        self.usuario_id = usuario_id
+        #O texto é gravado em "textos" no flush (app.services.textos_service), se ainda não existir
+        self._texto = texto_original
+        self.texto_hash = TextoArmazenado.calcular_hash(texto_original)
+        self.sentimento = sentimento
+        self.pontuacao_sentimento = pontuacao_sentimento
+        self.palavra_mais_frequente = palavra_mais_frequente
+        self.entidades = entidades
+        self.lvl_legibilidade = lvl_legibilidade
+        self.cont_palavras = cont_palavras
+        self.cont_caracteres = cont_caracteres
+        self.cont_frases = cont_frases
+
+    #Texto da análise: o recebido na criação ou o lido (e descomprimido) de "textos"
+    @property
+    def texto_original(self) -> str:
+        texto = getattr(self, "_texto", None)
+        return texto if texto is not None else self.texto.conteudo
+
+#Modelo para os textos analisados, endereçados pelo conteúdo
+#Cada texto distinto é gravado uma vez, comprimido; as análises o referenciam pelo hash
+class TextoArmazenado(Base):
+    __tablename__ = "textos"
+
+    #SHA-256 do texto em UTF-8
+    hash = Column(String(64), primary_key=True)
+    conteudo = Column(TextoComprimido, nullable=False)
+    #Início do texto sem compressão, usado no resumo do histórico
+    trecho = Column(String, nullable=False)
+    tamanho = Column(Integer, nullable=False)
+    tamanho_armazenado = Column(Integer, nullable=False)
+    criado_em = Column(DateTime, default=datetime.datetime.utcnow)
+
+    @staticmethod
+    def calcular_hash(texto: str) -> str:
+        return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+#Índice de busca textual (um registro por texto distinto de cada usuário), criado por DDL porque
+#a estrutura depende do banco: FTS5 no SQLite (o usuário fica na faixa do rowid) e tsvector com
+#índice GIN no PostgreSQL. Mantido e consultado por app.services.busca_service
+TEXTOS_BUSCA_DDL = {
+    "sqlite": [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS textos_busca USING fts5("
+        "hash, conteudo, tokenize = 'unicode61 remove_diacritics 2')",
+    ],
+    "postgresql": [
+        "CREATE TABLE IF NOT EXISTS textos_busca ("
+        "id BIGINT GENERATED BY DEFAULT AS IDENTITY, "
+        "usuario_id INTEGER NOT NULL REFERENCES usuarios (id), "
+        "hash VARCHAR(64) NOT NULL REFERENCES textos (hash) ON DELETE CASCADE, "
+        "busca TSVECTOR NOT NULL, PRIMARY KEY (usuario_id, hash))",
+        "CREATE INDEX IF NOT EXISTS ix_textos_busca_busca ON textos_busca USING GIN (busca)",
+    ],
+}
+for _dialeto, _comandos in TEXTOS_BUSCA_DDL.items():
+    for _comando in _comandos:
+        event.listen(Base.metadata, "after_create", DDL(_comando).execute_if(dialect=_dialeto))
+event.listen(Base.metadata, "before_drop", DDL("DROP TABLE IF EXISTS textos_busca"))
+
+#Modelo para o índice normalizado das entidades nomeadas (uma linha por entidade distinta de cada
+#análise), mantido junto com as análises por app.services.entidades_service. A lista completa
+#devolvida pela API continua em Analysis.entidades
+class EntidadeAnalise(Base):
+    __tablename__ = "entidades_analises"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    analysis_id = Column(Integer, ForeignKey('analyses.id'), nullable=False, index=True)
+    usuario_id = Column(Integer, ForeignKey('usuarios.id'), nullable=False)
+    #PER, ORG ou LOC
+    tipo = Column(String(10), nullable=False)
+    #Texto normalizado (minúsculas, sem acentos e sem espaços repetidos), usado nas consultas
+    chave = Column(String(200), nullable=False)
+    #Texto como apareceu na análise
+    texto = Column(String, nullable=False)
+    #Vezes que a entidade aparece na análise
+    mencoes = Column(Integer, nullable=False, default=1)
+    #Data da análise, copiada para que as consultas por período usem só este índice
+    criado_em = Column(DateTime, nullable=False)
+
+    #Análises por entidade (mais recentes primeiro) e contagens por tipo no período
+    __table_args__ = (
+        Index('ix_entidades_analises_usuario_tipo_chave', 'usuario_id', 'tipo', 'chave', 'criado_em', 'analysis_id'),
+    )
+
+#Modelo de Usuário
+class Usuario(Base):
+    __tablename__ = "usuarios"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    nome = Column('nome', String, nullable=False)
+    email = Column('email', String, unique=True, nullable=False)
+    senha = Column('senha', String, nullable=False)
+    admin = Column('admin', Boolean, default=False)
+
+    def __init__(self, nome: str, email: str, senha: str, admin: bool = False) -> None:
+        self.nome = nome
+        self.email = email
+        self.senha = senha
+        self.admin = admin
+
+#Modelo para o registro de auditoria de acesso às análises
+#Gravado em lote por app.services.auditoria_service, fora do caminho da requisição. Sem chaves
+#estrangeiras: o evento continua registrado depois que a análise é apagada
+class EventoAuditoria(Base):
+    __tablename__ = "eventos_auditoria"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    usuario_id = Column(Integer, nullable=False)
+    #criar, ler, listar, buscar, exportar ou deletar
+    acao = Column(String(20), nullable=False)
+    #Nulo em ações sobre várias análises (listar, buscar, deletar todas)
+    analysis_id = Column(Integer)
+    #api, lote ou job
+    origem = Column(String(20), nullable=False)
+    duracao_ms = Column(Float)
+    criado_em = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index('ix_eventos_auditoria_usuario_criado_em', 'usuario_id', 'criado_em'),
+    )
+
+#Modelo para Tokens Revogados (identificados pelo jti e removidos depois de expirar)
+class TokenRevogado(Base):
+    __tablename__ = "tokens_revogados"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    jti = Column(String(64), unique=True, index=True, nullable=False)
+    expira_em = Column(DateTime, nullable=False, index=True)
+    revogado_em = Column(DateTime, default=datetime.datetime.utcnow)
+
+#Modelo para o cache persistente de resultados de NLP
+class ResultadoCache(Base):
+    __tablename__ = "cache_resultados"
+
+    chave = Column(String(64), primary_key=True)
+    versao = Column(String(64), nullable=False, index=True)
+    resultado = Column(JSON, nullable=False)
+    criado_em = Column(DateTime, default=datetime.datetime.utcnow)
+
+#Modelo para jobs de análise em lote (fila persistida no banco)
+class JobAnalise(Base):
+    __tablename__ = "jobs_analise"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    usuario_id = Column(Integer, ForeignKey('usuarios.id'), nullable=False, index=True)
+    #importando (arquivo ainda sendo lido), pendente, executando, concluido, falhou ou cancelado
+    status = Column(String(20), nullable=False, default="pendente", index=True)
+    total = Column(Integer, nullable=False, default=0)
+    processados = Column(Integer, nullable=False, default=0)
+    falhas = Column(Integer, nullable=False, default=0)
+    tentativas = Column(Integer, nullable=False, default=0)
+    erro = Column(Text)
+    #Controle da fila: quando o job pode ser executado e qual worker o reservou
+    disponivel_em = Column(DateTime, default=datetime.datetime.utcnow)
+    worker = Column(String)
+    heartbeat_em = Column(DateTime)
+    criado_em = Column(DateTime, default=datetime.datetime.utcnow)
+    iniciado_em = Column(DateTime)
+    concluido_em = Column(DateTime)
+
+    itens = relationship("ItemJobAnalise", back_populates="job", cascade="all, delete-orphan")
+
+#Modelo para cada texto de um job de análise
+class ItemJobAnalise(Base):
+    __tablename__ = "jobs_analise_itens"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    job_id = Column(Integer, ForeignKey('jobs_analise.id'), nullable=False, index=True)
+    indice = Column(Integer, nullable=False)
+    texto = Column(Text, nullable=False)
+    #pendente, concluido ou falhou
+    status = Column(String(20), nullable=False, default="pendente")
+    #Indexado para desvincular os itens quando as análises são apagadas
+    analysis_id = Column(Integer, ForeignKey('analyses.id'), index=True)
+    erro = Column(String)
+
+    job = relationship("JobAnalise", back_populates="itens")
+    analysis = relationship("Analysis")
+
+#Modelo para a exclusão em segundo plano de todas as análises de um usuário
+#Apaga as análises existentes no pedido (id até limite_id) em lotes, cada um em uma transação curta
+class ExclusaoAnalises(Base):
+    __tablename__ = "exclusoes_analises"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    usuario_id = Column(Integer, ForeignKey('usuarios.id'), nullable=False, index=True)
+    #pendente, executando, concluido ou falhou
+    status = Column(String(20), nullable=False, default="pendente", index=True)
+    limite_id = Column(Integer, nullable=False, default=0)
+    total = Column(Integer, nullable=False, default=0)
+    removidas = Column(Integer, nullable=False, default=0)
+    tentativas = Column(Integer, nullable=False, default=0)
+    erro = Column(Text)
+    #Controle da fila, como nos jobs de análise
+    worker = Column(String)
+    heartbeat_em = Column(DateTime)
+    criado_em = Column(DateTime, default=datetime.datetime.utcnow)
+    iniciado_em = Column(DateTime)
+    concluido_em = Column(DateTime)
+
+#Modelo para as estatísticas agregadas de cada usuário
+#Atualizado na mesma transação em que análises são criadas ou removidas (app.services.estatisticas_service)
+class EstatisticaUsuario(Base):
+    __tablename__ = "estatisticas_usuario"
+
+    usuario_id = Column(Integer, ForeignKey('usuarios.id'), primary_key=True)
+    total_analises = Column(Integer, nullable=False, default=0)
+    total_palavras = Column(Integer, nullable=False, default=0)
+    total_caracteres = Column(Integer, nullable=False, default=0)
+    total_frases = Column(Integer, nullable=False, default=0)
+    #Soma e quantidade das pontuações de sentimento (análises antigas não têm pontuação)
+    soma_pontuacao_sentimento = Column(Float, nullable=False, default=0.0)
+    analises_com_pontuacao = Column(Integer, nullable=False, default=0)
+    primeira_analise_em = Column(DateTime)
+    ultima_analise_em = Column(DateTime)
+    atualizado_em = Column(DateTime, default=datetime.datetime.utcnow)
+
+#Modelo para as distribuições das estatísticas do usuário (dimensão "sentimento" ou "legibilidade")
+class ContagemEstatisticaUsuario(Base):
+    __tablename__ = "estatisticas_usuario_contagens"
+
+    usuario_id = Column(Integer, ForeignKey('usuarios.id'), primary_key=True)
+    dimensao = Column(String(20), primary_key=True)
+    valor = Column(String, primary_key=True)
+    quantidade = Column(Integer, nullable=False, default=0)
@@ -1,58 +1,181 @@
-#Modelos e configuração do banco de dados
-from fastapi import Depends, HTTPException # type: ignore
-from app.core.config import SECRET_KEY, ALGORITHM
-from app.core.security import oauth2_scheme
-from .analysis import Base, Usuario, TokenRevogado
-from sqlalchemy import create_engine # type: ignore
-from sqlalchemy.orm import sessionmaker, Session # type: ignore
-from jose import JWTError, jwt # type: ignore
-import os 
-
-#Detecta ambiente
-if os.getenv("ENVIRONMENT") == "production":
-    DATABASE_URL = os.getenv("DATABASE_URL")
-    #PostgreSQL
-    engine = create_engine(DATABASE_URL, pool_pre_ping=True)
-else:
-    #SQLite
-    DATABASE_URL = "sqlite:///./analises.db"
-    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-
-#Criação da sessão do banco de dados
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-# Criação das tabelas no banco de dados
-if os.getenv("ENVIRONMENT") != "production":
-    try:
-        Base.metadata.create_all(bind=engine)
-    except Exception as e:
-        import sys
-        print(f"Aviso: falha ao executar create_all: {e}", file=sys.stderr)
-
-
-#Dependência para pegar a sessão do banco de dados
-def pegar_session():
-    try:
-        Session = sessionmaker(bind=engine)
-        session = Session()
-        yield session
-
-    finally:
-        session.close()
-        
-#Dependência para pegar o usuário autenticado
-def pegar_usuario(token: str = Depends(oauth2_scheme), session: Session = Depends(pegar_session)):
-    try: 
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        id_usuario = int(payload.get("sub"))
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Não autorizado")
-
-    if session.query(TokenRevogado).filter_by(token=token).first():
-        raise HTTPException(status_code=401, detail="Token revogado")
-
-    usuario = session.query(Usuario).filter(Usuario.id == id_usuario).first()
-    if not usuario:
-        raise HTTPException(status_code=401, detail="Não autorizado")
-    
-    return usuario
+#Modelos e configuração do banco de dados
+from fastapi import Depends, HTTPException # type: ignore
+from app.core.config import (
+    SECRET_KEY, ALGORITHM, AUTH_CACHE_TAMANHO, AUTH_CACHE_TTL,
+    DB_POOL_TAMANHO, DB_POOL_EXTRA, DB_POOL_RECICLAR, DB_POOL_TIMEOUT, DB_TIMEOUT_CONSULTA,
+)
+from app.core.cache import CacheLRU
+from app.core.security import oauth2_scheme
+from app.core.sqlite import configurar_sqlite
+from .analysis import Base, Usuario
+from dataclasses import dataclass
+from sqlalchemy import create_engine, event # type: ignore
+from sqlalchemy.engine import make_url # type: ignore
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine # type: ignore
+from sqlalchemy.orm import Session, sessionmaker # type: ignore
+from jose import JWTError, jwt # type: ignore
+from app.services.revogacao_service import get_revogacoes, identificador_token
+from app.services.estatisticas_service import atualizar_estatisticas_flush
+from app.services.textos_service import armazenar_textos_flush
+from app.services.entidades_service import indexar_entidades_flush, remover_entidades_flush
+from app.services.analysis_service import desvincular_itens_jobs_flush
+from app.services.busca_service import indexar_busca_flush, remover_da_busca_flush
+import os 
+import time
+
+
+#URL com o driver assíncrono equivalente (asyncpg no PostgreSQL, aiosqlite no SQLite)
+def url_assincrona(url: str) -> str:
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+    #O asyncpg recebe o modo de SSL como "ssl" em vez de "sslmode"
+    if "sslmode" in url.query:
+        url = url.difference_update_query(["sslmode"]).update_query_dict({"ssl": url.query["sslmode"]})
+    return url.set(drivername="postgresql+asyncpg").render_as_string(hide_password=False)
+
+
+#Detecta ambiente
+if os.getenv("ENVIRONMENT") == "production":
+    DATABASE_URL = os.getenv("DATABASE_URL")
+else:
+    DATABASE_URL = "sqlite:///./analises.db"
+
+#SQLite: desenvolvimento ou implantações de um único servidor (DATABASE_URL=sqlite:///...)
+SQLITE = make_url(DATABASE_URL).get_backend_name() == "sqlite"
+
+if SQLITE:
+    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+    engine_async = create_async_engine(url_assincrona(DATABASE_URL))
+    #WAL e pragmas em toda conexão nova das duas engines
+    for motor in (engine, engine_async.sync_engine):
+        event.listen(motor, "connect", configurar_sqlite)
+else:
+    #PostgreSQL
+    pool = dict(
+        pool_size=DB_POOL_TAMANHO,
+        max_overflow=DB_POOL_EXTRA,
+        pool_recycle=DB_POOL_RECICLAR,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_pre_ping=True,
+    )
+    #Tempo máximo de cada consulta no servidor (ms, 0 = sem limite)
+    engine = create_engine(DATABASE_URL, connect_args={"options": f"-c statement_timeout={DB_TIMEOUT_CONSULTA}"}, **pool)
+    engine_async = create_async_engine(
+        url_assincrona(DATABASE_URL),
+        connect_args={"server_settings": {"statement_timeout": str(DB_TIMEOUT_CONSULTA)}},
+        **pool,
+    )
+
+#Sessões síncronas: workers de jobs, cache persistente, tarefas de fundo e CLI
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+#Sessões assíncronas: rotas da API (a conexão só é retirada do pool na primeira consulta)
+AsyncSessionLocal = async_sessionmaker(engine_async, autoflush=False, expire_on_commit=False)
+
+#Estatísticas por usuário atualizadas na mesma transação em que análises são criadas ou removidas
+#(vale para todas as sessões: rotas, commit em grupo e workers de jobs)
+event.listen(Session, "after_flush", atualizar_estatisticas_flush)
+#Textos das análises novas gravados (uma vez por conteúdo) antes das próprias análises
+event.listen(Session, "before_flush", armazenar_textos_flush)
+#Índice de entidades: as das análises removidas saem antes delas, as das novas entram depois
+event.listen(Session, "before_flush", remover_entidades_flush)
+event.listen(Session, "after_flush", indexar_entidades_flush)
+#Índice de busca por usuário, mantido da mesma forma
+event.listen(Session, "before_flush", remover_da_busca_flush)
+event.listen(Session, "after_flush", indexar_busca_flush)
+#Itens de jobs desvinculados das análises removidas (a chave estrangeira não tem ON DELETE)
+event.listen(Session, "before_flush", desvincular_itens_jobs_flush)
+
+# Criação das tabelas no banco de dados
+if os.getenv("ENVIRONMENT") != "production":
+    try:
+        Base.metadata.create_all(bind=engine)
+    except Exception as e:
+        import sys
+        print(f"Aviso: falha ao executar create_all: {e}", file=sys.stderr)
+
+
+#Dependência para pegar a sessão do banco de dados
+async def pegar_session():
+    async with AsyncSessionLocal() as session:
+        yield session
+
+#Dados do usuário autenticado mantidos em cache (somente leitura)
+@dataclass(frozen=True)
+class UsuarioAutenticado:
+    id: int
+    nome: str
+    email: str
+    admin: bool
+
+    @classmethod
+    def de_usuario(cls, usuario: Usuario) -> "UsuarioAutenticado":
+        return cls(id=usuario.id, nome=usuario.nome, email=usuario.email, admin=bool(usuario.admin))
+
+
+#Cache por processo: token já validado -> (id do usuário, expiração do JWT) e id -> usuário
+cache_tokens = CacheLRU(AUTH_CACHE_TAMANHO, AUTH_CACHE_TTL)
+cache_usuarios = CacheLRU(AUTH_CACHE_TAMANHO, AUTH_CACHE_TTL)
+
+
+#Remove o token do cache (logout)
+def invalidar_token(token: str) -> None:
+    cache_tokens.invalidar(token)
+
+
+#Dados do usuário alterados ou removidos: a próxima requisição busca no banco
+@event.listens_for(Usuario, "after_update")
+@event.listens_for(Usuario, "after_delete")
+def invalidar_usuario(mapper, connection, usuario: Usuario) -> None:
+    cache_usuarios.invalidar(usuario.id)
+
+
+#Métricas dos caches de autenticação
+def estatisticas_cache_autenticacao() -> dict:
+    return {
+        "tokens": cache_tokens.estatisticas(),
+        "usuarios": cache_usuarios.estatisticas(),
+    }
+
+
+#Valida o token (assinatura, expiração e revogação) e retorna o id do usuário
+async def validar_token(token: str, session: AsyncSession) -> int:
+    em_cache = cache_tokens.obter(token)
+    if em_cache is not None:
+        id_usuario, expira_em = em_cache
+        if expira_em > time.time():
+            return id_usuario
+        cache_tokens.invalidar(token)
+
+    try: 
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        id_usuario = int(payload.get("sub"))
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Não autorizado")
+
+    if await get_revogacoes().revogado(session, identificador_token(token, payload)):
+        raise HTTPException(status_code=401, detail="Token revogado")
+
+    cache_tokens.salvar(token, (id_usuario, payload.get("exp", 0)))
+    return id_usuario
+
+#Dependência para pegar o usuário autenticado
+#Em regime, tokens e usuários vêm do cache, sem consultas ao banco
+async def pegar_usuario(token: str = Depends(oauth2_scheme), session: AsyncSession = Depends(pegar_session)):
+    id_usuario = await validar_token(token, session)
+
+    usuario = cache_usuarios.obter(id_usuario)
+    if usuario is None:
+        registro = await session.get(Usuario, id_usuario)
+        if not registro:
+            raise HTTPException(status_code=401, detail="Não autorizado")
+        usuario = UsuarioAutenticado.de_usuario(registro)
+        cache_usuarios.salvar(id_usuario, usuario)
+    
+    return usuario
+
+#Dependência para rotas administrativas
+async def pegar_usuario_admin(usuario: Usuario = Depends(pegar_usuario)):
+    if not usuario.admin:
+        raise HTTPException(status_code=403, detail="Acesso restrito a administradores")
+    return usuario
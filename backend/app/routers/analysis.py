@@ -1,150 +1,307 @@
-#Rotas de análise de texto
-from fastapi import APIRouter, Depends, HTTPException # type: ignore
-from sqlalchemy.orm import Session # type: ignore
-from typing import List # type: ignore
-from app.services.ml_service import TopicClassifier
-from app.services.nlp_service import NLPService 
-from app.models.analysis import Analysis, AnalysisHistorico, Usuario
-from app.models.db import pegar_session, pegar_usuario
-from app.schemas import AnalysisResponseSchema, AnalysisRequestSchema, TopicResponse
-
-#instância do classificador de tópicos 
-from functools import lru_cache
-
-@lru_cache()
-def get_topic_classifier():
-    return TopicClassifier()
-
-#Definição do roteador de análise
-analysis_router = APIRouter(prefix='/analysis', tags=['analysis'])
-
-@analysis_router.get("/analyze")
-async def rota_basica_analise():
-    return {"message": "Rota básica de análise."}
-
-# Rota para criar uma nova análise de texto
-@analysis_router.post("/analysis", response_model=AnalysisResponseSchema)
-async def criar_analise(analysis_request: AnalysisRequestSchema, db: Session = Depends(pegar_session), usuario: Usuario = Depends(pegar_usuario)):
-    #Instância do serviço de NLP
-    nlp_service = NLPService()
-    
-    #Realiza a análise de texto usando o serviço de NLP
-    try:
-        resultado = nlp_service.analisar_texto(
-            analysis_request.texto_original
-        )
-    except ValueError as e:
-        raise HTTPException(
-            status_code=400,
-            detail=str(e)
-        )
-    
-    #Cria uma nova entrada de análise no banco de dados
-    novo_historico = AnalysisHistorico(
-        analysis_id=None,
-        usuario_id=usuario.id
-    )
-
-    #Cria uma nova análise com os resultados obtidos
-    novo_analysis = Analysis(
-        usuario_id=usuario.id,
-        texto_original=analysis_request.texto_original,
-        sentimento=resultado["sentimento"],
-        palavra_mais_frequente=resultado["palavra_mais_frequente"],
-        entidades=resultado["entidades"],
-        lvl_legibilidade=resultado["lvl_legibilidade"],
-        cont_palavras=resultado["cont_palavras"],
-        cont_caracteres=resultado["cont_caracteres"],
-        cont_frases=resultado["cont_frases"]
-    )
-
-    #Adiciona e confirma as novas entradas no banco de dados
-    db.add(novo_analysis)
-    db.add(novo_historico)
-    db.commit()
-    db.refresh(novo_analysis)
-    db.refresh(novo_historico)
-    return {
-        "id": novo_analysis.id,
-        "texto_original": novo_analysis.texto_original,
-        "sentimento": novo_analysis.sentimento,
-        "palavra_mais_frequente": novo_analysis.palavra_mais_frequente,
-        "entidades": novo_analysis.entidades,
-        "lvl_legibilidade": novo_analysis.lvl_legibilidade,
-        "cont_palavras": novo_analysis.cont_palavras,
-        "cont_caracteres": novo_analysis.cont_caracteres,
-        "cont_frases": novo_analysis.cont_frases,
-        "criado_em": novo_analysis.criado_em
-    }
-
-#Rota para obter estatísticas de análises do usuário
-@analysis_router.get("/stats")
-async def status_analise(usuario: Usuario = Depends(pegar_usuario), session: Session = Depends(pegar_session)):
-    total_analises = session.query(Analysis).filter(Analysis.usuario_id == usuario.id).count()
-    
-    return {"total_analises": total_analises}
-
-#Rota para ler o histórico de análises do usuário
-@analysis_router.get("/history", response_model=List[AnalysisResponseSchema])
-async def ler_historico_analise(usuario: Usuario = Depends(pegar_usuario), session: Session = Depends(pegar_session), skip: int = 0, limit: int = 10):    
-    analises = session.query(Analysis).filter(Analysis.usuario_id == usuario.id).order_by(Analysis.criado_em.desc()).offset(skip).limit(limit).all()
-    
-    resultado = []
-    for analise in analises:
-        resultado.append({
-            "id": analise.id,
-            "texto_original": analise.texto_original,
-            "sentimento": analise.sentimento,
-            "palavra_mais_frequente": analise.palavra_mais_frequente,
-            "entidades": analise.entidades,
-            "lvl_legibilidade": analise.lvl_legibilidade,
-            "cont_palavras": analise.cont_palavras,
-            "cont_caracteres": analise.cont_caracteres,
-            "cont_frases": analise.cont_frases,
-            "criado_em": analise.criado_em
-        })
-        
-    return resultado
-
-#Rota para ler uma análise específica por ID
-@analysis_router.get("/{analysis_id}", response_model=AnalysisResponseSchema)
-async def ler_analise_por_id(analysis_id: int, usuario: Usuario = Depends(pegar_usuario), session: Session = Depends(pegar_session)):
-    analise = session.query(Analysis).filter(Analysis.id == analysis_id, Analysis.usuario_id == usuario.id).first()
-    
-    if not analise:
-        raise HTTPException(status_code=404, detail="Análise não encontrada.")
-    
-    return analise
-
-#Rota para deletar uma análise específica por ID
-@analysis_router.delete("/{analysis_id}")
-async def deletar_analise(analysis_id: int, usuario: Usuario = Depends(pegar_usuario), session: Session = Depends(pegar_session)):
-    analise = session.query(Analysis).filter(Analysis.id == analysis_id, Analysis.usuario_id == usuario.id).first()
-    
-    if not analise:
-        raise HTTPException(status_code=404, detail="Análise não encontrada.")
-    
-    session.delete(analise)
-    session.commit()
-    
-    return {"message": "Análise deletada com sucesso."}
-
-#Rota para deletar todas as análises do usuário
-@analysis_router.delete("")
-async def deletar_todas_analises(usuario: Usuario = Depends(pegar_usuario), session: Session = Depends(pegar_session)):
-    session.query(Analysis).filter(Analysis.usuario_id == usuario.id).delete()
-    session.commit()
-    
-    return {"message": "Todas as análises foram deletadas com sucesso."}
-
-#Rota para classificar o tópico do texto
-@analysis_router.post("/topic", response_model=TopicResponse)
-def classify_topic(request: AnalysisRequestSchema, usuario: Usuario = Depends(pegar_usuario)):
-    classifier = get_topic_classifier()
-    resultados = classifier.predict(request.texto_original)
-
-    return {
-        "texto": request.texto_original,
-        "topicos": resultados,
-        "topico_principal": resultados[0]["topico"]
-    }
\ No newline at end of file
+#Rotas de análise de texto
+from fastapi import APIRouter, Depends, HTTPException, Query, Response # type: ignore
+from fastapi.responses import StreamingResponse # type: ignore
+from starlette.background import BackgroundTask # type: ignore
+from sqlalchemy import select, tuple_ # type: ignore
+from sqlalchemy.ext.asyncio import AsyncSession # type: ignore
+from typing import Dict, List, Optional, Union # type: ignore
+from datetime import datetime
+from app.services.ml_service import TopicClassifier
+from app.services.treino_service import aprender_exemplos
+from app.services.pool_service import PoolAnalise, get_pool_analise
+from app.services.gravacao_service import GravadorEmGrupo, get_gravador
+from app.services.auditoria_service import RegistroAuditoria, duracao_ms, get_registro_auditoria
+from app.services.estatisticas_service import ler_estatisticas
+from app.services.exportacao_service import FORMATOS, consulta_exportacao, exportar
+from app.services.busca_service import buscar
+from app.services.entidades_service import TIPOS, consulta_analises_entidade, entidades_principais
+from app.services.exclusao_service import ExecutorExclusoes, get_executor_exclusoes, serializar_exclusao, solicitar_exclusao
+from app.models.analysis import Analysis, ContagemEstatisticaUsuario, EntidadeAnalise, EstatisticaUsuario, ExclusaoAnalises, Usuario
+from app.models.db import AsyncSessionLocal, pegar_session, pegar_usuario, pegar_usuario_admin
+from app.schemas import AnalysisResponseSchema, AnalysisResumoSchema, BuscaResultadoSchema, EntidadeContagemSchema, EstatisticasResponseSchema, AnalysisRequestSchema, AnalysisBatchRequestSchema, AnalysisBatchResponseSchema, ExclusaoResponseSchema, TopicResponse, TopicBatchRequestSchema, TopicBatchResponseSchema, TopicExemplosRequestSchema, TopicExemplosResponseSchema
+from app.services.analysis_service import nova_analise, serializar_analise, consulta_resumo, codificar_cursor, decodificar_cursor, utc_sem_fuso
+from app.core.config import NLP_BATCH_SIZE
+import time
+
+#instância do classificador de tópicos 
+from functools import lru_cache
+
+@lru_cache()
+def get_topic_classifier():
+    return TopicClassifier()
+
+#Definição do roteador de análise
+analysis_router = APIRouter(prefix='/analysis', tags=['analysis'])
+
+@analysis_router.get("/analyze")
+async def rota_basica_analise():
+    return {"message": "Rota básica de análise."}
+
+# Rota para criar uma nova análise de texto
+@analysis_router.post("/analysis", response_model=AnalysisResponseSchema)
+async def criar_analise(analysis_request: AnalysisRequestSchema, db: AsyncSession = Depends(pegar_session), usuario: Usuario = Depends(pegar_usuario), pool: PoolAnalise = Depends(get_pool_analise), gravador: GravadorEmGrupo = Depends(get_gravador), auditoria: RegistroAuditoria = Depends(get_registro_auditoria)):
+    inicio = time.perf_counter()
+    #Realiza a análise de texto usando o serviço de NLP
+    try:
+        resultado = await pool.analisar(
+            analysis_request.texto_original
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
+    
+    #Cria uma nova análise com os resultados obtidos
+    novo_analysis = nova_analise(usuario.id, analysis_request.texto_original, resultado)
+
+    #Adiciona e confirma as novas entradas no banco de dados (no SQLite, em um commit compartilhado com outras requisições)
+    await gravador.gravar(db, [novo_analysis])
+    auditoria.registrar(usuario.id, "criar", novo_analysis.id, duracao=duracao_ms(inicio))
+    return serializar_analise(novo_analysis)
+
+# Rota para analisar vários textos em uma única requisição
+@analysis_router.post("/analysis/batch", response_model=AnalysisBatchResponseSchema)
+async def criar_analises_lote(lote_request: AnalysisBatchRequestSchema, db: AsyncSession = Depends(pegar_session), usuario: Usuario = Depends(pegar_usuario), pool: PoolAnalise = Depends(get_pool_analise), auditoria: RegistroAuditoria = Depends(get_registro_auditoria)):
+    inicio = time.perf_counter()
+    itens = await pool.analisar_lote(
+        lote_request.textos,
+        batch_size=lote_request.batch_size or NLP_BATCH_SIZE,
+    )
+
+    #Cria as análises válidas; erros de validação são devolvidos por item
+    novas_analises = {}
+    for indice, item in enumerate(itens):
+        if item["resultado"] is not None:
+            novas_analises[indice] = nova_analise(usuario.id, lote_request.textos[indice], item["resultado"])
+
+    #Todas as análises do lote são gravadas em uma única transação
+    db.add_all(novas_analises.values())
+    await db.flush()
+
+    resultados = []
+    for indice, item in enumerate(itens):
+        analise = novas_analises.get(indice)
+        resultados.append({
+            "indice": indice,
+            "analise": serializar_analise(analise) if analise is not None else None,
+            "erro": item["erro"],
+        })
+    await db.commit()
+
+    #Um evento por análise criada, com a duração da requisição inteira
+    duracao = duracao_ms(inicio)
+    for analise in novas_analises.values():
+        auditoria.registrar(usuario.id, "criar", analise.id, origem="lote", duracao=duracao)
+
+    return {
+        "total": len(itens),
+        "sucesso": len(novas_analises),
+        "falhas": len(itens) - len(novas_analises),
+        "resultados": resultados,
+    }
+
+#Rota para obter estatísticas de análises do usuário
+#Lê os agregados mantidos a cada inserção/remoção, sem percorrer a tabela de análises
+@analysis_router.get("/stats", response_model=EstatisticasResponseSchema)
+async def status_analise(usuario: Usuario = Depends(pegar_usuario), session: AsyncSession = Depends(pegar_session)):
+    estatistica = await session.get(EstatisticaUsuario, usuario.id)
+    contagens = await session.execute(
+        select(ContagemEstatisticaUsuario.dimensao, ContagemEstatisticaUsuario.valor, ContagemEstatisticaUsuario.quantidade)
+        .where(ContagemEstatisticaUsuario.usuario_id == usuario.id)
+    )
+    
+    return ler_estatisticas(estatistica, contagens)
+
+#Rota para consultar as métricas do cache de resultados de NLP
+@analysis_router.get("/cache")
+async def estatisticas_cache(usuario: Usuario = Depends(pegar_usuario), pool: PoolAnalise = Depends(get_pool_analise)):
+    return {
+        "versao": pool.versao,
+        **pool.cache.estatisticas(),
+    }
+
+#Rota para ler o histórico de análises do usuário
+#Paginação por cursor sobre o índice (usuario_id, criado_em, id): o cabeçalho X-Next-Cursor traz o
+#cursor da próxima página e não é enviado na última. Com resumo=true, só um trecho do texto é lido
+@analysis_router.get("/history", response_model=List[Union[AnalysisResponseSchema, AnalysisResumoSchema]])
+async def ler_historico_analise(response: Response, usuario: Usuario = Depends(pegar_usuario), session: AsyncSession = Depends(pegar_session), auditoria: RegistroAuditoria = Depends(get_registro_auditoria), cursor: Optional[str] = None, resumo: bool = False, skip: int = 0, limit: int = Query(default=10, ge=1, le=100)):    
+    inicio = time.perf_counter()
+    consulta = (
+        consulta_resumo() if resumo else select(Analysis)
+    ).where(Analysis.usuario_id == usuario.id).order_by(Analysis.criado_em.desc(), Analysis.id.desc()).limit(limit)
+
+    if cursor:
+        try:
+            criado_em, id_analise = decodificar_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        consulta = consulta.where(tuple_(Analysis.criado_em, Analysis.id) < tuple_(criado_em, id_analise))
+    elif skip:
+        #Paginação antiga por deslocamento (mantida por compatibilidade; fica mais lenta nas páginas finais)
+        consulta = consulta.offset(skip)
+
+    if resumo:
+        analises = [dict(linha._mapping) for linha in await session.execute(consulta)]
+    else:
+        analises = [serializar_analise(analise) for analise in await session.scalars(consulta)]
+
+    if len(analises) == limit:
+        ultima = analises[-1]
+        response.headers["X-Next-Cursor"] = codificar_cursor(ultima["criado_em"], ultima["id"])
+    auditoria.registrar(usuario.id, "listar", duracao=duracao_ms(inicio))
+    return analises
+
+#Rota de busca textual nas análises do usuário, da mais relevante para a menos relevante
+#Todos os termos são obrigatórios; "frases entre aspas" e -termo (exclusão) são aceitos
+@analysis_router.get("/search", response_model=List[BuscaResultadoSchema])
+async def buscar_analises(q: str = Query(min_length=1, max_length=200), usuario: Usuario = Depends(pegar_usuario), session: AsyncSession = Depends(pegar_session), auditoria: RegistroAuditoria = Depends(get_registro_auditoria), skip: int = Query(default=0, ge=0), limit: int = Query(default=10, ge=1, le=50)):
+    inicio = time.perf_counter()
+    resultados = await buscar(session, usuario.id, q, skip, limit)
+    auditoria.registrar(usuario.id, "buscar", duracao=duracao_ms(inicio))
+    return resultados
+
+#Rota para as entidades mais mencionadas pelo usuário: as `limit` primeiras de cada tipo, por número
+#de análises, opcionalmente só no período [inicio, fim). Contadas no banco pelo índice de entidades
+@analysis_router.get("/entidades", response_model=Dict[str, List[EntidadeContagemSchema]])
+async def ler_entidades_principais(usuario: Usuario = Depends(pegar_usuario), session: AsyncSession = Depends(pegar_session), tipo: Optional[str] = Query(default=None, pattern="^(PER|ORG|LOC)$"), inicio: Optional[datetime] = None, fim: Optional[datetime] = None, limit: int = Query(default=10, ge=1, le=100)):
+    return await entidades_principais(session, usuario.id, [tipo] if tipo else TIPOS, limit, utc_sem_fuso(inicio), utc_sem_fuso(fim))
+
+#Rota para as análises do usuário que mencionam uma entidade (texto comparado sem acentos nem
+#maiúsculas), mais recentes primeiro, com o mesmo resumo e paginação por cursor do histórico
+@analysis_router.get("/entidades/analises", response_model=List[AnalysisResumoSchema])
+async def ler_analises_por_entidade(response: Response, texto: str = Query(min_length=1, max_length=200), tipo: str = Query(pattern="^(PER|ORG|LOC)$"), usuario: Usuario = Depends(pegar_usuario), session: AsyncSession = Depends(pegar_session), auditoria: RegistroAuditoria = Depends(get_registro_auditoria), cursor: Optional[str] = None, limit: int = Query(default=10, ge=1, le=100)):
+    inicio = time.perf_counter()
+    consulta = consulta_analises_entidade(usuario.id, tipo, texto).limit(limit)
+    if cursor:
+        try:
+            criado_em, id_analise = decodificar_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        consulta = consulta.where(tuple_(EntidadeAnalise.criado_em, EntidadeAnalise.analysis_id) < tuple_(criado_em, id_analise))
+
+    analises = [dict(linha._mapping) for linha in await session.execute(consulta)]
+    if len(analises) == limit:
+        ultima = analises[-1]
+        response.headers["X-Next-Cursor"] = codificar_cursor(ultima["criado_em"], ultima["id"])
+    auditoria.registrar(usuario.id, "listar", duracao=duracao_ms(inicio))
+    return analises
+
+#Rota para exportar todo o histórico (ou o período/sentimento filtrado) em NDJSON ou CSV
+#A resposta é enviada em blocos à medida que as linhas são lidas do banco
+@analysis_router.get("/export")
+async def exportar_historico(usuario: Usuario = Depends(pegar_usuario), auditoria: RegistroAuditoria = Depends(get_registro_auditoria), formato: str = Query(default="ndjson", pattern="^(ndjson|csv)$"), inicio: Optional[datetime] = None, fim: Optional[datetime] = None, sentimento: Optional[str] = None):
+    inicio_exportacao = time.perf_counter()
+    consulta = consulta_exportacao(usuario.id, utc_sem_fuso(inicio), utc_sem_fuso(fim), sentimento)
+    #A consulta roda (e o primeiro bloco é lido) antes da resposta: erros ainda viram 4xx/5xx
+    session, blocos = await exportar(AsyncSessionLocal, consulta, formato)
+
+    #Evento registrado ao fim do envio, com a duração da exportação inteira
+    async def corpo():
+        try:
+            async for bloco in blocos:
+                yield bloco
+        finally:
+            auditoria.registrar(usuario.id, "exportar", duracao=duracao_ms(inicio_exportacao))
+
+    #A sessão também é fechada se o cliente desconectar antes do primeiro bloco
+    return StreamingResponse(
+        corpo(),
+        media_type=FORMATOS[formato],
+        headers={"Content-Disposition": f'attachment; filename="analises.{formato}"'},
+        background=BackgroundTask(session.close),
+    )
+
+#Rota para acompanhar a exclusão de todas as análises
+@analysis_router.get("/exclusoes/{exclusao_id}", response_model=ExclusaoResponseSchema)
+async def ler_exclusao(exclusao_id: int, usuario: Usuario = Depends(pegar_usuario), session: AsyncSession = Depends(pegar_session)):
+    exclusao = await session.scalar(select(ExclusaoAnalises).where(ExclusaoAnalises.id == exclusao_id, ExclusaoAnalises.usuario_id == usuario.id))
+    if not exclusao:
+        raise HTTPException(status_code=404, detail="Exclusão não encontrada.")
+    return serializar_exclusao(exclusao)
+
+#Rota para ler uma análise específica por ID
+@analysis_router.get("/{analysis_id}", response_model=AnalysisResponseSchema)
+async def ler_analise_por_id(analysis_id: int, usuario: Usuario = Depends(pegar_usuario), session: AsyncSession = Depends(pegar_session), auditoria: RegistroAuditoria = Depends(get_registro_auditoria)):
+    inicio = time.perf_counter()
+    analise = await session.scalar(select(Analysis).where(Analysis.id == analysis_id, Analysis.usuario_id == usuario.id))
+    
+    if not analise:
+        raise HTTPException(status_code=404, detail="Análise não encontrada.")
+    
+    auditoria.registrar(usuario.id, "ler", analise.id, duracao=duracao_ms(inicio))
+    return serializar_analise(analise)
+
+#Rota para deletar uma análise específica por ID
+@analysis_router.delete("/{analysis_id}")
+async def deletar_analise(analysis_id: int, usuario: Usuario = Depends(pegar_usuario), session: AsyncSession = Depends(pegar_session), auditoria: RegistroAuditoria = Depends(get_registro_auditoria)):
+    inicio = time.perf_counter()
+    analise = await session.scalar(select(Analysis).where(Analysis.id == analysis_id, Analysis.usuario_id == usuario.id))
+    
+    if not analise:
+        raise HTTPException(status_code=404, detail="Análise não encontrada.")
+    
+    await session.delete(analise)
+    await session.commit()
+    auditoria.registrar(usuario.id, "deletar", analysis_id, duracao=duracao_ms(inicio))
+    
+    return {"message": "Análise deletada com sucesso."}
+
+#Rota para deletar todas as análises do usuário
+#Responde 202 na hora; as análises são apagadas em lotes em segundo plano e o progresso é
+#consultado em /analysis/exclusoes/{id}
+@analysis_router.delete("", response_model=ExclusaoResponseSchema, status_code=202)
+async def deletar_todas_analises(usuario: Usuario = Depends(pegar_usuario), session: AsyncSession = Depends(pegar_session), auditoria: RegistroAuditoria = Depends(get_registro_auditoria), executor: ExecutorExclusoes = Depends(get_executor_exclusoes)):
+    inicio = time.perf_counter()
+    exclusao = await solicitar_exclusao(session, usuario.id)
+    executor.notificar()
+    auditoria.registrar(usuario.id, "deletar", duracao=duracao_ms(inicio))
+    
+    return serializar_exclusao(exclusao)
+
+#Rota para classificar o tópico do texto
+@analysis_router.post("/topic", response_model=TopicResponse)
+def classify_topic(request: AnalysisRequestSchema, usuario: Usuario = Depends(pegar_usuario)):
+    classifier = get_topic_classifier()
+    resultados = classifier.predict(request.texto_original)
+
+    return {
+        "texto": request.texto_original,
+        "topicos": resultados,
+        "topico_principal": resultados[0]["topico"]
+    }
+
+#Rota para classificar o tópico de vários textos de uma vez
+@analysis_router.post("/topic/batch", response_model=TopicBatchResponseSchema)
+def classify_topic_batch(request: TopicBatchRequestSchema, usuario: Usuario = Depends(pegar_usuario)):
+    classifier = get_topic_classifier()
+    resultados = classifier.predict_many(request.textos, k=request.k)
+
+    return {
+        "total": len(resultados),
+        "resultados": [
+            {"indice": indice, "topicos": topicos, "topico_principal": topicos[0]["topico"]}
+            for indice, topicos in enumerate(resultados)
+        ]
+    }
+
+#Rota administrativa para ensinar novos exemplos rotulados ao modelo de tópicos incremental
+@analysis_router.post("/topic/exemplos", response_model=TopicExemplosResponseSchema)
+def aprender_exemplos_topico(request: TopicExemplosRequestSchema, usuario: Usuario = Depends(pegar_usuario_admin)):
+    try:
+        metadados, aprendidos = aprender_exemplos([(exemplo.texto, exemplo.topico) for exemplo in request.exemplos])
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    #Este worker passa a usar o modelo atualizado; os demais recarregam ao perceber a mudança
+    classifier = get_topic_classifier()
+    if classifier.modelo == "incremental":
+        classifier.recarregar()
+
+    return {
+        "recebidos": len(request.exemplos),
+        "aprendidos": aprendidos,
+        "ignorados": len(request.exemplos) - aprendidos,
+        "exemplos_total": metadados["exemplos"],
+        "topicos": metadados["topicos"],
+    }
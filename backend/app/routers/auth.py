@@ -1,121 +1,134 @@
-#Rotas de autenticação e gerenciamento de usuários
-from fastapi import APIRouter, Depends, HTTPException, Header, Request # type: ignore
-from fastapi.security import OAuth2PasswordRequestForm # type: ignore
-from app.models.analysis import Usuario, TokenRevogado
-from typing import Optional # type: ignore
-from app.models.db import pegar_usuario, pegar_session
-from app.core.security import bcrypt_context, oauth2_scheme
-from app.core.config import ACCESS_TOKEN_EXPIRE_MINUTES, ALGORITHM, SECRET_KEY
-from app.schemas import UsuarioSchema, LoginSchema, UsuarioMeSchema
-from sqlalchemy.orm import Session # type: ignore
-from jose import jwt, JWTError # type: ignore
-from datetime import datetime, timedelta, timezone # type: ignore
-
-#Definição do roteador de autenticação
-auth_router = APIRouter(prefix="/auth", tags=['auth'])
-
-#Função para criar token JWT
-def criar_token(id_usuario: int, duracao_token=timedelta(minutes=int(ACCESS_TOKEN_EXPIRE_MINUTES))):
-    data_expiracao = datetime.now(timezone.utc) + duracao_token
-    dic_info = {"sub": str(id_usuario), "exp": data_expiracao}
-    jwt_encoded = jwt.encode(dic_info, SECRET_KEY, algorithm=ALGORITHM)
-    return jwt_encoded
-
-#Função para autenticar usuário
-def autenticar_usuario(email, senha, session):
-    usuario = session.query(Usuario).filter(Usuario.email == email).first()
-    if not usuario:
-        return False
-    elif not bcrypt_context.verify(senha, usuario.senha):
-        return False
-    return usuario
-
-@auth_router.get("/auth")
-async def rota_basica_auth():
-    return {"message": "Rota básica de autenticação."}
-
-#Rota para criar uma nova conta de usuário
-@auth_router.post("/criar_conta")
-async def criar_conta(usuario_schema: UsuarioSchema, session: Session = Depends(pegar_session)):
-    usuario = session.query(Usuario).filter(Usuario.email == usuario_schema.email).first()
-    
-    if usuario:
-        raise HTTPException(status_code=400, detail="Email já cadastrado.")
-
-    total_usuarios = session.query(Usuario).count()
-    usuario_final_admin = (total_usuarios == 0)
-
-    #Senha criptografada
-    senha_criptografada = bcrypt_context.hash(usuario_schema.senha)
-    novo_usuario = Usuario(
-        nome=usuario_schema.nome, 
-        email=usuario_schema.email, 
-        senha=senha_criptografada,
-        admin=usuario_final_admin
-    )
-
-    session.add(novo_usuario)
-    session.commit()
-    
-    return {
-        "message": "Usuário criado com sucesso.",
-        "id": novo_usuario.id,
-        "email": novo_usuario.email,
-        "admin": novo_usuario.admin
-    }
-
-#Rota para login de usuário
-@auth_router.post("/login")
-async def login(login_schema: LoginSchema, session: Session = Depends(pegar_session)):
-    usuario = autenticar_usuario(login_schema.email, login_schema.senha, session)
-    if not usuario:
-        raise HTTPException(status_code=401, detail="Email ou senha inválidos.")
-    access_token = criar_token(usuario.id)
-    refresh_token = criar_token(usuario.id, duracao_token=timedelta(days=7))
-    return {
-        "access_token": access_token,
-        "refresh_token": refresh_token,
-        "token_type": "bearer"
-    }
-
-#Rota para login de usuário via formulário
-@auth_router.post("/login-form")
-async def login_form(request: Request, session: Session = Depends(pegar_session)):
-    form = await request.form()
-    username = form.get("username")
-    password = form.get("password")
-    if not username or not password:
-        raise HTTPException(status_code=400, detail="username and password are required.")
-    usuario = autenticar_usuario(username, password, session)
-    if not usuario:
-        raise HTTPException(status_code=401, detail="Email ou senha inválidos.")
-    access_token = criar_token(usuario.id)
-    return {
-        "access_token": access_token,
-        "token_type": "bearer"
-    }
-
-#Rota para usar o refresh token e obter um novo access token
-@auth_router.get("/refresh_token")
-async def use_refresh_token(usuario: Usuario = Depends(pegar_usuario)):
-    access_token = criar_token(usuario.id)
-    return {
-        "access_token": access_token,
-        "token_type": "bearer"
-    }
-
-#Rota para logout de usuário
-@auth_router.post("/logout")
-async def logout(token: str = Depends(oauth2_scheme), session: Session = Depends(pegar_session)):
-    session.add(TokenRevogado(token=token))
-    session.commit()
-    return {"message": "Logout realizado com sucesso."}
-
-#Rota para ler os dados do usuário atual
-@auth_router.get("/me", response_model=UsuarioMeSchema)
-async def ler_usuario_atual(usuario: Usuario = Depends(pegar_usuario)):
-    return {
-        "nome": usuario.nome,
-        "email": usuario.email,
-        "admin": usuario.admin,
+#Rotas de autenticação e gerenciamento de usuários
+from fastapi import APIRouter, Depends, HTTPException, Header, Request # type: ignore
+from fastapi.concurrency import run_in_threadpool # type: ignore
+from fastapi.security import OAuth2PasswordRequestForm # type: ignore
+from app.models.analysis import Usuario
+from typing import Optional # type: ignore
+from app.models.db import pegar_usuario, pegar_session, invalidar_token
+from app.services.revogacao_service import get_revogacoes, identificador_token
+from app.core.security import bcrypt_context, oauth2_scheme
+from app.core.config import ACCESS_TOKEN_EXPIRE_MINUTES, ALGORITHM, SECRET_KEY
+from app.schemas import UsuarioSchema, LoginSchema, UsuarioMeSchema
+from sqlalchemy import func, select # type: ignore
+from sqlalchemy.ext.asyncio import AsyncSession # type: ignore
+from jose import jwt, JWTError # type: ignore
+from datetime import datetime, timedelta, timezone # type: ignore
+import uuid
+
+#Definição do roteador de autenticação
+auth_router = APIRouter(prefix="/auth", tags=['auth'])
+
+#Função para criar token JWT
+def criar_token(id_usuario: int, duracao_token=timedelta(minutes=int(ACCESS_TOKEN_EXPIRE_MINUTES))):
+    data_expiracao = datetime.now(timezone.utc) + duracao_token
+    dic_info = {"sub": str(id_usuario), "exp": data_expiracao, "jti": uuid.uuid4().hex}
+    jwt_encoded = jwt.encode(dic_info, SECRET_KEY, algorithm=ALGORITHM)
+    return jwt_encoded
+
+#Função para autenticar usuário
+#O bcrypt é lento de propósito, então roda em thread para não bloquear o event loop
+async def autenticar_usuario(email, senha, session: AsyncSession):
+    usuario = await session.scalar(select(Usuario).where(Usuario.email == email))
+    if not usuario:
+        return False
+    elif not await run_in_threadpool(bcrypt_context.verify, senha, usuario.senha):
+        return False
+    return usuario
+
+@auth_router.get("/auth")
+async def rota_basica_auth():
+    return {"message": "Rota básica de autenticação."}
+
+#Rota para criar uma nova conta de usuário
+@auth_router.post("/criar_conta")
+async def criar_conta(usuario_schema: UsuarioSchema, session: AsyncSession = Depends(pegar_session)):
+    usuario = await session.scalar(select(Usuario).where(Usuario.email == usuario_schema.email))
+    
+    if usuario:
+        raise HTTPException(status_code=400, detail="Email já cadastrado.")
+
+    total_usuarios = await session.scalar(select(func.count()).select_from(Usuario))
+    usuario_final_admin = (total_usuarios == 0)
+
+    #Senha criptografada
+    senha_criptografada = await run_in_threadpool(bcrypt_context.hash, usuario_schema.senha)
+    novo_usuario = Usuario(
+        nome=usuario_schema.nome, 
+        email=usuario_schema.email, 
+        senha=senha_criptografada,
+        admin=usuario_final_admin
+    )
+
+    session.add(novo_usuario)
+    await session.commit()
+    
+    return {
+        "message": "Usuário criado com sucesso.",
+        "id": novo_usuario.id,
+        "email": novo_usuario.email,
+        "admin": novo_usuario.admin
+    }
+
+#Rota para login de usuário
+@auth_router.post("/login")
+async def login(login_schema: LoginSchema, session: AsyncSession = Depends(pegar_session)):
+    usuario = await autenticar_usuario(login_schema.email, login_schema.senha, session)
+    if not usuario:
+        raise HTTPException(status_code=401, detail="Email ou senha inválidos.")
+    access_token = criar_token(usuario.id)
+    refresh_token = criar_token(usuario.id, duracao_token=timedelta(days=7))
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer"
+    }
+
+#Rota para login de usuário via formulário
+@auth_router.post("/login-form")
+async def login_form(request: Request, session: AsyncSession = Depends(pegar_session)):
+    form = await request.form()
+    username = form.get("username")
+    password = form.get("password")
+    if not username or not password:
+        raise HTTPException(status_code=400, detail="username and password are required.")
+    usuario = await autenticar_usuario(username, password, session)
+    if not usuario:
+        raise HTTPException(status_code=401, detail="Email ou senha inválidos.")
+    access_token = criar_token(usuario.id)
+    return {
+        "access_token": access_token,
+        "token_type": "bearer"
+    }
+
+#Rota para usar o refresh token e obter um novo access token
+@auth_router.get("/refresh_token")
+async def use_refresh_token(usuario: Usuario = Depends(pegar_usuario)):
+    access_token = criar_token(usuario.id)
+    return {
+        "access_token": access_token,
+        "token_type": "bearer"
+    }
+
+#Rota para logout de usuário
+@auth_router.post("/logout")
+async def logout(token: str = Depends(oauth2_scheme), session: AsyncSession = Depends(pegar_session)):
+    #Token já expirado não precisa ser revogado, mas a assinatura precisa ser válida
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM], options={"verify_exp": False})
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Não autorizado")
+
+    expira_em = datetime.fromtimestamp(payload.get("exp", 0), tz=timezone.utc).replace(tzinfo=None)
+    if expira_em > datetime.utcnow():
+        await get_revogacoes().revogar(session, identificador_token(token, payload), expira_em)
+    invalidar_token(token)
+    return {"message": "Logout realizado com sucesso."}
+
+#Rota para ler os dados do usuário atual
+@auth_router.get("/me", response_model=UsuarioMeSchema)
+async def ler_usuario_atual(usuario: Usuario = Depends(pegar_usuario)):
+    return {
+        "nome": usuario.nome,
+        "email": usuario.email,
+        "admin": usuario.admin,
     }
\ No newline at end of file
@@ -0,0 +1,94 @@
+#Rotas de jobs de análise assíncronos (lotes grandes processados em segundo plano)
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile # type: ignore
+from fastapi.concurrency import run_in_threadpool # type: ignore
+from sqlalchemy import select # type: ignore
+from sqlalchemy.ext.asyncio import AsyncSession # type: ignore
+from sqlalchemy.orm import joinedload # type: ignore
+from typing import List, Optional # type: ignore
+from app.models.analysis import ItemJobAnalise, JobAnalise, Usuario
+from app.models.db import SessionLocal, pegar_session, pegar_usuario
+from app.schemas import JobRequestSchema, JobResponseSchema, JobResultadosSchema
+from app.services.analysis_service import serializar_analise
+from app.services.job_service import ExecutorJobs, get_executor_jobs, criar_job, cancelar_job, serializar_job
+from app.services.importacao_service import detectar_formato, importar_arquivo
+
+#Definição do roteador de jobs
+jobs_router = APIRouter(prefix='/analysis/jobs', tags=['jobs'])
+
+#Busca o job garantindo que pertence ao usuário
+async def pegar_job(job_id: int, session: AsyncSession, usuario: Usuario) -> JobAnalise:
+    job = await session.scalar(select(JobAnalise).where(JobAnalise.id == job_id, JobAnalise.usuario_id == usuario.id))
+    if not job:
+        raise HTTPException(status_code=404, detail="Job não encontrado.")
+    return job
+
+# Rota para enfileirar um lote de textos para análise em segundo plano
+@jobs_router.post("", response_model=JobResponseSchema, status_code=202)
+async def criar_job_analise(job_request: JobRequestSchema, session: AsyncSession = Depends(pegar_session), usuario: Usuario = Depends(pegar_usuario), executor: ExecutorJobs = Depends(get_executor_jobs)):
+    job = await criar_job(session, usuario.id, job_request.textos)
+    executor.notificar()
+    return serializar_job(job)
+
+# Rota para enfileirar os textos de um arquivo CSV ou NDJSON (opcionalmente .gz) como um job
+# O arquivo é lido linha a linha em uma thread; linhas inválidas aparecem nos resultados com o erro
+@jobs_router.post("/importar", response_model=JobResponseSchema, status_code=202)
+async def importar_arquivo_job(arquivo: UploadFile = File(...), formato: Optional[str] = Query(default=None, pattern="^(csv|ndjson)$"), coluna: str = "texto", session: AsyncSession = Depends(pegar_session), usuario: Usuario = Depends(pegar_usuario), executor: ExecutorJobs = Depends(get_executor_jobs)):
+    try:
+        job_id = await run_in_threadpool(
+            importar_arquivo, SessionLocal, usuario.id, arquivo.file, formato or detectar_formato(arquivo.filename), coluna
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    executor.notificar()
+    return serializar_job(await pegar_job(job_id, session, usuario))
+
+# Rota para listar os jobs do usuário
+@jobs_router.get("", response_model=List[JobResponseSchema])
+async def listar_jobs(usuario: Usuario = Depends(pegar_usuario), session: AsyncSession = Depends(pegar_session), skip: int = 0, limit: int = Query(default=20, ge=1, le=100)):
+    jobs = (await session.scalars(
+        select(JobAnalise).where(JobAnalise.usuario_id == usuario.id).order_by(JobAnalise.id.desc()).offset(skip).limit(limit)
+    )).all()
+    return [serializar_job(job) for job in jobs]
+
+# Rota para consultar status e progresso do job
+@jobs_router.get("/{job_id}", response_model=JobResponseSchema)
+async def ler_job(job_id: int, usuario: Usuario = Depends(pegar_usuario), session: AsyncSession = Depends(pegar_session)):
+    return serializar_job(await pegar_job(job_id, session, usuario))
+
+# Rota para ler os resultados do job (paginados pela posição do texto no lote)
+@jobs_router.get("/{job_id}/resultados", response_model=JobResultadosSchema)
+# Com status=falhou, serve como relatório de erros (linha do arquivo em "indice", a partir de 0)
+async def ler_resultados_job(job_id: int, usuario: Usuario = Depends(pegar_usuario), session: AsyncSession = Depends(pegar_session), status: Optional[str] = None, skip: int = 0, limit: int = Query(default=100, ge=1, le=1000)):
+    job = await pegar_job(job_id, session, usuario)
+    consulta = (
+        select(ItemJobAnalise)
+        .options(joinedload(ItemJobAnalise.analysis))
+        .where(ItemJobAnalise.job_id == job.id)
+        .order_by(ItemJobAnalise.indice)
+        .offset(skip)
+        .limit(limit)
+    )
+    if status:
+        consulta = consulta.where(ItemJobAnalise.status == status)
+    itens = (await session.execute(consulta)).scalars().all()
+
+    return {
+        "job": serializar_job(job),
+        "itens": [
+            {
+                "indice": item.indice,
+                "status": item.status,
+                "analise": serializar_analise(item.analysis) if item.analysis else None,
+                "erro": item.erro,
+            }
+            for item in itens
+        ],
+    }
+
+# Rota para cancelar o job
+@jobs_router.post("/{job_id}/cancelar", response_model=JobResponseSchema)
+async def cancelar_job_analise(job_id: int, usuario: Usuario = Depends(pegar_usuario), session: AsyncSession = Depends(pegar_session)):
+    job = await pegar_job(job_id, session, usuario)
+    if not await cancelar_job(session, job):
+        raise HTTPException(status_code=409, detail=f"Job já finalizado ({job.status}).")
+    return serializar_job(job)
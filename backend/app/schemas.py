@@ -1,74 +1,221 @@
-#padrão de dados para a aplicação
-from datetime import datetime
-from pydantic import BaseModel, Field # type: ignore
-from typing import Optional, List
-
-#Schema para criação de usuário
-class UsuarioSchema(BaseModel):
-    nome: str
-    email: str
-    senha: str = Field(min_length=8, max_length=64)
-    admin: Optional[bool] = False
-
-    class Config:
-        from_attributes = True
-
-#Schema para retorno de dados do usuário
-class UsuarioMeSchema(BaseModel):
-    nome: str
-    email: str
-    admin: Optional[bool] = False
-
-    class Config:
-        from_attributes = True
-
-#Schema para análise de entidades (suporte)
-class entidades(BaseModel):
-    texto: str
-    tipo: str
-
-    class Config:
-        from_attributes = True
-
-#Schema para resposta da análise de texto
-class AnalysisResponseSchema(BaseModel):
-    id: Optional[int] = None
-    texto_original: str
-    sentimento: str
-    palavra_mais_frequente: str
-    entidades: List[entidades]
-    lvl_legibilidade: str
-    cont_palavras: int
-    cont_caracteres: int
-    cont_frases: int
-    criado_em: Optional[datetime] = None
-
-    class Config:
-        from_attributes = True
-
-#Schema para requisição de análise de texto
-class AnalysisRequestSchema(BaseModel):
-    texto_original: str
-    salvar_historico: bool = True
-
-    class Config:
-        from_attributes = True
-
-#Schema para login do usuário
-class LoginSchema(BaseModel):
-    email: str
-    senha: str
-
-    class Config:
-        from_attributes = True
-
-#Schema para resposta de predição de tópicos
-class TopicPrediction(BaseModel):
-    topico: str
-    confianca: float
-
-#Schema para resposta de análise de tópicos (suporte)
-class TopicResponse(BaseModel):
-    texto: str
-    topicos: List[TopicPrediction]
-    topico_principal: str
+#padrão de dados para a aplicação
+from datetime import datetime
+from pydantic import BaseModel, Field, field_validator # type: ignore
+from typing import Dict, Optional, List
+from app.core.config import NLP_LOTE_MAX_TEXTOS, NLP_LOTE_MAX_CARACTERES, JOBS_MAX_TEXTOS, TOPICOS_LOTE_MAX_TEXTOS
+
+#Schema para criação de usuário
+class UsuarioSchema(BaseModel):
+    nome: str
+    email: str
+    senha: str = Field(min_length=8, max_length=64)
+    admin: Optional[bool] = False
+
+    class Config:
+        from_attributes = True
+
+#Schema para retorno de dados do usuário
+class UsuarioMeSchema(BaseModel):
+    nome: str
+    email: str
+    admin: Optional[bool] = False
+
+    class Config:
+        from_attributes = True
+
+#Schema para análise de entidades (suporte)
+class entidades(BaseModel):
+    texto: str
+    tipo: str
+
+    class Config:
+        from_attributes = True
+
+#Schema para resposta da análise de texto
+class AnalysisResponseSchema(BaseModel):
+    id: Optional[int] = None
+    texto_original: str
+    sentimento: str
+    pontuacao_sentimento: Optional[float] = None
+    palavra_mais_frequente: str
+    entidades: List[entidades]
+    lvl_legibilidade: str
+    cont_palavras: int
+    cont_caracteres: int
+    cont_frases: int
+    criado_em: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+#Schema para o resumo da análise no histórico (trecho no lugar do texto completo, sem entidades)
+class AnalysisResumoSchema(BaseModel):
+    id: int
+    trecho: str
+    sentimento: str
+    pontuacao_sentimento: Optional[float] = None
+    palavra_mais_frequente: str
+    lvl_legibilidade: str
+    cont_palavras: int
+    cont_caracteres: int
+    cont_frases: int
+    criado_em: Optional[datetime] = None
+
+#Schema para um resultado da busca textual (trecho com os termos encontrados entre <mark>)
+class BuscaResultadoSchema(BaseModel):
+    id: int
+    trecho: Optional[str] = None
+    relevancia: float
+    sentimento: str
+    pontuacao_sentimento: Optional[float] = None
+    palavra_mais_frequente: str
+    lvl_legibilidade: str
+    criado_em: Optional[datetime] = None
+
+#Schema para uma entidade nas contagens por tipo
+class EntidadeContagemSchema(BaseModel):
+    texto: str
+    chave: str
+    analises: int
+    mencoes: int
+
+#Schema para as estatísticas agregadas do usuário
+class EstatisticasResponseSchema(BaseModel):
+    total_analises: int
+    sentimentos: Dict[str, int]
+    legibilidade: Dict[str, int]
+    total_palavras: int
+    total_caracteres: int
+    total_frases: int
+    media_palavras: float
+    media_pontuacao_sentimento: Optional[float] = None
+    primeira_analise_em: Optional[datetime] = None
+    ultima_analise_em: Optional[datetime] = None
+
+#Schema para requisição de análise de texto
+class AnalysisRequestSchema(BaseModel):
+    texto_original: str
+    salvar_historico: bool = True
+
+    class Config:
+        from_attributes = True
+
+#Schema para requisição de análise em lote
+class AnalysisBatchRequestSchema(BaseModel):
+    textos: List[str] = Field(min_length=1, max_length=NLP_LOTE_MAX_TEXTOS)
+    batch_size: Optional[int] = Field(default=None, ge=1, le=1000)
+
+    #O custo no pool de análise cresce com o total de caracteres do lote
+    @field_validator("textos")
+    @classmethod
+    def limitar_caracteres(cls, textos: List[str]) -> List[str]:
+        if sum(len(texto) for texto in textos) > NLP_LOTE_MAX_CARACTERES:
+            raise ValueError(f"O lote excede o limite de {NLP_LOTE_MAX_CARACTERES} caracteres.")
+        return textos
+
+#Schema para cada item da resposta em lote (análise ou erro de validação)
+class AnalysisBatchItemSchema(BaseModel):
+    indice: int
+    analise: Optional[AnalysisResponseSchema] = None
+    erro: Optional[str] = None
+
+#Schema para resposta da análise em lote
+class AnalysisBatchResponseSchema(BaseModel):
+    total: int
+    sucesso: int
+    falhas: int
+    resultados: List[AnalysisBatchItemSchema]
+
+#Schema para criação de job de análise assíncrono
+class JobRequestSchema(BaseModel):
+    textos: List[str] = Field(min_length=1, max_length=JOBS_MAX_TEXTOS)
+
+#Schema para status/progresso do job
+class JobResponseSchema(BaseModel):
+    id: int
+    status: str
+    total: int
+    processados: int = 0
+    falhas: int = 0
+    progresso: float = 0.0
+    tentativas: int = 0
+    erro: Optional[str] = None
+    criado_em: Optional[datetime] = None
+    iniciado_em: Optional[datetime] = None
+    concluido_em: Optional[datetime] = None
+
+#Schema para cada item do resultado do job
+class JobItemSchema(BaseModel):
+    indice: int
+    status: str
+    analise: Optional[AnalysisResponseSchema] = None
+    erro: Optional[str] = None
+
+#Schema para página de resultados do job
+class JobResultadosSchema(BaseModel):
+    job: JobResponseSchema
+    itens: List[JobItemSchema]
+
+#Schema para status/progresso da exclusão de todas as análises
+class ExclusaoResponseSchema(BaseModel):
+    id: int
+    status: str
+    total: int
+    removidas: int = 0
+    progresso: float = 0.0
+    erro: Optional[str] = None
+    criado_em: Optional[datetime] = None
+    iniciado_em: Optional[datetime] = None
+    concluido_em: Optional[datetime] = None
+
+#Schema para login do usuário
+class LoginSchema(BaseModel):
+    email: str
+    senha: str
+
+    class Config:
+        from_attributes = True
+
+#Schema para resposta de predição de tópicos
+class TopicPrediction(BaseModel):
+    topico: str
+    confianca: float
+
+#Schema para resposta de análise de tópicos (suporte)
+class TopicResponse(BaseModel):
+    texto: str
+    topicos: List[TopicPrediction]
+    topico_principal: str
+
+#Schema para classificação de tópicos em lote
+class TopicBatchRequestSchema(BaseModel):
+    textos: List[str] = Field(min_length=1, max_length=TOPICOS_LOTE_MAX_TEXTOS)
+    k: int = Field(default=2, ge=1, le=5)
+
+#Schema para cada texto da classificação em lote
+class TopicBatchItemSchema(BaseModel):
+    indice: int
+    topicos: List[TopicPrediction]
+    topico_principal: str
+
+#Schema para resposta da classificação de tópicos em lote
+class TopicBatchResponseSchema(BaseModel):
+    total: int
+    resultados: List[TopicBatchItemSchema]
+
+#Schema para exemplo rotulado do classificador de tópicos
+class TopicExemploSchema(BaseModel):
+    texto: str = Field(min_length=1)
+    topico: str
+
+#Schema para envio de novos exemplos ao modelo incremental
+class TopicExemplosRequestSchema(BaseModel):
+    exemplos: List[TopicExemploSchema] = Field(min_length=1, max_length=TOPICOS_LOTE_MAX_TEXTOS)
+
+#Schema para resposta do aprendizado de novos exemplos
+class TopicExemplosResponseSchema(BaseModel):
+    recebidos: int
+    aprendidos: int
+    ignorados: int
+    exemplos_total: int
+    topicos: List[str]
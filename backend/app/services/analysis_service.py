@@ -0,0 +1,91 @@
+#Funções compartilhadas para criar e serializar análises
+import base64
+import datetime
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy import select, update # type: ignore
+from sqlalchemy.engine import Connection # type: ignore
+from sqlalchemy.orm import Session # type: ignore
+from sqlalchemy.sql import Select # type: ignore
+
+from app.models.analysis import Analysis, ItemJobAnalise, TextoArmazenado
+
+#Cria a entidade de análise a partir do resultado do serviço de NLP
+def nova_analise(usuario_id: int, texto_original: str, resultado: dict) -> Analysis:
+    return Analysis(
+        usuario_id=usuario_id,
+        texto_original=texto_original,
+        sentimento=resultado["sentimento"],
+        palavra_mais_frequente=resultado["palavra_mais_frequente"],
+        entidades=resultado["entidades"],
+        lvl_legibilidade=resultado["lvl_legibilidade"],
+        cont_palavras=resultado["cont_palavras"],
+        cont_caracteres=resultado["cont_caracteres"],
+        cont_frases=resultado["cont_frases"],
+        pontuacao_sentimento=resultado.get("pontuacao_sentimento")
+    )
+
+#Datas recebidas com fuso (ex.: "...Z", "-03:00") convertidas para UTC sem fuso, o formato de criado_em
+def utc_sem_fuso(valor: Optional[datetime.datetime]) -> Optional[datetime.datetime]:
+    if valor is None or valor.tzinfo is None:
+        return valor
+    return valor.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+
+#Desvincula os itens de jobs que apontam para as análises (antes delas, por causa da chave estrangeira)
+def desvincular_itens_jobs(conexao: Connection, ids: Iterable[int]) -> None:
+    ids = list(ids)
+    if ids:
+        conexao.execute(update(ItemJobAnalise).where(ItemJobAnalise.analysis_id.in_(ids)).values(analysis_id=None))
+
+#Listener do evento "before_flush" da Session: análises removidas pelo ORM (ex.: DELETE /analysis/{id})
+#deixam de ser referenciadas pelos itens dos jobs que as criaram
+def desvincular_itens_jobs_flush(session: Session, contexto, instancias) -> None:
+    desvincular_itens_jobs(session.connection(), [
+        objeto.id for objeto in session.deleted if isinstance(objeto, Analysis) and objeto.id is not None
+    ])
+
+#Converte a análise salva no formato de resposta da API
+def serializar_analise(analise: Analysis) -> dict:
+    return {
+        "id": analise.id,
+        "texto_original": analise.texto_original,
+        "sentimento": analise.sentimento,
+        "pontuacao_sentimento": analise.pontuacao_sentimento,
+        "palavra_mais_frequente": analise.palavra_mais_frequente,
+        "entidades": analise.entidades,
+        "lvl_legibilidade": analise.lvl_legibilidade,
+        "cont_palavras": analise.cont_palavras,
+        "cont_caracteres": analise.cont_caracteres,
+        "cont_frases": analise.cont_frases,
+        "criado_em": analise.criado_em
+    }
+
+
+#Consulta do resumo: o texto completo e as entidades não são lidos nem descomprimidos,
+#o trecho vem pronto da tabela de textos
+def consulta_resumo() -> Select:
+    return select(
+        Analysis.id,
+        TextoArmazenado.trecho,
+        Analysis.sentimento,
+        Analysis.pontuacao_sentimento,
+        Analysis.palavra_mais_frequente,
+        Analysis.lvl_legibilidade,
+        Analysis.cont_palavras,
+        Analysis.cont_caracteres,
+        Analysis.cont_frases,
+        Analysis.criado_em,
+    ).join(TextoArmazenado, Analysis.texto_hash == TextoArmazenado.hash)
+
+#Cursor opaco do histórico: posição (criado_em, id) da última análise da página
+def codificar_cursor(criado_em: datetime.datetime, id_analise: int) -> str:
+    return base64.urlsafe_b64encode(f"{criado_em.isoformat()}|{id_analise}".encode()).decode().rstrip("=")
+
+#Lança ValueError para cursores malformados
+def decodificar_cursor(cursor: str) -> Tuple[datetime.datetime, int]:
+    try:
+        conteudo = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        criado_em, id_analise = conteudo.split("|")
+        return datetime.datetime.fromisoformat(criado_em), int(id_analise)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Cursor inválido.") from e
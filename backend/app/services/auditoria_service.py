@@ -0,0 +1,158 @@
+#Registro de auditoria do acesso às análises (criar, ler, listar, buscar, exportar, deletar)
+#As rotas e os workers de jobs só acrescentam o evento a um buffer em memória; uma tarefa em
+#segundo plano grava os pendentes com um INSERT em lote quando o buffer atinge o tamanho do lote
+#ou a cada intervalo, e o que restar é gravado no encerramento. A requisição não espera o banco
+import asyncio
+import datetime
+import logging
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Optional
+
+from sqlalchemy import insert # type: ignore
+from sqlalchemy.engine import Engine # type: ignore
+
+from app.core.config import AUDITORIA_HABILITADA, AUDITORIA_INTERVALO, AUDITORIA_MAX_PENDENTES, AUDITORIA_TAMANHO_LOTE
+from app.models.analysis import EventoAuditoria
+
+logger = logging.getLogger("uvicorn.error")
+
+
+#Milissegundos desde `inicio` (time.perf_counter)
+def duracao_ms(inicio: float) -> float:
+    return round((time.perf_counter() - inicio) * 1000, 3)
+
+
+class RegistroAuditoria:
+    def __init__(self, engine: Engine, tamanho_lote: int = AUDITORIA_TAMANHO_LOTE, intervalo: float = AUDITORIA_INTERVALO,
+                 max_pendentes: int = AUDITORIA_MAX_PENDENTES, habilitado: bool = True):
+        self.engine = engine
+        self.tamanho_lote = tamanho_lote
+        self.intervalo = intervalo
+        self.max_pendentes = max_pendentes
+        self.habilitado = habilitado
+        #Acessado pelo event loop, pelas threads do executor e pelos workers de jobs
+        self._pendentes: deque = deque()
+        self._trava = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._sinal: Optional[asyncio.Event] = None
+        self._tarefa: Optional[asyncio.Task] = None
+        self._parar = False
+
+        #Contadores expostos para métricas
+        self.registrados = 0
+        self.gravados = 0
+        self.lotes = 0
+        self.descartados = 0
+        self.falhas = 0
+
+    @property
+    def ativo(self) -> bool:
+        return self._tarefa is not None and not self._tarefa.done()
+
+    #Acrescenta o evento ao buffer (não acessa o banco; pode ser chamado de qualquer thread)
+    def registrar(self, usuario_id: int, acao: str, analysis_id: Optional[int] = None,
+                  origem: str = "api", duracao: Optional[float] = None) -> None:
+        if not self.habilitado:
+            return
+        evento = {
+            "usuario_id": usuario_id,
+            "acao": acao,
+            "analysis_id": analysis_id,
+            "origem": origem,
+            "duracao_ms": duracao,
+            "criado_em": datetime.datetime.utcnow(),
+        }
+        with self._trava:
+            self._pendentes.append(evento)
+            self.registrados += 1
+            self._limitar()
+            cheio = len(self._pendentes) >= self.tamanho_lote
+
+        if cheio and self.ativo:
+            self._loop.call_soon_threadsafe(self._sinal.set)
+
+    #Descarta os eventos mais antigos além do limite (banco fora do ar por muito tempo)
+    def _limitar(self) -> None:
+        while len(self._pendentes) > self.max_pendentes:
+            self._pendentes.popleft()
+            self.descartados += 1
+
+    #Inicia a tarefa de gravação no event loop atual
+    def iniciar(self) -> None:
+        if self.habilitado and not self.ativo:
+            self._loop = asyncio.get_running_loop()
+            self._sinal = asyncio.Event()
+            self._parar = False
+            self._tarefa = asyncio.create_task(self._executar())
+
+    #Encerra a tarefa e grava tudo o que ainda estiver pendente
+    async def encerrar(self) -> None:
+        if self.ativo:
+            self._parar = True
+            self._sinal.set()
+            await self._tarefa
+        self._tarefa = None
+        await asyncio.get_running_loop().run_in_executor(None, self.descarregar)
+
+    async def _executar(self) -> None:
+        loop = asyncio.get_running_loop()
+        while not self._parar:
+            try:
+                await asyncio.wait_for(self._sinal.wait(), self.intervalo)
+            except asyncio.TimeoutError:
+                pass
+            self._sinal.clear()
+            if self._parar:
+                break
+            await loop.run_in_executor(None, self.descarregar)
+
+    #Grava os eventos pendentes em lotes; em caso de erro, devolve o lote ao buffer para a
+    #próxima tentativa. Retorna quantos eventos foram gravados
+    def descarregar(self) -> int:
+        gravados = 0
+        while True:
+            with self._trava:
+                lote = [self._pendentes.popleft() for _ in range(min(self.tamanho_lote, len(self._pendentes)))]
+            if not lote:
+                return gravados
+
+            try:
+                with self.engine.begin() as conexao:
+                    conexao.execute(insert(EventoAuditoria), lote)
+            except Exception as erro:
+                logger.warning("Falha ao gravar %d eventos de auditoria: %s", len(lote), erro)
+                with self._trava:
+                    self.falhas += 1
+                    self._pendentes.extendleft(reversed(lote))
+                    self._limitar()
+                return gravados
+
+            gravados += len(lote)
+            with self._trava:
+                self.gravados += len(lote)
+                self.lotes += 1
+
+    #Métricas do registro de auditoria
+    def estatisticas(self) -> dict:
+        with self._trava:
+            pendentes = len(self._pendentes)
+        return {
+            "ativo": self.ativo,
+            "registrados": self.registrados,
+            "gravados": self.gravados,
+            "pendentes": pendentes,
+            "lotes": self.lotes,
+            "media_por_lote": round(self.gravados / self.lotes, 2) if self.lotes else 0.0,
+            "descartados": self.descartados,
+            "falhas": self.falhas,
+        }
+
+
+#Instância compartilhada (uma por processo)
+@lru_cache()
+def get_registro_auditoria() -> RegistroAuditoria:
+    from app.models.db import engine
+    return RegistroAuditoria(engine, habilitado=AUDITORIA_HABILITADA)
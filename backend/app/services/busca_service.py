@@ -0,0 +1,275 @@
+#Busca textual nas análises do usuário
+#O índice (tabela "textos_busca", criada em app.models.analysis) tem um registro por texto distinto
+#de cada usuário: FTS5 no SQLite e tsvector com índice GIN no PostgreSQL. É mantido junto com as
+#análises (listeners da Session e app.services.exclusao_service), como o índice de entidades, e a
+#consulta já parte só dos registros do usuário, então a relevância nunca é calculada para textos
+#de outros usuários. No FTS5 os registros de cada usuário ocupam uma faixa de rowid própria
+import html
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import bindparam, select, text # type: ignore
+from sqlalchemy.engine import Connection # type: ignore
+from sqlalchemy.ext.asyncio import AsyncSession # type: ignore
+from sqlalchemy.orm import Session # type: ignore
+from sqlalchemy.types import DateTime # type: ignore
+
+from app.core.config import BUSCA_CONFIGURACAO, BUSCA_PALAVRAS_TRECHO, BUSCA_MAX_CANDIDATOS
+from app.models.analysis import Analysis, TextoArmazenado
+
+#Marcadores dos termos encontrados: o trecho é escapado para HTML e só então recebe <mark>
+INICIO_DESTAQUE = "\x02"
+FIM_DESTAQUE = "\x03"
+
+#Hashes consultados ou removidos por comando
+TAMANHO_LOTE = 500
+
+#Bits do rowid do FTS5 para a sequência de cada usuário: os registros do usuário ficam entre
+#usuario_id << BITS_SEQUENCIA e o início da faixa do próximo usuário
+BITS_SEQUENCIA = 32
+
+#Termos da consulta: "frases entre aspas" ou palavras, precedidos ou não de "-" (exclusão)
+_TERMOS = re.compile(r'(?P<exclusao>(?<!\S)-)?(?:"(?P<frase>[^"]*)"|(?P<palavra>\w+))')
+
+_COLUNAS_ANALISE = "a.id, a.texto_hash, a.sentimento, a.pontuacao_sentimento, a.palavra_mais_frequente, a.lvl_legibilidade, a.criado_em"
+
+
+#Faixa de rowid dos registros do usuário no FTS5
+def faixa_usuario(usuario_id: int) -> Tuple[int, int]:
+    inicio = usuario_id << BITS_SEQUENCIA
+    return inicio, inicio + (1 << BITS_SEQUENCIA) - 1
+
+
+#SQLite: rowid e hash dos registros do usuário para os hashes informados (a coluna hash é
+#indexada no FTS5 justamente para esta consulta)
+def _registros_sqlite(conexao: Connection, usuario_id: int, hashes: List[str]) -> List[tuple]:
+    inicio, fim = faixa_usuario(usuario_id)
+    registros = []
+    for posicao in range(0, len(hashes), TAMANHO_LOTE):
+        consulta = "hash : (" + " OR ".join(f'"{hash_texto}"' for hash_texto in hashes[posicao:posicao + TAMANHO_LOTE]) + ")"
+        registros.extend(conexao.execute(
+            text("SELECT rowid, hash FROM textos_busca WHERE textos_busca MATCH :consulta AND rowid BETWEEN :inicio AND :fim"),
+            {"consulta": consulta, "inicio": inicio, "fim": fim},
+        ).all())
+    return registros
+
+
+#Indexa os textos (hash -> texto) do usuário que ainda não estão no índice dele, na mesma
+#transação em que as análises foram gravadas
+def indexar_textos(conexao: Connection, usuario_id: int, textos: Dict[str, str]) -> None:
+    if not textos:
+        return
+    if conexao.dialect.name == "postgresql":
+        conexao.execute(text(
+            "INSERT INTO textos_busca (usuario_id, hash, busca) "
+            "VALUES (:usuario_id, :hash, to_tsvector(CAST(:configuracao AS regconfig), :conteudo)) "
+            "ON CONFLICT (usuario_id, hash) DO NOTHING"
+        ), [
+            {"usuario_id": usuario_id, "hash": hash_texto, "conteudo": texto, "configuracao": BUSCA_CONFIGURACAO}
+            for hash_texto, texto in textos.items()
+        ])
+        return
+
+    existentes = {hash_texto for _, hash_texto in _registros_sqlite(conexao, usuario_id, list(textos))}
+    novos = [hash_texto for hash_texto in textos if hash_texto not in existentes]
+    if not novos:
+        return
+    #Próximos rowids da faixa do usuário (o FTS5 devolve o maior direto pela ordem do rowid)
+    inicio, fim = faixa_usuario(usuario_id)
+    ultimo = conexao.execute(
+        text("SELECT rowid FROM textos_busca WHERE rowid BETWEEN :inicio AND :fim ORDER BY rowid DESC LIMIT 1"),
+        {"inicio": inicio, "fim": fim},
+    ).scalar()
+    proximo = inicio if ultimo is None else ultimo + 1
+    conexao.execute(text(
+        "INSERT INTO textos_busca (rowid, hash, conteudo) VALUES (:id, :hash, :conteudo)"
+    ), [{"id": proximo + posicao, "hash": hash_texto, "conteudo": textos[hash_texto]} for posicao, hash_texto in enumerate(novos)])
+
+
+#Remove do índice do usuário os textos que nenhuma análise dele referencia mais, sem contar as
+#análises em `ignorar` (que estão sendo removidas no mesmo flush)
+def remover_do_indice(conexao: Connection, usuario_id: int, hashes: Iterable[str], ignorar: Iterable[int] = ()) -> None:
+    hashes = list(set(hashes))
+    ignorar = list(ignorar)
+    for posicao in range(0, len(hashes), TAMANHO_LOTE):
+        lote = hashes[posicao:posicao + TAMANHO_LOTE]
+        restantes = select(Analysis.texto_hash).where(Analysis.usuario_id == usuario_id, Analysis.texto_hash.in_(lote))
+        if ignorar:
+            restantes = restantes.where(Analysis.id.not_in(ignorar))
+        restantes = set(conexao.execute(restantes).scalars())
+        sem_analise = [hash_texto for hash_texto in lote if hash_texto not in restantes]
+        if not sem_analise:
+            continue
+
+        if conexao.dialect.name == "postgresql":
+            conexao.execute(
+                text("DELETE FROM textos_busca WHERE usuario_id = :usuario_id AND hash IN :hashes")
+                .bindparams(bindparam("hashes", expanding=True)),
+                {"usuario_id": usuario_id, "hashes": sem_analise},
+            )
+        else:
+            ids = [rowid for rowid, _ in _registros_sqlite(conexao, usuario_id, sem_analise)]
+            if ids:
+                conexao.execute(
+                    text("DELETE FROM textos_busca WHERE rowid IN :ids").bindparams(bindparam("ids", expanding=True)),
+                    {"ids": ids},
+                )
+
+
+#Listener do evento "before_flush" da Session: as análises removidas pelo ORM tiram do índice os
+#textos que o usuário deixou de ter. Remoções em massa (DELETE sem o ORM) devem chamar
+#remover_do_indice, como app.services.exclusao_service
+def remover_da_busca_flush(session: Session, contexto, instancias) -> None:
+    removidas: Dict[int, List[Analysis]] = {}
+    for objeto in session.deleted:
+        if isinstance(objeto, Analysis) and objeto.id is not None:
+            removidas.setdefault(objeto.usuario_id, []).append(objeto)
+    for usuario_id, analises in removidas.items():
+        remover_do_indice(
+            session.connection(), usuario_id,
+            [analise.texto_hash for analise in analises], ignorar=[analise.id for analise in analises],
+        )
+
+
+#Listener do evento "after_flush" da Session: indexa os textos das análises novas para os seus usuários
+def indexar_busca_flush(session: Session, contexto) -> None:
+    textos: Dict[int, Dict[str, str]] = {}
+    for objeto in session.new:
+        texto = getattr(objeto, "_texto", None) if isinstance(objeto, Analysis) else None
+        if texto is not None:
+            textos.setdefault(objeto.usuario_id, {}).setdefault(objeto.texto_hash, texto)
+    for usuario_id, textos_usuario in textos.items():
+        indexar_textos(session.connection(), usuario_id, textos_usuario)
+
+
+#Converte a consulta do usuário para a sintaxe do FTS5, restrita à coluna conteudo: todos os
+#termos são obrigatórios, termos com "-" são excluídos. Retorna None se não sobrar termo a procurar
+def consulta_fts5(consulta: str) -> Optional[str]:
+    incluidos, excluidos = [], []
+    for termo in _TERMOS.finditer(consulta):
+        valor = (termo.group("frase") if termo.group("frase") is not None else termo.group("palavra")).strip()
+        if not re.search(r"\w", valor):
+            continue
+        valor = '"' + valor.replace('"', '""') + '"'
+        (excluidos if termo.group("exclusao") else incluidos).append(valor)
+
+    if not incluidos:
+        return None
+    return "conteudo : (" + " ".join(incluidos) + "".join(f" NOT {termo}" for termo in excluidos) + ")"
+
+
+def _destacar(trecho: Optional[str]) -> Optional[str]:
+    if trecho is None:
+        return None
+    return html.escape(trecho).replace(INICIO_DESTAQUE, "<mark>").replace(FIM_DESTAQUE, "</mark>")
+
+
+#Análises do usuário cujo texto corresponde à consulta, da mais relevante para a menos relevante,
+#com um trecho do texto destacando os termos encontrados. A relevância é calculada só para os
+#`candidatos` textos mais recentes do usuário que correspondem à consulta
+async def buscar(session: AsyncSession, usuario_id: int, consulta: str, skip: int = 0, limit: int = 20,
+                 candidatos: int = BUSCA_MAX_CANDIDATOS) -> List[dict]:
+    if session.bind.dialect.name == "postgresql":
+        linhas, trechos = await _buscar_postgresql(session, usuario_id, consulta, skip, limit, candidatos)
+    else:
+        linhas, trechos = await _buscar_sqlite(session, usuario_id, consulta, skip, limit, candidatos)
+
+    return [
+        {
+            "id": linha.id,
+            "trecho": _destacar(trechos.get(linha.texto_hash)),
+            "relevancia": round(float(linha.relevancia), 6),
+            "sentimento": linha.sentimento,
+            "pontuacao_sentimento": linha.pontuacao_sentimento,
+            "palavra_mais_frequente": linha.palavra_mais_frequente,
+            "lvl_legibilidade": linha.lvl_legibilidade,
+            "criado_em": linha.criado_em,
+        }
+        for linha in linhas
+    ]
+
+
+#SQLite: a faixa de rowid do usuário restringe o MATCH aos registros dele antes do bm25, e o
+#ORDER BY rowid DESC (atendido pelo próprio FTS5) com LIMIT fixa os candidatos ranqueados. A
+#página é escolhida pelo bm25 (negado, maior é melhor) e os trechos são gerados pelo snippet() só
+#para os textos da página
+async def _buscar_sqlite(session: AsyncSession, usuario_id: int, consulta: str, skip: int, limit: int, candidatos: int):
+    consulta = consulta_fts5(consulta)
+    if consulta is None:
+        return [], {}
+
+    inicio_faixa, fim_faixa = faixa_usuario(usuario_id)
+    linhas = (await session.execute(
+        text(
+            "WITH candidatos AS MATERIALIZED ("
+            "SELECT rowid AS id_busca, hash, -bm25(textos_busca, 0.0, 1.0) AS relevancia FROM textos_busca "
+            "WHERE textos_busca MATCH :consulta AND rowid BETWEEN :inicio_faixa AND :fim_faixa "
+            "ORDER BY rowid DESC LIMIT :candidatos) "
+            f"SELECT {_COLUNAS_ANALISE}, c.id_busca, c.relevancia "
+            "FROM candidatos AS c JOIN analyses AS a ON a.texto_hash = c.hash AND a.usuario_id = :usuario_id "
+            "ORDER BY c.relevancia DESC, a.id DESC LIMIT :limite OFFSET :inicio"
+        ).columns(criado_em=DateTime),
+        {
+            "consulta": consulta, "inicio_faixa": inicio_faixa, "fim_faixa": fim_faixa, "candidatos": candidatos,
+            "usuario_id": usuario_id, "limite": limit, "inicio": skip,
+        },
+    )).all()
+    if not linhas:
+        return [], {}
+
+    trechos = (await session.execute(
+        text(
+            "SELECT hash, snippet(textos_busca, 1, :inicio_destaque, :fim_destaque, '…', :palavras) "
+            "FROM textos_busca WHERE textos_busca MATCH :consulta AND rowid IN :ids"
+        ).bindparams(bindparam("ids", expanding=True)),
+        {
+            "consulta": consulta,
+            "ids": list({linha.id_busca for linha in linhas}),
+            "inicio_destaque": INICIO_DESTAQUE,
+            "fim_destaque": FIM_DESTAQUE,
+            "palavras": BUSCA_PALAVRAS_TRECHO,
+        },
+    )).all()
+    return linhas, dict(trechos)
+
+
+#PostgreSQL: consulta no formato do websearch_to_tsquery. Os candidatos são os registros do
+#usuário que correspondem à consulta (os `candidatos` mais recentes), e só eles recebem o
+#ts_rank_cd; os trechos vêm do ts_headline sobre os textos da página (descomprimidos aqui, pois
+#são gravados comprimidos)
+async def _buscar_postgresql(session: AsyncSession, usuario_id: int, consulta: str, skip: int, limit: int, candidatos: int):
+    parametros = {"configuracao": BUSCA_CONFIGURACAO, "consulta": consulta}
+    linhas = (await session.execute(
+        text(
+            "WITH q AS (SELECT websearch_to_tsquery(CAST(:configuracao AS regconfig), :consulta) AS consulta), "
+            "candidatos AS MATERIALIZED ("
+            "SELECT b.hash, b.busca FROM textos_busca AS b, q "
+            "WHERE b.usuario_id = :usuario_id AND b.busca @@ q.consulta ORDER BY b.id DESC LIMIT :candidatos) "
+            f"SELECT {_COLUNAS_ANALISE}, ts_rank_cd(c.busca, q.consulta) AS relevancia "
+            "FROM candidatos AS c CROSS JOIN q "
+            "JOIN analyses AS a ON a.texto_hash = c.hash AND a.usuario_id = :usuario_id "
+            "ORDER BY relevancia DESC, a.id DESC LIMIT :limite OFFSET :inicio"
+        ),
+        dict(parametros, usuario_id=usuario_id, candidatos=candidatos, limite=limit, inicio=skip),
+    )).all()
+    if not linhas:
+        return [], {}
+
+    textos = dict((await session.execute(
+        select(TextoArmazenado.hash, TextoArmazenado.conteudo)
+        .where(TextoArmazenado.hash.in_({linha.texto_hash for linha in linhas}))
+    )).all())
+    hashes = list(textos)
+    opcoes = (
+        f"StartSel={INICIO_DESTAQUE}, StopSel={FIM_DESTAQUE}, "
+        f"MaxWords={BUSCA_PALAVRAS_TRECHO}, MinWords={max(BUSCA_PALAVRAS_TRECHO // 2, 1)}"
+    )
+    trechos = (await session.execute(
+        text(
+            "SELECT ts_headline(CAST(:configuracao AS regconfig), t.texto, "
+            "websearch_to_tsquery(CAST(:configuracao AS regconfig), :consulta), :opcoes) "
+            "FROM unnest(CAST(:textos AS text[])) WITH ORDINALITY AS t(texto, ordem) ORDER BY t.ordem"
+        ),
+        dict(parametros, textos=[textos[hash_texto] for hash_texto in hashes], opcoes=opcoes),
+    )).scalars().all()
+    return linhas, dict(zip(hashes, trechos))
@@ -0,0 +1,110 @@
+#Cache de resultados da análise de texto endereçado pelo conteúdo
+import copy
+import hashlib
+from typing import Callable, Optional
+
+from sqlalchemy.exc import IntegrityError # type: ignore
+
+from app.core.cache import CacheLRU
+from app.core.config import NLP_CACHE_TAMANHO, NLP_CACHE_TTL, NLP_CACHE_PERSISTENTE
+from app.models.analysis import ResultadoCache
+
+
+class CacheResultados:
+    def __init__(self, tamanho_max: int, ttl: Optional[float] = None, session_factory: Optional[Callable] = None):
+        #Camada em memória (por processo)
+        self.memoria = CacheLRU(tamanho_max=tamanho_max, ttl=ttl)
+        #Camada persistente opcional no banco de dados
+        self.session_factory = session_factory
+
+        self.acertos_persistentes = 0
+        self.falhas_persistentes = 0
+
+    #Chave do cache: hash do texto normalizado + versão do pipeline/léxicos
+    @staticmethod
+    def gerar_chave(texto: str, versao: str) -> str:
+        conteudo = f"{versao}\0{texto.strip()}".encode("utf-8")
+        return hashlib.sha256(conteudo).hexdigest()
+
+    #Busca um resultado (memória primeiro, depois banco)
+    def obter(self, chave: str, versao: str) -> Optional[dict]:
+        resultado = self.memoria.obter(chave)
+        if resultado is not None:
+            return copy.deepcopy(resultado)
+
+        if self.session_factory is None:
+            return None
+
+        session = self.session_factory()
+        try:
+            registro = session.query(ResultadoCache).filter(
+                ResultadoCache.chave == chave,
+                ResultadoCache.versao == versao,
+            ).first()
+        finally:
+            session.close()
+
+        if registro is None:
+            self.falhas_persistentes += 1
+            return None
+
+        self.acertos_persistentes += 1
+        self.memoria.salvar(chave, registro.resultado)
+        return copy.deepcopy(registro.resultado)
+
+    #Armazena um resultado nas duas camadas
+    def salvar(self, chave: str, versao: str, resultado: dict) -> None:
+        self.memoria.salvar(chave, copy.deepcopy(resultado))
+
+        if self.session_factory is None:
+            return
+
+        session = self.session_factory()
+        try:
+            session.add(ResultadoCache(chave=chave, versao=versao, resultado=resultado))
+            session.commit()
+        except IntegrityError:
+            #Outro worker gravou a mesma chave ao mesmo tempo
+            session.rollback()
+        finally:
+            session.close()
+
+    #Remove do banco os resultados gerados por versões antigas do pipeline
+    def purgar_versoes_antigas(self, versao_atual: str) -> int:
+        if self.session_factory is None:
+            return 0
+
+        session = self.session_factory()
+        try:
+            removidos = session.query(ResultadoCache).filter(
+                ResultadoCache.versao != versao_atual
+            ).delete(synchronize_session=False)
+            session.commit()
+            return removidos
+        finally:
+            session.close()
+
+    #Métricas de uso das duas camadas
+    def estatisticas(self) -> dict:
+        return {
+            "memoria": self.memoria.estatisticas(),
+            "persistente": {
+                "ativo": self.session_factory is not None,
+                "acertos": self.acertos_persistentes,
+                "falhas": self.falhas_persistentes,
+            },
+        }
+
+
+#Cria o cache de resultados conforme a configuração da aplicação
+def criar_cache_resultados() -> CacheResultados:
+    session_factory = None
+    if NLP_CACHE_PERSISTENTE:
+        from app.models.db import SessionLocal
+        session_factory = SessionLocal
+
+    return CacheResultados(
+        tamanho_max=NLP_CACHE_TAMANHO,
+        ttl=NLP_CACHE_TTL or None,
+        session_factory=session_factory,
+    )
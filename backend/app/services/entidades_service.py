@@ -0,0 +1,155 @@
+#Índice normalizado das entidades nomeadas das análises
+#As entidades de cada análise (Analysis.entidades, JSON) são copiadas para "entidades_analises"
+#no mesmo flush em que a análise é gravada, uma linha por entidade distinta com o texto
+#normalizado; as consultas por entidade e as contagens por tipo são feitas em SQL sobre o índice
+#(usuario_id, tipo, chave, criado_em, analysis_id), sem ler o JSON das análises
+import datetime
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, func, insert, select # type: ignore
+from sqlalchemy.engine import Connection # type: ignore
+from sqlalchemy.ext.asyncio import AsyncSession # type: ignore
+from sqlalchemy.orm import Session # type: ignore
+from sqlalchemy.sql import Select # type: ignore
+
+from app.models.analysis import Analysis, EntidadeAnalise
+from app.services.analysis_service import consulta_resumo
+from app.services.sentimento_service import normalizar
+
+TIPOS = ("PER", "ORG", "LOC")
+
+#Tamanho máximo da chave normalizada
+TAMANHO_CHAVE = 200
+
+#Análises reindexadas por vez em reconstruir_entidades
+TAMANHO_LOTE = 1000
+
+
+#Chave de consulta da entidade: minúsculas, sem acentos e sem espaços repetidos
+def normalizar_entidade(texto: str) -> str:
+    return " ".join(normalizar(texto).split())[:TAMANHO_CHAVE]
+
+
+#Linhas do índice para as entidades de uma análise (repetições viram menções da mesma linha)
+def linhas_entidades(analysis_id: int, usuario_id: int, criado_em: datetime.datetime, entidades) -> List[dict]:
+    linhas: Dict[tuple, dict] = {}
+    for entidade in entidades if isinstance(entidades, list) else []:
+        texto = " ".join(str(entidade.get("texto") or "").split())
+        tipo = entidade.get("tipo")
+        chave = normalizar_entidade(texto)
+        if not tipo or not chave:
+            continue
+
+        linha = linhas.get((tipo, chave))
+        if linha is None:
+            linhas[(tipo, chave)] = {
+                "analysis_id": analysis_id, "usuario_id": usuario_id, "tipo": tipo, "chave": chave,
+                "texto": texto, "mencoes": 1, "criado_em": criado_em,
+            }
+        else:
+            linha["mencoes"] += 1
+    return list(linhas.values())
+
+
+#Remove as entidades das análises (antes delas, por causa da chave estrangeira)
+def remover_entidades(conexao: Connection, ids: Iterable[int]) -> None:
+    ids = list(ids)
+    if ids:
+        conexao.execute(delete(EntidadeAnalise).where(EntidadeAnalise.analysis_id.in_(ids)))
+
+
+#Listener do evento "before_flush" da Session: as análises removidas perdem as entidades.
+#Remoções em massa (DELETE sem o ORM) devem chamar remover_entidades, como app.services.exclusao_service
+def remover_entidades_flush(session: Session, contexto, instancias) -> None:
+    remover_entidades(session.connection(), [
+        objeto.id for objeto in session.deleted if isinstance(objeto, Analysis) and objeto.id is not None
+    ])
+
+
+#Listener do evento "after_flush" da Session: indexa as entidades das análises novas (já com id)
+def indexar_entidades_flush(session: Session, contexto) -> None:
+    linhas = []
+    for objeto in session.new:
+        if isinstance(objeto, Analysis):
+            linhas.extend(linhas_entidades(objeto.id, objeto.usuario_id, objeto.criado_em, objeto.entidades))
+
+    if linhas:
+        session.connection().execute(insert(EntidadeAnalise), linhas)
+
+
+#Refaz o índice a partir do JSON das análises (todos os usuários ou apenas um), em lotes
+#Retorna o número de entidades indexadas; não faz commit
+def reconstruir_entidades(session: Session, usuario_id: Optional[int] = None) -> int:
+    remocao = delete(EntidadeAnalise)
+    consulta = select(Analysis.id, Analysis.usuario_id, Analysis.criado_em, Analysis.entidades).order_by(Analysis.id).limit(TAMANHO_LOTE)
+    if usuario_id is not None:
+        remocao = remocao.where(EntidadeAnalise.usuario_id == usuario_id)
+        consulta = consulta.where(Analysis.usuario_id == usuario_id)
+    session.execute(remocao)
+
+    total = 0
+    ultimo_id = 0
+    while True:
+        analises = session.execute(consulta.where(Analysis.id > ultimo_id)).all()
+        if not analises:
+            return total
+        linhas = []
+        for analise in analises:
+            linhas.extend(linhas_entidades(analise.id, analise.usuario_id, analise.criado_em or datetime.datetime.utcnow(), analise.entidades))
+        if linhas:
+            session.execute(insert(EntidadeAnalise), linhas)
+        total += len(linhas)
+        ultimo_id = analises[-1].id
+
+
+#Resumo das análises do usuário que mencionam a entidade, mais recentes primeiro
+def consulta_analises_entidade(usuario_id: int, tipo: str, texto: str) -> Select:
+    return (
+        consulta_resumo()
+        .join(EntidadeAnalise, EntidadeAnalise.analysis_id == Analysis.id)
+        .where(
+            EntidadeAnalise.usuario_id == usuario_id,
+            EntidadeAnalise.tipo == tipo,
+            EntidadeAnalise.chave == normalizar_entidade(texto),
+        )
+        .order_by(EntidadeAnalise.criado_em.desc(), EntidadeAnalise.analysis_id.desc())
+    )
+
+
+#Entidades mais mencionadas do usuário, as `limite` primeiras de cada tipo (em número de análises),
+#agregadas e ordenadas no banco com uma função de janela
+async def entidades_principais(session: AsyncSession, usuario_id: int, tipos: Iterable[str] = TIPOS, limite: int = 10,
+                               inicio: Optional[datetime.datetime] = None, fim: Optional[datetime.datetime] = None) -> Dict[str, List[dict]]:
+    tipos = list(tipos)
+    contagens = (
+        select(
+            EntidadeAnalise.tipo,
+            EntidadeAnalise.chave,
+            func.max(EntidadeAnalise.texto).label("texto"),
+            func.count().label("analises"),
+            func.sum(EntidadeAnalise.mencoes).label("mencoes"),
+            func.row_number().over(
+                partition_by=EntidadeAnalise.tipo,
+                order_by=(func.count().desc(), EntidadeAnalise.chave),
+            ).label("posicao"),
+        )
+        .where(EntidadeAnalise.usuario_id == usuario_id, EntidadeAnalise.tipo.in_(tipos))
+        .group_by(EntidadeAnalise.tipo, EntidadeAnalise.chave)
+    )
+    if inicio is not None:
+        contagens = contagens.where(EntidadeAnalise.criado_em >= inicio)
+    if fim is not None:
+        contagens = contagens.where(EntidadeAnalise.criado_em < fim)
+    contagens = contagens.subquery()
+
+    resultado: Dict[str, List[dict]] = {tipo: [] for tipo in tipos}
+    linhas = await session.execute(
+        select(contagens.c.tipo, contagens.c.texto, contagens.c.chave, contagens.c.analises, contagens.c.mencoes)
+        .where(contagens.c.posicao <= limite)
+        .order_by(contagens.c.tipo, contagens.c.posicao)
+    )
+    for linha in linhas:
+        resultado[linha.tipo].append({
+            "texto": linha.texto, "chave": linha.chave, "analises": linha.analises, "mencoes": int(linha.mencoes),
+        })
+    return resultado
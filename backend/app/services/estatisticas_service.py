@@ -0,0 +1,222 @@
+#Estatísticas agregadas por usuário mantidas de forma incremental
+#Cada flush que cria ou remove análises aplica os deltas em estatisticas_usuario e
+#estatisticas_usuario_contagens na mesma transação, com INSERT ... ON CONFLICT DO UPDATE
+#(atômico entre requisições e processos); /analysis/stats lê apenas essas linhas
+import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import case, delete, func, insert as insert_padrao, literal, select # type: ignore
+from sqlalchemy.engine import Connection # type: ignore
+from sqlalchemy.orm import Session # type: ignore
+
+from app.core.dialeto import insert_dialeto
+from app.models.analysis import Analysis, ContagemEstatisticaUsuario, EstatisticaUsuario
+
+#Colunas da análise contadas por valor em estatisticas_usuario_contagens
+DIMENSOES = {
+    "sentimento": Analysis.sentimento,
+    "legibilidade": Analysis.lvl_legibilidade,
+}
+
+
+class DeltaEstatisticas:
+    def __init__(self, usuario_id: int):
+        self.usuario_id = usuario_id
+        self.total_analises = 0
+        self.total_palavras = 0
+        self.total_caracteres = 0
+        self.total_frases = 0
+        self.soma_pontuacao_sentimento = 0.0
+        self.analises_com_pontuacao = 0
+        self.primeira_analise_em: Optional[datetime.datetime] = None
+        self.ultima_analise_em: Optional[datetime.datetime] = None
+        #Remoções podem tirar a primeira ou a última análise: as datas são recalculadas
+        self.remocoes = False
+        self.contagens: Dict[tuple, int] = {}
+
+    #Soma (sinal 1) ou subtrai (sinal -1) a análise
+    def acumular(self, analise: Analysis, sinal: int) -> None:
+        self.total_analises += sinal
+        self.total_palavras += sinal * (analise.cont_palavras or 0)
+        self.total_caracteres += sinal * (analise.cont_caracteres or 0)
+        self.total_frases += sinal * (analise.cont_frases or 0)
+        if analise.pontuacao_sentimento is not None:
+            self.soma_pontuacao_sentimento += sinal * analise.pontuacao_sentimento
+            self.analises_com_pontuacao += sinal
+
+        for dimensao, coluna in DIMENSOES.items():
+            valor = getattr(analise, coluna.key)
+            if valor is not None:
+                self.contagens[(dimensao, valor)] = self.contagens.get((dimensao, valor), 0) + sinal
+
+        if sinal < 0:
+            self.remocoes = True
+        elif analise.criado_em is not None:
+            if self.primeira_analise_em is None or analise.criado_em < self.primeira_analise_em:
+                self.primeira_analise_em = analise.criado_em
+            if self.ultima_analise_em is None or analise.criado_em > self.ultima_analise_em:
+                self.ultima_analise_em = analise.criado_em
+
+
+#Aplica os deltas de vários usuários na conexão (mesma transação de quem chamou)
+def aplicar_deltas(conexao: Connection, deltas: Dict[int, DeltaEstatisticas]) -> None:
+    agora = datetime.datetime.utcnow()
+    tabela = EstatisticaUsuario
+    comando = insert_dialeto(conexao, tabela)
+    novo = comando.excluded
+    comando = comando.on_conflict_do_update(
+        index_elements=[tabela.usuario_id],
+        set_={
+            "total_analises": tabela.total_analises + novo.total_analises,
+            "total_palavras": tabela.total_palavras + novo.total_palavras,
+            "total_caracteres": tabela.total_caracteres + novo.total_caracteres,
+            "total_frases": tabela.total_frases + novo.total_frases,
+            "soma_pontuacao_sentimento": tabela.soma_pontuacao_sentimento + novo.soma_pontuacao_sentimento,
+            "analises_com_pontuacao": tabela.analises_com_pontuacao + novo.analises_com_pontuacao,
+            "primeira_analise_em": case(
+                (tabela.primeira_analise_em.is_(None) | (novo.primeira_analise_em < tabela.primeira_analise_em), novo.primeira_analise_em),
+                else_=tabela.primeira_analise_em,
+            ),
+            "ultima_analise_em": case(
+                (tabela.ultima_analise_em.is_(None) | (novo.ultima_analise_em > tabela.ultima_analise_em), novo.ultima_analise_em),
+                else_=tabela.ultima_analise_em,
+            ),
+            "atualizado_em": novo.atualizado_em,
+        },
+    )
+    conexao.execute(comando, [
+        {
+            "usuario_id": delta.usuario_id,
+            "total_analises": delta.total_analises,
+            "total_palavras": delta.total_palavras,
+            "total_caracteres": delta.total_caracteres,
+            "total_frases": delta.total_frases,
+            "soma_pontuacao_sentimento": delta.soma_pontuacao_sentimento,
+            "analises_com_pontuacao": delta.analises_com_pontuacao,
+            "primeira_analise_em": delta.primeira_analise_em,
+            "ultima_analise_em": delta.ultima_analise_em,
+            "atualizado_em": agora,
+        }
+        for delta in deltas.values()
+    ])
+
+    contagens = [
+        {"usuario_id": delta.usuario_id, "dimensao": dimensao, "valor": valor, "quantidade": quantidade}
+        for delta in deltas.values()
+        for (dimensao, valor), quantidade in delta.contagens.items()
+        if quantidade
+    ]
+    if contagens:
+        comando = insert_dialeto(conexao, ContagemEstatisticaUsuario)
+        comando = comando.on_conflict_do_update(
+            index_elements=[ContagemEstatisticaUsuario.usuario_id, ContagemEstatisticaUsuario.dimensao, ContagemEstatisticaUsuario.valor],
+            set_={"quantidade": ContagemEstatisticaUsuario.quantidade + comando.excluded.quantidade},
+        )
+        conexao.execute(comando, contagens)
+
+    #Datas extremas depois de remoções: duas buscas no índice (usuario_id, criado_em, id)
+    for delta in deltas.values():
+        if not delta.remocoes:
+            continue
+        filtro = Analysis.usuario_id == delta.usuario_id
+        conexao.execute(
+            EstatisticaUsuario.__table__.update()
+            .where(EstatisticaUsuario.usuario_id == delta.usuario_id)
+            .values(
+                primeira_analise_em=select(Analysis.criado_em).where(filtro).order_by(Analysis.criado_em.asc()).limit(1).scalar_subquery(),
+                ultima_analise_em=select(Analysis.criado_em).where(filtro).order_by(Analysis.criado_em.desc()).limit(1).scalar_subquery(),
+            )
+        )
+
+
+#Listener do evento "after_flush" da Session: análises novas somam, removidas subtraem.
+#Remoções em massa (DELETE sem o ORM) não passam por aqui: devem aplicar os próprios deltas
+#(como app.services.exclusao_service) ou chamar zerar_estatisticas ou reconstruir_estatisticas
+def atualizar_estatisticas_flush(session: Session, contexto) -> None:
+    deltas: Dict[int, DeltaEstatisticas] = {}
+    for objetos, sinal in ((session.new, 1), (session.deleted, -1)):
+        for objeto in objetos:
+            if isinstance(objeto, Analysis) and objeto.usuario_id is not None:
+                delta = deltas.get(objeto.usuario_id)
+                if delta is None:
+                    delta = deltas[objeto.usuario_id] = DeltaEstatisticas(objeto.usuario_id)
+                delta.acumular(objeto, sinal)
+
+    if deltas:
+        aplicar_deltas(session.connection(), deltas)
+
+
+#Remove as estatísticas do usuário (todas as análises dele foram apagadas)
+def zerar_estatisticas(session: Session, usuario_id: int) -> None:
+    session.execute(delete(ContagemEstatisticaUsuario).where(ContagemEstatisticaUsuario.usuario_id == usuario_id))
+    session.execute(delete(EstatisticaUsuario).where(EstatisticaUsuario.usuario_id == usuario_id))
+
+
+#Recalcula as estatísticas a partir da tabela de análises (todos os usuários ou apenas um)
+#Retorna o número de usuários com estatísticas; não faz commit
+def reconstruir_estatisticas(session: Session, usuario_id: Optional[int] = None) -> int:
+    def filtrar(consulta, coluna):
+        return consulta if usuario_id is None else consulta.where(coluna == usuario_id)
+
+    session.execute(filtrar(delete(ContagemEstatisticaUsuario), ContagemEstatisticaUsuario.usuario_id))
+    session.execute(filtrar(delete(EstatisticaUsuario), EstatisticaUsuario.usuario_id))
+
+    agregados = filtrar(select(
+        Analysis.usuario_id,
+        func.count(),
+        func.coalesce(func.sum(Analysis.cont_palavras), 0),
+        func.coalesce(func.sum(Analysis.cont_caracteres), 0),
+        func.coalesce(func.sum(Analysis.cont_frases), 0),
+        func.coalesce(func.sum(Analysis.pontuacao_sentimento), 0.0),
+        func.count(Analysis.pontuacao_sentimento),
+        func.min(Analysis.criado_em),
+        func.max(Analysis.criado_em),
+        literal(datetime.datetime.utcnow(), EstatisticaUsuario.atualizado_em.type),
+    ), Analysis.usuario_id).group_by(Analysis.usuario_id)
+    resultado = session.execute(insert_padrao(EstatisticaUsuario).from_select([
+        "usuario_id", "total_analises", "total_palavras", "total_caracteres", "total_frases",
+        "soma_pontuacao_sentimento", "analises_com_pontuacao", "primeira_analise_em", "ultima_analise_em", "atualizado_em",
+    ], agregados))
+
+    for dimensao, coluna in DIMENSOES.items():
+        contagens = filtrar(
+            select(Analysis.usuario_id, literal(dimensao), coluna, func.count()).where(coluna.is_not(None)),
+            Analysis.usuario_id,
+        ).group_by(Analysis.usuario_id, coluna)
+        session.execute(insert_padrao(ContagemEstatisticaUsuario).from_select(
+            ["usuario_id", "dimensao", "valor", "quantidade"], contagens
+        ))
+    return resultado.rowcount
+
+
+#Estatísticas do usuário no formato da API (duas consultas por chave primária)
+def ler_estatisticas(estatistica: Optional[EstatisticaUsuario], contagens) -> dict:
+    distribuicoes = {dimensao: {} for dimensao in DIMENSOES}
+    for dimensao, valor, quantidade in contagens:
+        if quantidade > 0 and dimensao in distribuicoes:
+            distribuicoes[dimensao][valor] = quantidade
+
+    total = estatistica.total_analises if estatistica else 0
+    if not total:
+        return {
+            "total_analises": 0, "sentimentos": {}, "legibilidade": {},
+            "total_palavras": 0, "total_caracteres": 0, "total_frases": 0,
+            "media_palavras": 0.0, "media_pontuacao_sentimento": None,
+            "primeira_analise_em": None, "ultima_analise_em": None,
+        }
+
+    return {
+        "total_analises": total,
+        "sentimentos": distribuicoes["sentimento"],
+        "legibilidade": distribuicoes["legibilidade"],
+        "total_palavras": estatistica.total_palavras,
+        "total_caracteres": estatistica.total_caracteres,
+        "total_frases": estatistica.total_frases,
+        "media_palavras": round(estatistica.total_palavras / total, 2),
+        "media_pontuacao_sentimento": (
+            round(estatistica.soma_pontuacao_sentimento / estatistica.analises_com_pontuacao, 4)
+            if estatistica.analises_com_pontuacao else None
+        ),
+        "primeira_analise_em": estatistica.primeira_analise_em,
+        "ultima_analise_em": estatistica.ultima_analise_em,
+    }
@@ -0,0 +1,270 @@
+#Exclusão de todas as análises de um usuário em segundo plano
+#A rota só registra o pedido; uma thread por processo apaga as análises em lotes de
+#EXCLUSAO_TAMANHO_LOTE, cada um em uma transação curta que também desvincula os itens de jobs,
+#desconta as estatísticas do usuário, tira do índice de busca os textos que o usuário deixou de
+#ter e purga os textos do lote que ficaram sem análise, então as escritas dos outros usuários não ficam bloqueadas.
+#A reserva do pedido segue o mesmo esquema dos jobs de análise (UPDATE condicional + heartbeat)
+import datetime
+import logging
+import os
+import socket
+import threading
+from functools import lru_cache
+from typing import Callable, Optional
+
+from sqlalchemy import delete, func, select, update # type: ignore
+from sqlalchemy.exc import IntegrityError # type: ignore
+from sqlalchemy.ext.asyncio import AsyncSession # type: ignore
+from sqlalchemy.orm import Session # type: ignore
+
+from app.core.config import (
+    EXCLUSAO_TAMANHO_LOTE, EXCLUSAO_PAUSA_MS, JOBS_INTERVALO, JOBS_MAX_TENTATIVAS, JOBS_HEARTBEAT_EXPIRA,
+)
+from app.models.analysis import Analysis, ExclusaoAnalises
+from app.services.analysis_service import desvincular_itens_jobs
+from app.services.busca_service import remover_do_indice
+from app.services.entidades_service import remover_entidades
+from app.services.estatisticas_service import DeltaEstatisticas, aplicar_deltas
+from app.services.textos_service import purgar_hashes
+
+logger = logging.getLogger("uvicorn.error")
+
+
+def _agora() -> datetime.datetime:
+    return datetime.datetime.utcnow()
+
+
+#Registra o pedido de exclusão das análises existentes; se já houver um em andamento, retorna ele
+async def solicitar_exclusao(session: AsyncSession, usuario_id: int) -> ExclusaoAnalises:
+    exclusao = await session.scalar(
+        select(ExclusaoAnalises)
+        .where(ExclusaoAnalises.usuario_id == usuario_id, ExclusaoAnalises.status.in_(["pendente", "executando"]))
+        .order_by(ExclusaoAnalises.id)
+        .limit(1)
+    )
+    if exclusao is not None:
+        return exclusao
+
+    limite_id, total = (await session.execute(
+        select(func.max(Analysis.id), func.count()).where(Analysis.usuario_id == usuario_id)
+    )).one()
+    exclusao = ExclusaoAnalises(usuario_id=usuario_id, limite_id=limite_id or 0, total=total, status="pendente")
+    if not total:
+        exclusao.status = "concluido"
+        exclusao.concluido_em = _agora()
+    session.add(exclusao)
+    await session.commit()
+    return exclusao
+
+
+#Converte o pedido de exclusão no formato de resposta da API
+def serializar_exclusao(exclusao: ExclusaoAnalises) -> dict:
+    return {
+        "id": exclusao.id,
+        "status": exclusao.status,
+        "total": exclusao.total,
+        "removidas": exclusao.removidas,
+        "progresso": round(min(exclusao.removidas / exclusao.total, 1.0), 4) if exclusao.total else 1.0,
+        "erro": exclusao.erro,
+        "criado_em": exclusao.criado_em,
+        "iniciado_em": exclusao.iniciado_em,
+        "concluido_em": exclusao.concluido_em,
+    }
+
+
+class ExecutorExclusoes:
+    def __init__(self, session_factory: Callable[[], Session], tamanho_lote: int = EXCLUSAO_TAMANHO_LOTE,
+                 pausa: float = EXCLUSAO_PAUSA_MS / 1000, intervalo: float = JOBS_INTERVALO,
+                 max_tentativas: int = JOBS_MAX_TENTATIVAS, heartbeat_expira: int = JOBS_HEARTBEAT_EXPIRA):
+        self.session_factory = session_factory
+        self.tamanho_lote = tamanho_lote
+        self.pausa = pausa
+        self.intervalo = intervalo
+        self.max_tentativas = max_tentativas
+        self.heartbeat_expira = heartbeat_expira
+
+        self.worker = f"{socket.gethostname()}:{os.getpid()}:exclusao"
+        self._thread: Optional[threading.Thread] = None
+        self._parar = threading.Event()
+        self._acordar = threading.Event()
+        self._ultima_recuperacao = 0.0
+
+    #Inicia a thread de exclusão
+    def iniciar(self) -> None:
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._executar, name="exclusoes", daemon=True)
+        self._thread.start()
+
+    #Para a thread; a exclusão em andamento volta para a fila ao fim do lote atual
+    def encerrar(self, timeout: float = 30.0) -> None:
+        self._parar.set()
+        self._acordar.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+
+    #Acorda a thread (chamado quando uma exclusão é pedida neste processo)
+    def notificar(self) -> None:
+        self._acordar.set()
+
+    def _executar(self) -> None:
+        while not self._parar.is_set():
+            try:
+                self._recuperar_travadas()
+                exclusao_id = self._reservar()
+            except Exception:
+                logger.exception("Falha ao buscar exclusões de análises")
+                exclusao_id = None
+
+            if exclusao_id is None:
+                self._acordar.wait(self.intervalo)
+                self._acordar.clear()
+                continue
+
+            try:
+                self._processar(exclusao_id)
+            except Exception as e:
+                logger.exception("Falha na exclusão de análises %s", exclusao_id)
+                self._registrar_falha(exclusao_id, e)
+                self._parar.wait(self.intervalo)
+
+    #Devolve para a fila exclusões cujo processo parou de dar sinal de vida
+    def _recuperar_travadas(self) -> None:
+        agora = _agora()
+        if (agora.timestamp() - self._ultima_recuperacao) < self.heartbeat_expira / 4:
+            return
+        self._ultima_recuperacao = agora.timestamp()
+
+        limite = agora - datetime.timedelta(seconds=self.heartbeat_expira)
+        with self.session_factory() as session:
+            session.execute(
+                update(ExclusaoAnalises)
+                .where(ExclusaoAnalises.status == "executando", ExclusaoAnalises.heartbeat_em < limite)
+                .values(status="pendente", worker=None)
+                .execution_options(synchronize_session=False)
+            )
+            session.commit()
+
+    def _reservar(self) -> Optional[int]:
+        agora = _agora()
+        with self.session_factory() as session:
+            candidatos = session.scalars(
+                select(ExclusaoAnalises.id).where(ExclusaoAnalises.status == "pendente").order_by(ExclusaoAnalises.id).limit(20)
+            ).all()
+            for exclusao_id in candidatos:
+                resultado = session.execute(
+                    update(ExclusaoAnalises)
+                    .where(ExclusaoAnalises.id == exclusao_id, ExclusaoAnalises.status == "pendente")
+                    .values(
+                        status="executando",
+                        worker=self.worker,
+                        heartbeat_em=agora,
+                        iniciado_em=func.coalesce(ExclusaoAnalises.iniciado_em, agora),
+                        tentativas=ExclusaoAnalises.tentativas + 1,
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                session.commit()
+                if resultado.rowcount == 1:
+                    return exclusao_id
+        return None
+
+    #Atualiza a exclusão somente se ela ainda estiver reservada por este processo
+    def _atualizar(self, session: Session, exclusao_id: int, **valores) -> bool:
+        resultado = session.execute(
+            update(ExclusaoAnalises)
+            .where(ExclusaoAnalises.id == exclusao_id, ExclusaoAnalises.status == "executando", ExclusaoAnalises.worker == self.worker)
+            .values(**valores)
+            .execution_options(synchronize_session=False)
+        )
+        return resultado.rowcount == 1
+
+    def _processar(self, exclusao_id: int) -> None:
+        with self.session_factory() as session:
+            exclusao = session.get(ExclusaoAnalises, exclusao_id)
+            usuario_id, limite_id = exclusao.usuario_id, exclusao.limite_id
+
+        while True:
+            if self._parar.is_set():
+                with self.session_factory() as session:
+                    self._atualizar(session, exclusao_id, status="pendente", worker=None, tentativas=ExclusaoAnalises.tentativas - 1)
+                    session.commit()
+                return
+
+            with self.session_factory() as session:
+                removidas = self._excluir_lote(session, exclusao_id, usuario_id, limite_id)
+                if removidas is None:
+                    #Reserva perdida (recuperada por outro processo): descarta o lote
+                    session.rollback()
+                    return
+                session.commit()
+            if not removidas:
+                return
+            self._parar.wait(self.pausa)
+
+    #Apaga um lote e retorna quantas análises foram removidas (0 quando terminou) ou None se a
+    #reserva foi perdida. Não faz commit
+    def _excluir_lote(self, session: Session, exclusao_id: int, usuario_id: int, limite_id: int) -> Optional[int]:
+        while True:
+            #Na ordem do índice (usuario_id, criado_em, id): o lote é lido sem percorrer as análises do usuário
+            linhas = session.execute(
+                select(
+                    Analysis.id, Analysis.cont_palavras, Analysis.cont_caracteres, Analysis.cont_frases,
+                    Analysis.pontuacao_sentimento, Analysis.sentimento, Analysis.lvl_legibilidade, Analysis.criado_em,
+                    Analysis.texto_hash,
+                )
+                .where(Analysis.usuario_id == usuario_id, Analysis.id <= limite_id)
+                .order_by(Analysis.criado_em, Analysis.id)
+                .limit(self.tamanho_lote)
+            ).all()
+            if not linhas:
+                concluida = self._atualizar(session, exclusao_id, status="concluido", worker=None, concluido_em=_agora())
+                return 0 if concluida else None
+
+            ids = [linha.id for linha in linhas]
+            desvincular_itens_jobs(session.connection(), ids)
+            remover_entidades(session.connection(), ids)
+            resultado = session.execute(delete(Analysis).where(Analysis.id.in_(ids)).execution_options(synchronize_session=False))
+            if resultado.rowcount == len(ids):
+                break
+            #Alguma análise do lote foi apagada por outra requisição depois da leitura: as
+            #estatísticas seriam descontadas em dobro, então o lote é lido de novo
+            session.rollback()
+
+        #DELETE sem o ORM não passa pelo listener de estatísticas: o desconto é aplicado aqui
+        delta = DeltaEstatisticas(usuario_id)
+        for linha in linhas:
+            delta.acumular(linha, -1)
+        aplicar_deltas(session.connection(), {usuario_id: delta})
+        remover_do_indice(session.connection(), usuario_id, [linha.texto_hash for linha in linhas])
+
+        #Em um savepoint: se outra transação acabou de gravar uma análise com um desses textos, a
+        #chave estrangeira impede a remoção e o texto fica (continua referenciado)
+        try:
+            with session.begin_nested():
+                purgar_hashes(session.connection(), [linha.texto_hash for linha in linhas])
+        except IntegrityError:
+            logger.info("Textos da exclusão %s voltaram a ser referenciados; purga do lote ignorada", exclusao_id)
+
+        if not self._atualizar(session, exclusao_id, removidas=ExclusaoAnalises.removidas + len(ids), heartbeat_em=_agora()):
+            return None
+        return len(ids)
+
+    #Devolve a exclusão para a fila ou a marca como falha depois de JOBS_MAX_TENTATIVAS
+    def _registrar_falha(self, exclusao_id: int, erro: Exception) -> None:
+        with self.session_factory() as session:
+            exclusao = session.get(ExclusaoAnalises, exclusao_id)
+            if exclusao is None:
+                return
+            if exclusao.tentativas >= self.max_tentativas:
+                self._atualizar(session, exclusao_id, status="falhou", worker=None, erro=str(erro), concluido_em=_agora())
+            else:
+                self._atualizar(session, exclusao_id, status="pendente", worker=None, erro=str(erro))
+            session.commit()
+
+
+#Executor compartilhado (um por processo da API)
+@lru_cache()
+def get_executor_exclusoes() -> ExecutorExclusoes:
+    from app.models.db import SessionLocal
+    return ExecutorExclusoes(SessionLocal)
@@ -0,0 +1,106 @@
+#Exportação do histórico de análises em NDJSON ou CSV
+#As linhas são lidas de um cursor no servidor (stream + yield_per) e enviadas em blocos de
+#EXPORTACAO_LOTE, então a memória usada não depende do tamanho do histórico
+import csv
+import datetime
+import io
+import json
+from typing import AsyncIterator, Callable, Optional, Sequence
+
+from sqlalchemy import select # type: ignore
+from sqlalchemy.ext.asyncio import AsyncSession # type: ignore
+from sqlalchemy.sql import Select # type: ignore
+
+from app.core.config import EXPORTACAO_LOTE
+from app.models.analysis import Analysis, TextoArmazenado
+
+FORMATOS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+COLUNAS = [
+    "id", "texto_original", "sentimento", "pontuacao_sentimento", "palavra_mais_frequente", "entidades",
+    "lvl_legibilidade", "cont_palavras", "cont_caracteres", "cont_frases", "criado_em",
+]
+
+
+#Análises do usuário na ordem do índice (usuario_id, criado_em, id), com filtros opcionais
+def consulta_exportacao(usuario_id: int, inicio: Optional[datetime.datetime] = None, fim: Optional[datetime.datetime] = None,
+                        sentimento: Optional[str] = None) -> Select:
+    consulta = (
+        select(
+            Analysis.id,
+            TextoArmazenado.conteudo.label("texto_original"),
+            Analysis.sentimento,
+            Analysis.pontuacao_sentimento,
+            Analysis.palavra_mais_frequente,
+            Analysis.entidades,
+            Analysis.lvl_legibilidade,
+            Analysis.cont_palavras,
+            Analysis.cont_caracteres,
+            Analysis.cont_frases,
+            Analysis.criado_em,
+        )
+        .join(TextoArmazenado, Analysis.texto_hash == TextoArmazenado.hash)
+        .where(Analysis.usuario_id == usuario_id)
+        .order_by(Analysis.criado_em, Analysis.id)
+    )
+    if inicio is not None:
+        consulta = consulta.where(Analysis.criado_em >= inicio)
+    if fim is not None:
+        consulta = consulta.where(Analysis.criado_em < fim)
+    if sentimento is not None:
+        consulta = consulta.where(Analysis.sentimento == sentimento)
+    return consulta
+
+
+def _ndjson(linhas) -> str:
+    return "".join(
+        json.dumps(dict(linha._mapping, criado_em=linha.criado_em.isoformat() if linha.criado_em else None), ensure_ascii=False) + "\n"
+        for linha in linhas
+    )
+
+
+def _csv(linhas, cabecalho: bool) -> str:
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    if cabecalho:
+        escritor.writerow(COLUNAS)
+    for linha in linhas:
+        valores = dict(linha._mapping)
+        valores["entidades"] = json.dumps(valores["entidades"], ensure_ascii=False)
+        valores["criado_em"] = linha.criado_em.isoformat() if linha.criado_em else ""
+        escritor.writerow([valores[coluna] for coluna in COLUNAS])
+    return buffer.getvalue()
+
+
+#Executa a consulta e lê o primeiro bloco ainda na rota, para que um erro na consulta vire uma
+#resposta de erro e não um arquivo truncado depois do 200. Abre a própria sessão porque o resto
+#é enviado depois que a rota retorna; devolve a sessão (para fechar ao fim da resposta) e o
+#gerador dos blocos
+async def exportar(session_factory: Callable[[], AsyncSession], consulta: Select, formato: str,
+                   lote: int = EXPORTACAO_LOTE):
+    session = session_factory()
+    try:
+        particoes = (await session.stream(consulta.execution_options(yield_per=lote))).partitions()
+        primeiro = await anext(particoes, None)
+    except BaseException:
+        await session.close()
+        raise
+    return session, _blocos(session, particoes, primeiro, formato)
+
+
+async def _blocos(session: AsyncSession, particoes, primeiro: Optional[Sequence], formato: str) -> AsyncIterator[str]:
+    try:
+        if formato == "csv":
+            yield _csv(primeiro or [], True)
+            async for linhas in particoes:
+                yield _csv(linhas, False)
+        else:
+            if primeiro:
+                yield _ndjson(primeiro)
+            async for linhas in particoes:
+                yield _ndjson(linhas)
+    finally:
+        await session.close()
@@ -0,0 +1,153 @@
+#Commit em grupo das análises criadas por requisições concorrentes
+#No SQLite só uma transação escreve por vez e cada commit paga a sua sincronização com o disco;
+#juntando as inserções de várias requisições em um único commit, o custo é dividido entre elas.
+#Cada requisição só recebe a resposta depois do commit do seu grupo.
+#O grupo é gravado por uma sessão síncrona em uma thread: no SQLite o ORM insere linha a linha
+#(RETURNING sem ordem garantida) e, com o aiosqlite, cada linha seria uma ida e volta entre threads
+import asyncio
+import logging
+from functools import lru_cache
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession # type: ignore
+from sqlalchemy.orm import Session, sessionmaker # type: ignore
+
+from app.core.config import SQLITE_COMMIT_EM_GRUPO, SQLITE_COMMIT_ESPERA_MS, SQLITE_COMMIT_MAX
+
+logger = logging.getLogger("uvicorn.error")
+
+
+class GravadorEmGrupo:
+    def __init__(self, session_factory: Callable[[], Session], espera: float = SQLITE_COMMIT_ESPERA_MS / 1000,
+                 maximo: int = SQLITE_COMMIT_MAX, habilitado: bool = True):
+        self.session_factory = session_factory
+        #Tempo máximo que o primeiro item de um grupo espera por outros antes do commit
+        self.espera = espera
+        self.maximo = maximo
+        self.habilitado = habilitado
+        self._fila: Optional[asyncio.Queue] = None
+        self._tarefa: Optional[asyncio.Task] = None
+
+        #Contadores expostos para métricas
+        self.commits = 0
+        self.gravados = 0
+        self.maior_grupo = 0
+        self.falhas = 0
+
+    @property
+    def ativo(self) -> bool:
+        return self._tarefa is not None and not self._tarefa.done()
+
+    #Inicia a tarefa de gravação no event loop atual
+    def iniciar(self) -> None:
+        if self.habilitado and not self.ativo:
+            self._fila = asyncio.Queue()
+            self._tarefa = asyncio.create_task(self._executar())
+
+    #Grava os itens já enfileirados e encerra a tarefa
+    async def encerrar(self) -> None:
+        if self.ativo:
+            await self._fila.put(None)
+            await self._tarefa
+        self._tarefa = None
+
+    #Grava os objetos de uma requisição; sem a tarefa de gravação, faz o commit na própria sessão
+    async def gravar(self, session: AsyncSession, objetos: list) -> None:
+        if not self.ativo:
+            session.add_all(objetos)
+            await session.commit()
+            return
+
+        futuro = asyncio.get_running_loop().create_future()
+        await self._fila.put((objetos, futuro))
+        await futuro
+
+    async def _executar(self) -> None:
+        loop = asyncio.get_running_loop()
+        encerrar = False
+        while not encerrar:
+            item = await self._fila.get()
+            if item is None:
+                break
+
+            #Junta o que chegar até o prazo do primeiro item ou até o tamanho máximo do grupo
+            grupo = [item]
+            prazo = loop.time() + self.espera
+            while len(grupo) < self.maximo:
+                try:
+                    restante = prazo - loop.time()
+                    if restante > 0:
+                        item = await asyncio.wait_for(self._fila.get(), restante)
+                    else:
+                        item = self._fila.get_nowait()
+                except (asyncio.TimeoutError, asyncio.QueueEmpty):
+                    break
+                if item is None:
+                    encerrar = True
+                    break
+                grupo.append(item)
+
+            await self._gravar_grupo(grupo)
+
+    async def _gravar_grupo(self, grupo: List[Tuple[list, asyncio.Future]]) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, self._commit, [objetos for objetos, _ in grupo])
+        except Exception as erro:
+            if len(grupo) == 1:
+                self.falhas += 1
+                self._concluir(grupo[0][1], erro)
+                return
+            #Um item inválido desfaz o grupo inteiro: grava cada requisição separadamente
+            logger.warning("Falha no commit em grupo (%d itens); gravando individualmente: %s", len(grupo), erro)
+            for objetos, futuro in grupo:
+                try:
+                    await loop.run_in_executor(None, self._commit, [objetos])
+                except Exception as erro_item:
+                    self.falhas += 1
+                    self._concluir(futuro, erro_item)
+                else:
+                    self._concluir(futuro)
+            return
+
+        for _, futuro in grupo:
+            self._concluir(futuro)
+
+    def _commit(self, grupos: List[list]) -> None:
+        with self.session_factory() as session:
+            for objetos in grupos:
+                session.add_all(objetos)
+            session.commit()
+        self.commits += 1
+        self.gravados += len(grupos)
+        self.maior_grupo = max(self.maior_grupo, len(grupos))
+
+    #A requisição pode ter sido cancelada (cliente desconectou) enquanto esperava
+    @staticmethod
+    def _concluir(futuro: asyncio.Future, erro: Optional[Exception] = None) -> None:
+        if futuro.done():
+            return
+        if erro is None:
+            futuro.set_result(None)
+        else:
+            futuro.set_exception(erro)
+
+    #Métricas do commit em grupo
+    def estatisticas(self) -> dict:
+        return {
+            "ativo": self.ativo,
+            "commits": self.commits,
+            "gravados": self.gravados,
+            "media_por_commit": round(self.gravados / self.commits, 2) if self.commits else 0.0,
+            "maior_grupo": self.maior_grupo,
+            "falhas": self.falhas,
+        }
+
+
+#Instância compartilhada (uma por processo); só é habilitada no SQLite
+@lru_cache()
+def get_gravador() -> GravadorEmGrupo:
+    from app.models.db import engine, SQLITE
+    #Sem expirar no commit: as requisições leem os objetos gravados depois que a sessão fecha
+    session_factory = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    return GravadorEmGrupo(session_factory, habilitado=SQLITE and SQLITE_COMMIT_EM_GRUPO)
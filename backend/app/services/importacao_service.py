@@ -0,0 +1,160 @@
+#Importação de arquivos CSV ou NDJSON (opcionalmente compactados com gzip) como jobs de análise
+#O arquivo é lido linha a linha e os itens do job são inseridos em lote, sem carregar o arquivo
+#na memória; a análise segue pelos workers de jobs (nlp.pipe em lotes, uma transação por lote).
+#Linhas sem texto ou malformadas viram itens com status "falhou" e o motivo em "erro"
+import csv
+import datetime
+import gzip
+import io
+import json
+import zlib
+from pathlib import PurePath
+from typing import BinaryIO, Callable, Iterator, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, select, update # type: ignore
+from sqlalchemy.orm import Session # type: ignore
+
+from app.core.config import IMPORTACAO_LOTE, IMPORTACAO_MAX_LINHAS, NLP_LIMITE_FLUXO
+from app.models.analysis import ItemJobAnalise, JobAnalise
+
+FORMATOS = ("csv", "ndjson")
+
+#O limite padrão do módulo csv (131072 caracteres por campo) é menor que o maior texto aceito
+#(NLP_LIMITE_FLUXO). Campos até o limite abaixo são lidos e os maiores que NLP_LIMITE_FLUXO viram
+#itens com falha; acima dele o csv não consegue ler o campo e o arquivo é recusado
+LIMITE_CAMPO_CSV = 4 * NLP_LIMITE_FLUXO
+csv.field_size_limit(max(csv.field_size_limit(), LIMITE_CAMPO_CSV))
+
+
+#Formato pelo nome do arquivo (analises.csv, analises.ndjson.gz...); NDJSON quando não houver extensão conhecida
+def detectar_formato(nome: str) -> str:
+    sufixos = [sufixo.lower() for sufixo in PurePath(nome or "").suffixes]
+    return "csv" if ".csv" in sufixos else "ndjson"
+
+
+def _validar_texto(texto: str) -> Tuple[Optional[str], Optional[str]]:
+    if len(texto) > NLP_LIMITE_FLUXO:
+        return None, f"Texto excede o limite de {NLP_LIMITE_FLUXO} caracteres."
+    return texto, None
+
+
+#Lê (texto, erro) de cada linha do arquivo; o gzip é reconhecido pelo conteúdo, não pela extensão
+#CSV com aspas malformadas ou campos maiores que LIMITE_CAMPO_CSV gera ValueError
+def ler_textos(arquivo: BinaryIO, formato: str, coluna: str = "texto") -> Iterator[Tuple[Optional[str], Optional[str]]]:
+    if arquivo.read(2) == b"\x1f\x8b":
+        arquivo.seek(0)
+        arquivo = gzip.GzipFile(fileobj=arquivo, mode="rb")
+    else:
+        arquivo.seek(0)
+    conteudo = io.TextIOWrapper(arquivo, encoding="utf-8-sig", newline="")
+
+    try:
+        if formato == "csv":
+            leitor = csv.DictReader(conteudo, strict=True)
+            try:
+                if coluna not in (leitor.fieldnames or []):
+                    raise ValueError(f"Coluna '{coluna}' não encontrada no CSV.")
+                for linha in leitor:
+                    texto = linha.get(coluna)
+                    yield _validar_texto(texto) if texto and texto.strip() else (None, "Texto vazio.")
+            except csv.Error as e:
+                #line_num conta só as linhas lidas por completo; o erro está na seguinte
+                raise ValueError(f"CSV malformado na linha {leitor.line_num + 1}: {e}") from e
+        else:
+            for linha in conteudo:
+                if not linha.strip():
+                    continue
+                try:
+                    registro = json.loads(linha)
+                except ValueError:
+                    yield None, "JSON inválido."
+                    continue
+                texto = registro.get(coluna) if isinstance(registro, dict) else None
+                if not isinstance(texto, str) or not texto.strip():
+                    yield None, f"Campo '{coluna}' ausente ou vazio."
+                else:
+                    yield _validar_texto(texto)
+    except UnicodeDecodeError as e:
+        raise ValueError("O arquivo deve estar em UTF-8.") from e
+    except (OSError, EOFError, zlib.error) as e:
+        raise ValueError(f"Arquivo compactado inválido: {e}") from e
+
+
+#Renova o heartbeat do job em importação; falha se ele já foi removido como abandonado
+def _sinalizar(session: Session, job_id: int, **valores) -> None:
+    resultado = session.execute(
+        update(JobAnalise)
+        .where(JobAnalise.id == job_id, JobAnalise.status == "importando")
+        .values(heartbeat_em=datetime.datetime.utcnow(), **valores)
+        .execution_options(synchronize_session=False)
+    )
+    if resultado.rowcount != 1:
+        raise TimeoutError("A importação ficou tempo demais sem sinal de vida e foi descartada.")
+
+
+#Cria o job com os textos do arquivo e retorna o id. O job fica como "importando" (os workers
+#ignoram) até a última linha ser gravada, renovando o heartbeat a cada lote; se a leitura falhar,
+#o job e os itens são removidos, e se o processo morrer no meio, remover_importacoes_abandonadas
+#os remove depois
+def importar_arquivo(session_factory: Callable[[], Session], usuario_id: int, arquivo: BinaryIO, formato: str,
+                     coluna: str = "texto", lote: int = IMPORTACAO_LOTE, max_linhas: int = IMPORTACAO_MAX_LINHAS) -> int:
+    with session_factory() as session:
+        job = JobAnalise(usuario_id=usuario_id, status="importando", total=0, heartbeat_em=datetime.datetime.utcnow())
+        session.add(job)
+        session.commit()
+        job_id = job.id
+
+    try:
+        total = falhas = 0
+        itens = []
+        with session_factory() as session:
+            for texto, erro in ler_textos(arquivo, formato, coluna):
+                if total >= max_linhas:
+                    raise ValueError(f"O arquivo excede o limite de {max_linhas} linhas.")
+                itens.append({
+                    "job_id": job_id,
+                    "indice": total,
+                    "texto": texto or "",
+                    "status": "falhou" if erro else "pendente",
+                    "erro": erro,
+                })
+                total += 1
+                falhas += erro is not None
+                if len(itens) >= lote:
+                    session.execute(insert(ItemJobAnalise), itens)
+                    _sinalizar(session, job_id)
+                    session.commit()
+                    itens = []
+
+            if not total:
+                raise ValueError("O arquivo não tem linhas para importar.")
+            if itens:
+                session.execute(insert(ItemJobAnalise), itens)
+
+            #Linhas inválidas já contam como processadas: os workers só leem os itens pendentes
+            _sinalizar(session, job_id, status="pendente", total=total, processados=falhas, falhas=falhas,
+                       disponivel_em=datetime.datetime.utcnow())
+            session.commit()
+    except Exception:
+        with session_factory() as session:
+            session.execute(delete(ItemJobAnalise).where(ItemJobAnalise.job_id == job_id))
+            session.execute(delete(JobAnalise).where(JobAnalise.id == job_id))
+            session.commit()
+        raise
+    return job_id
+
+
+#Remove os jobs que ficaram como "importando" porque o processo que lia o arquivo parou no meio:
+#sem heartbeat (ou, sem ele, criados) antes de `limite`. Os jobs são bloqueados antes (FOR UPDATE
+#no PostgreSQL), então uma importação ainda viva que grave em seguida falha em vez de deixar
+#itens órfãos. Não faz commit; retorna quantos jobs foram removidos
+def remover_importacoes_abandonadas(session: Session, limite: datetime.datetime) -> int:
+    ids = session.execute(
+        select(JobAnalise.id)
+        .where(JobAnalise.status == "importando", func.coalesce(JobAnalise.heartbeat_em, JobAnalise.criado_em) < limite)
+        .with_for_update()
+    ).scalars().all()
+    if ids:
+        session.execute(delete(ItemJobAnalise).where(ItemJobAnalise.job_id.in_(ids)))
+        session.execute(delete(JobAnalise).where(JobAnalise.id.in_(ids)))
+    return len(ids)
@@ -0,0 +1,345 @@
+#Fila de jobs de análise em lote persistida no banco de dados
+#Os workers (threads) de cada processo da API disputam os jobs pendentes com um UPDATE
+#condicional, o que funciona da mesma forma no SQLite e no PostgreSQL
+import datetime
+import logging
+import os
+import socket
+import threading
+import time
+from functools import lru_cache
+from typing import Callable, List, Optional
+
+from sqlalchemy import func, insert, select, update # type: ignore
+from sqlalchemy.ext.asyncio import AsyncSession # type: ignore
+from sqlalchemy.orm import Session # type: ignore
+
+from app.core.config import (
+    JOBS_WORKERS, JOBS_INTERVALO, JOBS_TAMANHO_LOTE, JOBS_MAX_TENTATIVAS,
+    JOBS_MAX_POR_USUARIO, JOBS_HEARTBEAT_EXPIRA,
+)
+from app.models.analysis import ItemJobAnalise, JobAnalise
+from app.services.analysis_service import nova_analise
+from app.services.auditoria_service import duracao_ms, get_registro_auditoria
+from app.services.importacao_service import remover_importacoes_abandonadas
+from app.services.pool_service import PoolCheioError
+
+logger = logging.getLogger("uvicorn.error")
+
+STATUS_FINAIS = {"concluido", "falhou", "cancelado"}
+
+
+def _agora() -> datetime.datetime:
+    return datetime.datetime.utcnow()
+
+
+#Cria o job e um item por texto (os itens são inseridos em lote)
+async def criar_job(session: AsyncSession, usuario_id: int, textos: List[str]) -> JobAnalise:
+    job = JobAnalise(usuario_id=usuario_id, total=len(textos))
+    session.add(job)
+    await session.flush()
+
+    await session.execute(insert(ItemJobAnalise), [
+        {"job_id": job.id, "indice": indice, "texto": texto, "status": "pendente"}
+        for indice, texto in enumerate(textos)
+    ])
+    await session.commit()
+    return job
+
+
+#Cancela o job; se estiver em execução, o worker descarta o lote atual e para
+async def cancelar_job(session: AsyncSession, job: JobAnalise) -> bool:
+    resultado = await session.execute(
+        update(JobAnalise)
+        .where(JobAnalise.id == job.id, JobAnalise.status.in_(["pendente", "executando"]))
+        .values(status="cancelado", worker=None, concluido_em=_agora())
+        .execution_options(synchronize_session=False)
+    )
+    await session.commit()
+    await session.refresh(job)
+    return resultado.rowcount == 1
+
+
+#Converte o job no formato de resposta da API
+def serializar_job(job: JobAnalise) -> dict:
+    return {
+        "id": job.id,
+        "status": job.status,
+        "total": job.total,
+        "processados": job.processados,
+        "falhas": job.falhas,
+        "progresso": round(job.processados / job.total, 4) if job.total else 1.0,
+        "tentativas": job.tentativas,
+        "erro": job.erro,
+        "criado_em": job.criado_em,
+        "iniciado_em": job.iniciado_em,
+        "concluido_em": job.concluido_em,
+    }
+
+
+class ExecutorJobs:
+    def __init__(self, session_factory: Callable[[], Session], analisar_lote: Callable[[List[str]], List[dict]],
+                 workers: int = JOBS_WORKERS, intervalo: float = JOBS_INTERVALO, tamanho_lote: int = JOBS_TAMANHO_LOTE,
+                 max_tentativas: int = JOBS_MAX_TENTATIVAS, max_por_usuario: int = JOBS_MAX_POR_USUARIO,
+                 heartbeat_expira: int = JOBS_HEARTBEAT_EXPIRA):
+        self.session_factory = session_factory
+        self.analisar_lote = analisar_lote
+        self.workers = workers
+        self.intervalo = intervalo
+        self.tamanho_lote = tamanho_lote
+        self.max_tentativas = max_tentativas
+        self.max_por_usuario = max_por_usuario
+        self.heartbeat_expira = heartbeat_expira
+
+        self.identificador = f"{socket.gethostname()}:{os.getpid()}"
+        self._threads = []
+        self._parar = threading.Event()
+        self._acordar = threading.Event()
+        self._ultima_recuperacao = 0.0
+
+    #Inicia as threads de worker
+    def iniciar(self) -> None:
+        self._parar.clear()
+        for numero in range(self.workers):
+            thread = threading.Thread(
+                target=self._executar,
+                args=(f"{self.identificador}:{numero}",),
+                name=f"jobs-{numero}",
+                daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    #Para as threads; jobs em andamento voltam para a fila ao fim do lote atual
+    def encerrar(self, timeout: float = 30.0) -> None:
+        self._parar.set()
+        self._acordar.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    #Acorda os workers (chamado quando um job é criado neste processo)
+    def notificar(self) -> None:
+        self._acordar.set()
+
+    def _executar(self, worker: str) -> None:
+        while not self._parar.is_set():
+            try:
+                self._recuperar_travados()
+                job_id = self._reservar_job(worker)
+            except Exception:
+                logger.exception("Falha ao buscar jobs de análise")
+                job_id = None
+
+            if job_id is None:
+                self._acordar.wait(self.intervalo)
+                self._acordar.clear()
+                continue
+
+            try:
+                self._processar_job(job_id, worker)
+            except Exception:
+                logger.exception("Falha inesperada no job de análise %s", job_id)
+
+    #Devolve para a fila jobs cujo worker parou de dar sinal de vida e remove as importações de
+    #arquivo abandonadas no meio (o processo que lia o arquivo morreu)
+    def _recuperar_travados(self) -> None:
+        agora = _agora()
+        if (agora.timestamp() - self._ultima_recuperacao) < self.heartbeat_expira / 4:
+            return
+        self._ultima_recuperacao = agora.timestamp()
+
+        limite = agora - datetime.timedelta(seconds=self.heartbeat_expira)
+        with self.session_factory() as session:
+            resultado = session.execute(
+                update(JobAnalise)
+                .where(JobAnalise.status == "executando", JobAnalise.heartbeat_em < limite)
+                .values(status="pendente", worker=None, disponivel_em=agora)
+                .execution_options(synchronize_session=False)
+            )
+            abandonadas = remover_importacoes_abandonadas(session, limite)
+            session.commit()
+            if resultado.rowcount:
+                logger.warning("%d job(s) de análise travado(s) devolvido(s) para a fila", resultado.rowcount)
+            if abandonadas:
+                logger.warning("%d importação(ões) abandonada(s) removida(s)", abandonadas)
+
+    #Reserva o próximo job pendente respeitando o limite de jobs simultâneos por usuário
+    def _reservar_job(self, worker: str) -> Optional[int]:
+        agora = _agora()
+        em_execucao = JobAnalise.__table__.alias("em_execucao")
+
+        with self.session_factory() as session:
+            candidatos = session.execute(
+                select(JobAnalise.id, JobAnalise.usuario_id)
+                .where(JobAnalise.status == "pendente", JobAnalise.disponivel_em <= agora)
+                .order_by(JobAnalise.id)
+                .limit(20)
+            ).all()
+
+            for job_id, usuario_id in candidatos:
+                jobs_do_usuario = (
+                    select(func.count())
+                    .select_from(em_execucao)
+                    .where(em_execucao.c.usuario_id == usuario_id, em_execucao.c.status == "executando")
+                    .scalar_subquery()
+                )
+                resultado = session.execute(
+                    update(JobAnalise)
+                    .where(
+                        JobAnalise.id == job_id,
+                        JobAnalise.status == "pendente",
+                        jobs_do_usuario < self.max_por_usuario,
+                    )
+                    .values(
+                        status="executando",
+                        worker=worker,
+                        heartbeat_em=agora,
+                        iniciado_em=func.coalesce(JobAnalise.iniciado_em, agora),
+                        tentativas=JobAnalise.tentativas + 1,
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                session.commit()
+                if resultado.rowcount == 1:
+                    return job_id
+
+        return None
+
+    #Processa os itens pendentes do job em lotes; cada lote é gravado em uma transação
+    def _processar_job(self, job_id: int, worker: str) -> None:
+        while True:
+            if self._parar.is_set():
+                self._devolver(job_id, worker)
+                return
+
+            with self.session_factory() as session:
+                job = session.get(JobAnalise, job_id)
+                if job is None or job.status != "executando" or job.worker != worker:
+                    #Cancelado ou reservado por outro worker
+                    return
+
+                itens = session.execute(
+                    select(ItemJobAnalise)
+                    .where(ItemJobAnalise.job_id == job_id, ItemJobAnalise.status == "pendente")
+                    .order_by(ItemJobAnalise.indice)
+                    .limit(self.tamanho_lote)
+                ).scalars().all()
+
+                if not itens:
+                    self._atualizar_job(session, job_id, worker, status="concluido", worker=None, concluido_em=_agora())
+                    session.commit()
+                    return
+
+                inicio = time.perf_counter()
+                try:
+                    resultados = self.analisar_lote([item.texto for item in itens])
+                except PoolCheioError:
+                    #Sobrecarga momentânea: devolve o job sem gastar uma tentativa
+                    session.rollback()
+                    self._devolver(job_id, worker, atraso=5)
+                    return
+                except Exception as e:
+                    session.rollback()
+                    self._registrar_falha(job_id, worker, e)
+                    return
+
+                try:
+                    falhas = self._gravar_resultados(session, job, itens, resultados)
+                    usuario_id = job.usuario_id
+                    criadas = [item.analysis_id for item in itens if item.analysis_id is not None]
+                    atualizado = self._atualizar_job(
+                        session, job_id, worker,
+                        processados=JobAnalise.processados + len(itens),
+                        falhas=JobAnalise.falhas + falhas,
+                        heartbeat_em=_agora(),
+                    )
+                    if not atualizado:
+                        #Cancelado durante o lote: descarta os resultados
+                        session.rollback()
+                        return
+                    session.commit()
+                except Exception as e:
+                    session.rollback()
+                    self._registrar_falha(job_id, worker, e)
+                    return
+
+            #Auditoria só depois do commit; a duração é a do lote inteiro (análise e gravação)
+            duracao = duracao_ms(inicio)
+            auditoria = get_registro_auditoria()
+            for analysis_id in criadas:
+                auditoria.registrar(usuario_id, "criar", analysis_id, origem="job", duracao=duracao)
+
+    #Cria as análises do lote e marca cada item; retorna o número de falhas de validação
+    def _gravar_resultados(self, session: Session, job: JobAnalise, itens: List[ItemJobAnalise], resultados: List[dict]) -> int:
+        falhas = 0
+        novas = []
+        for item, resultado in zip(itens, resultados):
+            if resultado["resultado"] is None:
+                item.status = "falhou"
+                item.erro = resultado["erro"]
+                falhas += 1
+                continue
+
+            analise = nova_analise(job.usuario_id, item.texto, resultado["resultado"])
+            session.add(analise)
+            novas.append((item, analise))
+
+        session.flush()
+        for item, analise in novas:
+            item.status = "concluido"
+            item.analysis_id = analise.id
+        return falhas
+
+    #Atualiza o job somente se ele ainda estiver reservado por este worker
+    def _atualizar_job(self, session: Session, job_id: int, reservado_por: str, **valores) -> bool:
+        resultado = session.execute(
+            update(JobAnalise)
+            .where(JobAnalise.id == job_id, JobAnalise.status == "executando", JobAnalise.worker == reservado_por)
+            .values(**valores)
+            .execution_options(synchronize_session=False)
+        )
+        return resultado.rowcount == 1
+
+    #Devolve o job para a fila sem contar a tentativa
+    def _devolver(self, job_id: int, worker: str, atraso: float = 0) -> None:
+        with self.session_factory() as session:
+            self._atualizar_job(
+                session, job_id, worker,
+                status="pendente",
+                worker=None,
+                tentativas=JobAnalise.tentativas - 1,
+                disponivel_em=_agora() + datetime.timedelta(seconds=atraso),
+            )
+            session.commit()
+
+    #Agenda nova tentativa com espera exponencial ou marca o job como falho
+    def _registrar_falha(self, job_id: int, worker: str, erro: Exception) -> None:
+        logger.warning("Job de análise %s falhou: %s", job_id, erro)
+        with self.session_factory() as session:
+            job = session.get(JobAnalise, job_id)
+            if job is None:
+                return
+
+            if job.tentativas >= self.max_tentativas:
+                self._atualizar_job(session, job_id, worker, status="falhou", worker=None, erro=str(erro), concluido_em=_agora())
+            else:
+                atraso = 5 * 2 ** (job.tentativas - 1)
+                self._atualizar_job(
+                    session, job_id, worker,
+                    status="pendente",
+                    worker=None,
+                    erro=str(erro),
+                    disponivel_em=_agora() + datetime.timedelta(seconds=atraso),
+                )
+            session.commit()
+
+
+#Executor compartilhado (um por processo da API)
+@lru_cache()
+def get_executor_jobs() -> ExecutorJobs:
+    from app.models.db import SessionLocal
+    from app.services.pool_service import get_pool_analise
+
+    pool = get_pool_analise()
+    return ExecutorJobs(SessionLocal, pool.analisar_lote_sync)
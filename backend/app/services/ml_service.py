@@ -1,217 +1,345 @@
-#Pipelines de ML para classificação de tópicos de textos
-from sklearn.feature_extraction.text import TfidfVectorizer # type: ignore
-from sklearn.naive_bayes import MultinomialNB # type: ignore
-from sklearn.pipeline import Pipeline # type: ignore
-import numpy as np # type: ignore
-import joblib # type: ignore
-import os
-
-#Classe para classificação de tópicos
-class TopicClassifier:
-    def __init__(self):
-        self.pipeline = None
-        self.topics = ["política", "esportes", "tecnologia", "economia", "entretenimento"]
-        self.load_or_train_model()
-
-    #carrega ou treina modelo
-    def load_or_train_model(self):
-        model_path = "topic_model.pkl"
-        
-        #remove modelos antigos 
-        if os.path.exists(model_path):
-            os.remove(model_path)
-        
-        #novo modelo 
-        self.train_basic_model()
-        
-        #salva modelo
-        if self.pipeline:
-            joblib.dump(self.pipeline, model_path)
-
-    #treina modelo básico
-    def train_basic_model(self):        
-        textos_treino = [
-            #política 0
-            "governo medidas econômicas inflação presidente",
-            "presidente líderes internacionais acordos comerciais",
-            "congresso lei reforma tributária impostos",
-            "ministro justiça criminalidade segurança pública",
-            "eleições municipais votos candidatos",
-            "partido oposição políticas sociais",
-            "lei ambiental meio ambiente senado",
-            "prefeitos infraestrutura obras cidade",
-            "candidatos educação escolas públicas",
-            "reforma previdência aposentadoria",
-            
-            #esporte 1
-            "time jogo campeonato futebol esporte",
-            "atleta medalha ouro olimpíadas competição",
-            "jogador futebol transferência contrato",
-            "seleção copa mundo futebol nacional",
-            "estádio torcida jogo público",
-            "campeonato basquete equipes jogadores",
-            "atleta recorde mundial esporte",
-            "time vôlei feminino esporte",
-            "jogador lesão recuperação tratamento",
-            "clube técnico treinador esportes",
-            
-            #tecnologia 2
-            "tecnologia smartphone aplicativo digital",
-            "empresa inteligência artificial software",
-            "startup aplicativo pagamentos digital",
-            "conferência tecnologia inovações",
-            "cibersegurança segurança digital hackers",
-            "sistema operacional computador software",
-            "robótica robôs automação indústria",
-            "realidade virtual jogos simulação",
-            "plataforma streaming vídeo online",
-            "carros autônomos inteligentes direção",
-            
-            #economia 3
-            "bolsa valores ações mercado financeiro",
-            "banco central juros inflação",
-            "inflação preços aumento custo vida",
-            "empresas exportadoras comércio exterior",
-            "moeda dólar câmbio cambio",
-            "mercado imobiliário imóveis casas",
-            "setor industrial fábricas produção",
-            "desemprego emprego trabalho vagas",
-            "comércio eletrônico loja online",
-            "investimentos infraestrutura obras",
-            
-            #entretenimento 4
-            "filme cinema diretor atores",
-            "série TV episódios streaming",
-            "cantor música álbum show",
-            "festival música bandas público",
-            "ator atriz papel personagem",
-            "novela televisão capítulo história",
-            "youtuber vídeo internet canal",
-            "show comédia humor risos",
-            "livro leitura autor editora",
-            "influenciadores redes sociais internet"
-        ]
-        
-        labels_treino = (
-            [0] * 10 +  
-            [1] * 10 + 
-            [2] * 10 +  
-            [3] * 10 +  
-            [4] * 10   
-        ) #10 exemplos por topico
-
-        #pipeline
-        self.pipeline = Pipeline([
-            ('tfidf', TfidfVectorizer(
-                max_features=200,
-                min_df=1,
-                max_df=0.95,
-                ngram_range=(1, 2),
-                stop_words=None
-            )),
-            ('clf', MultinomialNB(alpha=0.01))
-        ])
-        
-        #treino
-        self.pipeline.fit(textos_treino, labels_treino)
-        
-        #acuracia no treino
-        train_preds = self.pipeline.predict(textos_treino)
-        accuracy = np.mean(train_preds == labels_treino)
-        
-        #teste interno
-        test_texts = [
-            ("smartphone tecnologia", "tecnologia"),
-            ("time jogo futebol", "esportes"),
-            ("governo ministro", "política"),
-            ("inflação economia", "economia"),
-            ("filme cinema", "entretenimento")
-        ]
-        
-        for text, expected in test_texts:
-            try:
-                proba = self.pipeline.predict_proba([text])[0]
-                pred_idx = self.pipeline.predict([text])[0]
-                pred_topic = self.topics[pred_idx]
-            except:
-                print(f"  '{text}' -> erro na predição")
-
-    #prediz tópico do texto
-    def predict(self, texto):
-        if self.pipeline is None:
-            print("AVISO: Usando fallback porque pipeline não foi treinado")
-            return self.fallback_predict(texto)
-        
-        #preprocessamento simples
-        try:
-            texto_simplificado = ' '.join([
-                palavra for palavra in texto.lower().split()
-                if len(palavra) > 2  #filtrar palavras muito curtas
-            ])
-            
-            probas = self.pipeline.predict_proba([texto_simplificado])[0]
-            
-            results = []
-            for idx, prob in enumerate(probas):
-                results.append({
-                    "topico": self.topics[idx],
-                    "confianca": float(prob)
-                })
-            
-            #ordem por confianca
-            results.sort(key=lambda x: x["confianca"], reverse=True)
-            
-            #top 2 de confianca
-            top_results = results[:2]
-            for res in top_results:
-                res["confianca"] = round(res["confianca"], 3)
-            
-            return top_results
-            
-        except Exception as e:
-            return self.fallback_predict(texto)
-    
-    #fallback simples baseado em palavras-chave
-    def fallback_predict(self, texto):
-        texto_lower = texto.lower()
-        
-        keywords = {
-            "política": ["governo", "presidente", "ministro", "eleições", "congresso", 
-                        "lei", "política", "partido", "senado", "prefeito", "voto"],
-            "esportes": ["time", "jogo", "campeonato", "atleta", "futebol", "esporte", 
-                        "jogador", "gol", "estádio", "torcida", "competição"],
-            "tecnologia": ["tecnologia", "smartphone", "app", "digital", "software", 
-                          "computador", "internet", "dados", "aplicativo", "celular"],
-            "economia": ["economia", "inflação", "dólar", "bolsa", "mercado", 
-                        "finanças", "investimento", "preços", "dinheiro", "banco"],
-            "entretenimento": ["filme", "série", "música", "show", "ator", "cinema", 
-                              "artista", "livro", "festival", "música", "espetáculo"]
-        }
-        
-        #scores
-        scores = {}
-        for topic, words in keywords.items():
-            score = 0
-            for word in words:
-                if word in texto_lower:
-                    score += 1
-            scores[topic] = score / len(words)
-        
-        #ordenar por score
-        sorted_scores = sorted(scores.items(), key=lambda x: x[1], reverse=True)
-        
-        results = []
-        for topic, score in sorted_scores[:2]:
-            if score > 0:
-                results.append({
-                    "topico": topic,
-                    "confianca": round(score * 0.7, 3) #reduz, mais conservador
-                })
-        
-        if not results:
-            results = [
-                {"topico": "tecnologia", "confianca": 0.2},
-                {"topico": "economia", "confianca": 0.15}
-            ]
-        
+#Pipelines de ML para classificação de tópicos de textos
+#O modelo é treinado uma vez (python -m app.cli treinar-topicos) e salvo como artefato versionado:
+#o nome do arquivo leva o hash dos dados de treino e dos hiperparâmetros, então só há novo
+#treino quando um deles muda
+from sklearn.feature_extraction.text import TfidfVectorizer # type: ignore
+from sklearn.naive_bayes import MultinomialNB # type: ignore
+from sklearn.pipeline import Pipeline # type: ignore
+import sklearn # type: ignore
+import numpy as np # type: ignore
+import joblib # type: ignore
+import datetime
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+from app.core.config import TOPICOS_DIRETORIO_MODELOS, TOPICOS_MODELO, TOPICOS_VERIFICAR_INTERVALO
+
+logger = logging.getLogger("uvicorn.error")
+
+TOPICOS = ["política", "esportes", "tecnologia", "economia", "entretenimento"]
+
+#Dados de treino do classificador básico (10 exemplos por tópico, na ordem de TOPICOS)
+TEXTOS_TREINO = [
+    #política 0
+    "governo medidas econômicas inflação presidente",
+    "presidente líderes internacionais acordos comerciais",
+    "congresso lei reforma tributária impostos",
+    "ministro justiça criminalidade segurança pública",
+    "eleições municipais votos candidatos",
+    "partido oposição políticas sociais",
+    "lei ambiental meio ambiente senado",
+    "prefeitos infraestrutura obras cidade",
+    "candidatos educação escolas públicas",
+    "reforma previdência aposentadoria",
+
+    #esporte 1
+    "time jogo campeonato futebol esporte",
+    "atleta medalha ouro olimpíadas competição",
+    "jogador futebol transferência contrato",
+    "seleção copa mundo futebol nacional",
+    "estádio torcida jogo público",
+    "campeonato basquete equipes jogadores",
+    "atleta recorde mundial esporte",
+    "time vôlei feminino esporte",
+    "jogador lesão recuperação tratamento",
+    "clube técnico treinador esportes",
+
+    #tecnologia 2
+    "tecnologia smartphone aplicativo digital",
+    "empresa inteligência artificial software",
+    "startup aplicativo pagamentos digital",
+    "conferência tecnologia inovações",
+    "cibersegurança segurança digital hackers",
+    "sistema operacional computador software",
+    "robótica robôs automação indústria",
+    "realidade virtual jogos simulação",
+    "plataforma streaming vídeo online",
+    "carros autônomos inteligentes direção",
+
+    #economia 3
+    "bolsa valores ações mercado financeiro",
+    "banco central juros inflação",
+    "inflação preços aumento custo vida",
+    "empresas exportadoras comércio exterior",
+    "moeda dólar câmbio cambio",
+    "mercado imobiliário imóveis casas",
+    "setor industrial fábricas produção",
+    "desemprego emprego trabalho vagas",
+    "comércio eletrônico loja online",
+    "investimentos infraestrutura obras",
+
+    #entretenimento 4
+    "filme cinema diretor atores",
+    "série TV episódios streaming",
+    "cantor música álbum show",
+    "festival música bandas público",
+    "ator atriz papel personagem",
+    "novela televisão capítulo história",
+    "youtuber vídeo internet canal",
+    "show comédia humor risos",
+    "livro leitura autor editora",
+    "influenciadores redes sociais internet"
+]
+
+ROTULOS_TREINO = [indice for indice in range(len(TOPICOS)) for _ in range(10)]
+
+HIPERPARAMETROS = {
+    "tfidf": {"max_features": 200, "min_df": 1, "max_df": 0.95, "ngram_range": [1, 2]},
+    "clf": {"alpha": 0.01},
+}
+
+#Diretório dos artefatos (padrão: backend/modelos)
+DIRETORIO_MODELOS = Path(TOPICOS_DIRETORIO_MODELOS) if TOPICOS_DIRETORIO_MODELOS else Path(__file__).resolve().parents[2] / "modelos"
+
+
+#Hash dos dados de treino, dos hiperparâmetros e da versão do scikit-learn
+def chave_treino(textos=TEXTOS_TREINO, rotulos=ROTULOS_TREINO, hiperparametros=HIPERPARAMETROS) -> str:
+    conteudo = json.dumps({
+        "textos": textos,
+        "rotulos": rotulos,
+        "topicos": TOPICOS,
+        "hiperparametros": hiperparametros,
+        "sklearn": sklearn.__version__,
+    }, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(conteudo).hexdigest()[:16]
+
+
+def caminhos_artefato(chave: str, diretorio: Path = DIRETORIO_MODELOS):
+    return diretorio / f"topicos-{chave}.joblib", diretorio / f"topicos-{chave}.json"
+
+
+#Monta o pipeline TF-IDF + Naive Bayes com os hiperparâmetros informados
+def criar_pipeline(hiperparametros=HIPERPARAMETROS) -> Pipeline:
+    tfidf = dict(hiperparametros["tfidf"], ngram_range=tuple(hiperparametros["tfidf"]["ngram_range"]))
+    return Pipeline([
+        ('tfidf', TfidfVectorizer(stop_words=None, **tfidf)),
+        ('clf', MultinomialNB(**hiperparametros["clf"]))
+    ])
+
+
+#Treina o modelo e salva o artefato com os metadados (escrita atômica: arquivo temporário + os.replace)
+def treinar_e_salvar(diretorio: Path = DIRETORIO_MODELOS) -> dict:
+    chave = chave_treino()
+    caminho_modelo, caminho_meta = caminhos_artefato(chave, diretorio)
+    diretorio.mkdir(parents=True, exist_ok=True)
+
+    inicio = time.perf_counter()
+    pipeline = criar_pipeline()
+    pipeline.fit(TEXTOS_TREINO, ROTULOS_TREINO)
+    tempo_treino = time.perf_counter() - inicio
+    acuracia = float(np.mean(pipeline.predict(TEXTOS_TREINO) == np.array(ROTULOS_TREINO)))
+
+    #Sem compressão para que os arrays possam ser mapeados em memória no carregamento
+    descritor, temporario = tempfile.mkstemp(dir=diretorio, suffix=".joblib.tmp")
+    os.close(descritor)
+    joblib.dump(pipeline, temporario)
+    with open(temporario, "rb") as arquivo:
+        sha256 = hashlib.sha256(arquivo.read()).hexdigest()
+    os.replace(temporario, caminho_modelo)
+
+    metadados = {
+        "chave": chave,
+        "arquivo": caminho_modelo.name,
+        "sha256": sha256,
+        "topicos": TOPICOS,
+        "hiperparametros": HIPERPARAMETROS,
+        "exemplos": len(TEXTOS_TREINO),
+        "acuracia_treino": round(acuracia, 4),
+        "tempo_treino": round(tempo_treino, 3),
+        "sklearn": sklearn.__version__,
+        "criado_em": datetime.datetime.utcnow().isoformat(),
+    }
+    descritor, temporario = tempfile.mkstemp(dir=diretorio, suffix=".json.tmp")
+    with os.fdopen(descritor, "w", encoding="utf-8") as arquivo:
+        json.dump(metadados, arquivo, ensure_ascii=False, indent=2)
+    os.replace(temporario, caminho_meta)
+    return metadados
+
+
+#Carrega o artefato da chave atual com mmap (as páginas dos arrays são compartilhadas entre os workers)
+def carregar_modelo(diretorio: Path = DIRETORIO_MODELOS, chave: Optional[str] = None):
+    chave = chave or chave_treino()
+    caminho_modelo, caminho_meta = caminhos_artefato(chave, diretorio)
+    if not caminho_modelo.exists() or not caminho_meta.exists():
+        return None, None
+
+    with open(caminho_meta, encoding="utf-8") as arquivo:
+        metadados = json.load(arquivo)
+    return joblib.load(caminho_modelo, mmap_mode="r"), metadados
+
+
+#Classe para classificação de tópicos
+class TopicClassifier:
+    def __init__(self, diretorio: Path = DIRETORIO_MODELOS, treinar_se_ausente: bool = True, modelo: str = TOPICOS_MODELO):
+        #(pipeline, tópicos, metadados) do modelo em uso, publicados juntos numa única atribuição:
+        #quem lê a tupla uma vez nunca mistura o pipeline de um artefato com os tópicos de outro
+        self.carregado = (None, TOPICOS, None)
+        self.diretorio = diretorio
+        self.modelo = modelo
+        self._trava = threading.Lock()
+        self._verificado_em = time.monotonic()
+        self._modificado_em = None
+        self.load_or_train_model(diretorio, treinar_se_ausente)
+
+    @property
+    def pipeline(self):
+        return self.carregado[0]
+
+    @property
+    def topics(self):
+        return self.carregado[1]
+
+    @property
+    def metadados(self):
+        return self.carregado[2]
+
+    #carrega o artefato da versão atual; treina apenas se ele ainda não existir
+    #com modelo "incremental" usa o artefato do treino incremental (e o básico enquanto ele não existir)
+    #Fora do __init__, chamar com _trava (ver recarregar)
+    def load_or_train_model(self, diretorio: Path = DIRETORIO_MODELOS, treinar_se_ausente: bool = True):
+        inicio = time.perf_counter()
+        pipeline, metadados = None, None
+
+        if self.modelo == "incremental":
+            pipeline, metadados = carregar_modelo(diretorio, "incremental")
+            if pipeline is None:
+                logger.warning("Modelo de tópicos incremental não encontrado em %s; usando o modelo básico", diretorio)
+
+        if pipeline is None:
+            pipeline, metadados = carregar_modelo(diretorio)
+
+        if pipeline is None and treinar_se_ausente:
+            logger.warning("Modelo de tópicos não encontrado em %s; treinando (use `python -m app.cli treinar-topicos` no build)", diretorio)
+            treinar_e_salvar(diretorio)
+            pipeline, metadados = carregar_modelo(diretorio)
+
+        topicos = self.topics
+        if metadados:
+            topicos = metadados["topicos"]
+            self._modificado_em = caminhos_artefato(metadados["chave"], diretorio)[1].stat().st_mtime
+        self.carregado = (pipeline, topicos, metadados)
+        self.tempo_carregamento = time.perf_counter() - inicio
+
+    #Recarrega o modelo na hora (ex.: depois de novos exemplos recebidos por este worker)
+    def recarregar(self):
+        with self._trava:
+            self._verificado_em = time.monotonic()
+            self.load_or_train_model(self.diretorio)
+
+    #Recarrega o modelo quando o artefato em disco foi atualizado (ex.: novos exemplos via API
+    #recebidos por outro worker); verifica no máximo a cada TOPICOS_VERIFICAR_INTERVALO segundos
+    def recarregar_se_alterado(self):
+        if self.modelo != "incremental" or time.monotonic() - self._verificado_em < TOPICOS_VERIFICAR_INTERVALO:
+            return
+
+        with self._trava:
+            self._verificado_em = time.monotonic()
+            _, caminho_meta = caminhos_artefato("incremental", self.diretorio)
+            try:
+                modificado_em = caminho_meta.stat().st_mtime
+            except FileNotFoundError:
+                return
+            if modificado_em != self._modificado_em:
+                self.load_or_train_model(self.diretorio)
+
+    #Versão e origem do modelo carregado
+    def informacoes(self) -> dict:
+        metadados = self.metadados
+        return {
+            "modelo": self.modelo,
+            "chave": metadados["chave"] if metadados else None,
+            "criado_em": metadados["criado_em"] if metadados else None,
+            "tempo_carregamento": round(self.tempo_carregamento, 3),
+        }
+
+    #prediz tópico do texto
+    def predict(self, texto, k: int = 2):
+        return self.predict_many([texto], k=k)[0]
+
+    #prediz os k tópicos mais prováveis de vários textos de uma vez
+    #(uma única matriz esparsa e uma única chamada de predict_proba para o lote)
+    def predict_many(self, textos, k: int = 2):
+        self.recarregar_se_alterado()
+        pipeline, topicos, _ = self.carregado
+        if pipeline is None:
+            print("AVISO: Usando fallback porque pipeline não foi treinado")
+            return [self.fallback_predict(texto)[:k] for texto in textos]
+
+        try:
+            probas = pipeline.predict_proba([self.simplificar_texto(texto) for texto in textos])
+        except Exception as e:
+            return [self.fallback_predict(texto)[:k] for texto in textos]
+
+        k = max(1, min(k, probas.shape[1]))
+
+        #k maiores probabilidades de cada linha, depois ordenadas entre si (empates ficam com o menor índice)
+        indices = np.sort(np.argpartition(-probas, k - 1, axis=1)[:, :k], axis=1)
+        confiancas = np.take_along_axis(probas, indices, axis=1)
+        ordem = np.argsort(-confiancas, axis=1, kind="stable")
+        indices = np.take_along_axis(indices, ordem, axis=1)
+        confiancas = np.round(np.take_along_axis(confiancas, ordem, axis=1), 3)
+
+        #Resposta montada só no final, a partir das listas
+        return [
+            [{"topico": topicos[indice], "confianca": confianca} for indice, confianca in zip(linha_indices, linha_confiancas)]
+            for linha_indices, linha_confiancas in zip(indices.tolist(), confiancas.tolist())
+        ]
+
+    #preprocessamento simples: minúsculas e sem palavras muito curtas
+    @staticmethod
+    def simplificar_texto(texto):
+        return ' '.join([
+            palavra for palavra in texto.lower().split()
+            if len(palavra) > 2  #filtrar palavras muito curtas
+        ])
+    
+    #fallback simples baseado em palavras-chave
+    def fallback_predict(self, texto):
+        texto_lower = texto.lower()
+        
+        keywords = {
+            "política": ["governo", "presidente", "ministro", "eleições", "congresso", 
+                        "lei", "política", "partido", "senado", "prefeito", "voto"],
+            "esportes": ["time", "jogo", "campeonato", "atleta", "futebol", "esporte", 
+                        "jogador", "gol", "estádio", "torcida", "competição"],
+            "tecnologia": ["tecnologia", "smartphone", "app", "digital", "software", 
+                          "computador", "internet", "dados", "aplicativo", "celular"],
+            "economia": ["economia", "inflação", "dólar", "bolsa", "mercado", 
+                        "finanças", "investimento", "preços", "dinheiro", "banco"],
+            "entretenimento": ["filme", "série", "música", "show", "ator", "cinema", 
+                              "artista", "livro", "festival", "música", "espetáculo"]
+        }
+        
+        #scores
+        scores = {}
+        for topic, words in keywords.items():
+            score = 0
+            for word in words:
+                if word in texto_lower:
+                    score += 1
+            scores[topic] = score / len(words)
+        
+        #ordenar por score
+        sorted_scores = sorted(scores.items(), key=lambda x: x[1], reverse=True)
+        
+        results = []
+        for topic, score in sorted_scores[:2]:
+            if score > 0:
+                results.append({
+                    "topico": topic,
+                    "confianca": round(score * 0.7, 3) #reduz, mais conservador
+                })
+        
+        if not results:
+            results = [
+                {"topico": "tecnologia", "confianca": 0.2},
+                {"topico": "economia", "confianca": 0.15}
+            ]
+        
         return results
\ No newline at end of file
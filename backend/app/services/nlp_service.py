@@ -1,278 +1,477 @@
-# NLP Service para análise de texto em português
-import spacy #type: ignore
-from collections import Counter
-import re
-import pyphen #type: ignore
-import json
-from typing import List, Dict, Any
-import unicodedata
-
-#Carregando o modelo de linguagem para português
-class NLPService:
-    def __init__(self):
-        self.nlp = spacy.load("pt_core_news_sm")
-        #Inicializando o dicionário de hifenização para português
-        self.lexico_positivo = {
-            "bom", "boa", "excelente", "ótimo", "ótima", "maravilhoso", "fantástico",
-            "incrível", "rápido", "eficiente", "eficaz", "funciona", "funcionou",
-            "fácil", "simples", "intuitivo", "útil", "prático", "recomendo", "gosto",
-            "ótimo", "perfeito", "estável", "confiável", "satisfeito", "agilidade",
-            "qualidade", "positivo", "sucesso", "solucionou", "resolvido", "melhor",
-            "melhorou", "ótimo", "excepcional", "nota", "nota 10", "dez"
-        }
-        
-        self.lexico_negativo = {
-            "ruim", "péssimo", "horrível", "terrível", "lento", "lenta", "devagar",
-            "instável", "erro", "problema", "defeito", "falha", "bug", "crasha",
-            "travando", "travou", "congela", "pior", "piorou", "difícil", "complicado",
-            "complexo", "confuso", "inútil", "inutil", "inúteis", "inútil", "inútil",
-            "frustrante", "frustração", "insatisfeito", "decepcionante", "decepção",
-            "negativo", "fracasso", "falhou", "não funciona", "não recomendo",
-            "detesto", "odeio", "horrível", "desastre", "catastrófico"
-        }
-        
-        self.intensificadores = {
-            "muito": 1.5, "muita": 1.5, "extremamente": 2.0, "totalmente": 1.8,
-            "completamente": 1.8, "absolutamente": 2.0, "realmente": 1.3,
-            "verdadeiramente": 1.4, "incrivelmente": 1.7, "fantasticamente": 1.7,
-            "horrivelmente": 2.0, "péssimamente": 2.0, "terrivelmente": 2.0,
-            "bastante": 1.4, "demais": 1.6, "super": 1.5, "ultra": 1.7,
-            "extraordinariamente": 1.9, "excepcionalmente": 1.8
-        }
-        
-        self.negacoes = {"não", "nem", "nunca", "jamais", "tampouco"}
-
-    #Análise completa do texto
-    def analisar_texto(self, texto: str) -> dict:
-        texto = texto.strip()
-
-        if not texto:
-            raise ValueError("Texto vazio.")
-        
-        if len(texto) < 10:
-            raise ValueError("Texto muito curto.")
-
-        if len(texto) > 20000:
-            raise ValueError("Texto muito longo.")
-        
-        doc = self.nlp(texto)
-
-        sentimento = self.analisar_sentimento_portugues(texto, doc)
-        palavra_mais_frequente = self.palavra_mais_frequente(doc)
-        entidades = self.extrair_entidades(doc)
-        lvl_legibilidade = self.lvl_legibilidade_adaptado(doc)
-        cont_palavras = self.cont_palavras(texto)
-        cont_caracteres = self.cont_caracteres(texto)
-        cont_frases = self.cont_frases(doc)
-            
-        resultado = {
-            "sentimento": sentimento,
-            "palavra_mais_frequente": palavra_mais_frequente,
-            "entidades": entidades,
-            "lvl_legibilidade": lvl_legibilidade,
-            "cont_palavras": cont_palavras,
-            "cont_caracteres": cont_caracteres,
-            "cont_frases": cont_frases
-        }
-        
-        return resultado
-
-    #Análise de sentimento para texto em português
-    def analisar_sentimento_portugues(self, texto: str, doc) -> str:
-        #Pré-processamento do texto
-        texto_limpo = self.preprocessar_texto(texto)
-        tokens = [token.text.lower() for token in doc if token.is_alpha]
-        
-        if not tokens:
-            return "Neutro"
-        
-        #Cálculo da pontuação de sentimento
-        pontuacao = 0
-        total_tokens = len(tokens)
-        
-        for i, token in enumerate(tokens):
-            token_lower = token.lower()
-            
-            is_negacao = token_lower in self.negacoes
-            
-            intensificador = self.intensificadores.get(token_lower, 1.0)
-            
-            proximo_positivo = False
-            proximo_negativo = False
-            
-            #Verifica o próximo token para intensificação
-            if i + 1 < len(tokens):
-                proximo_token = tokens[i + 1]
-                if proximo_token in self.lexico_positivo:
-                    proximo_positivo = True
-                elif proximo_token in self.lexico_negativo:
-                    proximo_negativo = True
-            
-            if token_lower in self.lexico_positivo:
-                if is_negacao:
-                    pontuacao -= 1.0 * intensificador
-                else:
-                    pontuacao += 1.0 * intensificador
-                    
-                if i > 0 and tokens[i-1] in ["muito", "bastante"]:
-                    pontuacao += 0.5
-            
-            elif token_lower in self.lexico_negativo:
-                if is_negacao:
-                    pontuacao += 1.0 * intensificador
-                else:
-                    pontuacao -= 1.0 * intensificador
-                    
-                if i > 0 and tokens[i-1] in ["muito", "bastante"]:
-                    pontuacao -= 0.5
-            
-            #Verifica bigramas para expressões comuns
-            if i + 1 < len(tokens):
-                bigrama = f"{token_lower} {tokens[i+1]}"
-                if any(expr in bigrama for expr in ["muito bom", "muito boa", "muito útil"]):
-                    pontuacao += 2.0
-                elif any(expr in bigrama for expr in ["muito ruim", "muito lento", "não funciona"]):
-                    pontuacao -= 2.0
-        
-        #Normalização da pontuação
-        pontuacao_normalizada = pontuacao / max(total_tokens, 1)
-        
-        if pontuacao_normalizada > 0.1:
-            return "Positivo"
-        elif pontuacao_normalizada < -0.1:
-            return "Negativo"
-        else:
-            return "Neutro"
-
-    #Pré-processamento do texto
-    def preprocessar_texto(self, texto: str) -> str:
-        texto = texto.lower()
-        texto = ''.join(c for c in unicodedata.normalize('NFD', texto) 
-                       if unicodedata.category(c) != 'Mn')
-        return texto
-
-    #Encontrar a palavra mais frequente no texto
-    def palavra_mais_frequente(self, doc) -> str:     
-        palavras = [
-            token.text for token in doc
-            if token.is_alpha
-            and not token.is_stop
-            and len(token.text) > 2
-        ]
-        
-        if not palavras:
-            return "Nenhuma palavra significativa encontrada."
-        
-        #Contagem de frequência das palavras
-        cont = Counter(palavras)
-        return cont.most_common(1)[0][0]
-    
-    #Extração de entidades nomeadas
-    def extrair_entidades(self, doc) -> list:
-        entidades = []
-
-        #Filtra entidades relevantes
-        for ent in doc.ents:
-            if ent.label_ not in {"PER", "ORG", "LOC"}:
-                continue
-
-            if ent.label_ == "PER" and len(ent.text.split()) < 2:
-                continue
-
-            entidades.append({
-                "texto": ent.text,
-                "tipo": ent.label_,
-            })
-
-        return entidades
-
-    #Contagem de sílabas em uma palavra
-    def cont_silabas(self, palavra: str) -> int:
-        #Remover caracteres não alfabéticos e converter para minúsculas
-        palavra = ''.join(c for c in palavra if c.isalpha()).lower()
-        
-        if not palavra:
-            return 0
-        
-        #Definição de vogais, ditongos e tritongos em português
-        vogais = 'aeiouáéíóúâêîôûàèìòùãõ'
-        ditongos = ['ai', 'au', 'ei', 'eu', 'oi', 'ou', 'ui',
-                   'ãe', 'ão', 'õe', 'ae', 'ao', 'ia', 'ie',
-                   'io', 'iu', 'ua', 'ue', 'uo', 'uã', 'uõ']
-        tritongos = ['uai', 'uei', 'uão', 'uãe', 'uõe']
-        
-        palavra_simplificada = palavra
-        for vogal_acentuada in 'áéíóúâêîôûàèìòùãõ':
-            if vogal_acentuada in palavra_simplificada:
-                palavra_simplificada = palavra_simplificada.replace(vogal_acentuada, vogal_acentuada[0])
-        
-        #Contagem de sílabas
-        silabas = 0
-        i = 0
-        while i < len(palavra_simplificada):
-            if i <= len(palavra_simplificada) - 3:
-                tri = palavra_simplificada[i:i+3]
-                if tri in tritongos:
-                    silabas += 1
-                    i += 3
-                    continue
-            
-            if i <= len(palavra_simplificada) - 2:
-                di = palavra_simplificada[i:i+2]
-                if di in ditongos:
-                    silabas += 1
-                    i += 2
-                    continue
-            
-            if palavra_simplificada[i] in vogais:
-                silabas += 1
-            
-            i += 1
-        
-        if silabas == 0 and any(c in vogais for c in palavra_simplificada):
-            silabas = 1
-            
-        return max(silabas, 1)
-
-    #Cálculo do nível de legibilidade adaptado para português
-    def lvl_legibilidade_adaptado(self, doc) -> str:
-        
-        frases = self.cont_frases(doc)
-        palavras = [token.text for token in doc if token.is_alpha]
-        
-        if frases < 1 or len(palavras) < 10:
-            return "Curto demais para avaliar."
-        
-        #Cálculo do índice de legibilidade
-        palavras_por_frase = len(palavras) / frases
-        
-        #Contagem total de sílabas
-        total_silabas = sum(self.cont_silabas(p) for p in palavras)
-        silabas_por_palavra = total_silabas / len(palavras)
-        
-        #Índice de legibilidade adaptado#
-        indice = 180 - palavras_por_frase - (58.5 * silabas_por_palavra)
-        
-        if indice >= 80:
-            return "Muito fácil (Educação fundamental)"
-        elif indice >= 60:
-            return "Fácil (Ensino médio)"
-        elif indice >= 40:
-            return "Médio (Ensino superior)"
-        elif indice >= 20:
-            return "Difícil (Graduação)"
-        else:
-            return "Muito difícil (Pós-graduação)"
-
-    #Contagem de palavras no texto
-    def cont_palavras(self, texto: str) -> int:
-        palavras = re.findall(r'\b\w+\b', texto)
-        return len(palavras)
-
-    #Contagem de caracteres no texto
-    def cont_caracteres(self, texto: str) -> int:
-        return len(texto)
-
-    #Contagem de frases no texto
-    def cont_frases(self, doc) -> int:
-        return len(list(doc.sents))
+# NLP Service para análise de texto em português
+import spacy #type: ignore
+from collections import Counter
+import copy
+import itertools
+import re
+import pyphen #type: ignore
+import json
+import time
+import hashlib
+from functools import lru_cache
+from typing import List, Dict, Any, Iterator, Optional
+from app.core.config import NLP_BATCH_SIZE, NLP_N_PROCESS, NLP_PERFIL, NLP_SILABAS, NLP_SILABAS_CACHE, NLP_LIMITE_CARACTERES, NLP_LIMITE_FLUXO, NLP_TAMANHO_BLOCO
+from app.services.cache_service import CacheResultados, criar_cache_resultados
+from app.services.sentimento_service import FluxoSentimento, MotorSentimento, normalizar
+
+MODELO_SPACY = "pt_core_news_sm"
+
+#Perfis de pipeline: componentes excluídos no carregamento e componentes habilitados depois
+#O serviço só usa is_alpha/is_stop (léxico), doc.ents (ner) e doc.sents (parser ou senter),
+#então lemmatizer, morphologizer e attribute_ruler nunca são lidos
+PERFIS_PIPELINE = {
+    #Todos os componentes do modelo; frases delimitadas pelo parser de dependências
+    "completo": {"excluir": [], "habilitar": []},
+    #Sem os componentes morfológicos; frases ainda delimitadas pelo parser
+    "enxuto": {"excluir": ["lemmatizer", "morphologizer", "attribute_ruler"], "habilitar": []},
+    #Sem o parser; frases delimitadas pelo senter, bem mais leve
+    "rapido": {"excluir": ["lemmatizer", "morphologizer", "attribute_ruler", "parser"], "habilitar": ["senter"]},
+}
+
+#Incrementar quando o formato do resultado de analisar_texto mudar
+VERSAO_RESULTADO = 2
+
+#Fim de frase: pontuação final, aspas/parênteses de fechamento e o espaço seguinte
+FIM_DE_FRASE = re.compile(r'[.!?…]+["\'”»)\]]*\s+')
+
+#Sílabas: tritongos, ditongos e vogais isoladas. A alternância do regex testa os tritongos antes
+#dos ditongos e das vogais, e caracteres que não iniciam sílaba são pulados
+VOGAIS = 'aeiouáéíóúâêîôûàèìòùãõ'
+DITONGOS = ['ai', 'au', 'ei', 'eu', 'oi', 'ou', 'ui',
+            'ãe', 'ão', 'õe', 'ae', 'ao', 'ia', 'ie',
+            'io', 'iu', 'ua', 'ue', 'uo', 'uã', 'uõ']
+TRITONGOS = ['uai', 'uei', 'uão', 'uãe', 'uõe']
+SILABA = re.compile('|'.join(TRITONGOS + DITONGOS) + f'|[{VOGAIS}]')
+
+
+#Contagem de sílabas por regras (memorizada por palavra e compartilhada entre requisições)
+@lru_cache(maxsize=NLP_SILABAS_CACHE)
+def contar_silabas_regras(palavra: str) -> int:
+    #Remover caracteres não alfabéticos e converter para minúsculas
+    palavra = ''.join(c for c in palavra if c.isalpha()).lower()
+    if not palavra:
+        return 0
+    return max(len(SILABA.findall(palavra)), 1)
+
+
+#Dicionário de hifenização do pyphen (carregado no primeiro uso)
+@lru_cache()
+def dicionario_pyphen():
+    return pyphen.Pyphen(lang='pt_BR', left=1, right=1)
+
+
+#Contagem de sílabas pela hifenização do pyphen (memorizada por palavra)
+@lru_cache(maxsize=NLP_SILABAS_CACHE)
+def contar_silabas_pyphen(palavra: str) -> int:
+    palavra = ''.join(c for c in palavra if c.isalpha()).lower()
+    if not palavra:
+        return 0
+    return len(dicionario_pyphen().positions(palavra)) + 1
+
+
+CONTADORES_SILABAS = {
+    "regras": contar_silabas_regras,
+    "pyphen": contar_silabas_pyphen,
+}
+
+#Texto usado para aquecer o pipeline na inicialização da aplicação
+TEXTO_AQUECIMENTO = (
+    "O aplicativo da Petrobras funciona muito bem no Brasil. "
+    "João Silva achou o sistema rápido, mas a instalação foi complicada."
+)
+
+#Carregando o modelo de linguagem para português
+class NLPService:
+    def __init__(self, cache: Optional[CacheResultados] = None, perfil: str = NLP_PERFIL, silabas: str = NLP_SILABAS):
+        if perfil not in PERFIS_PIPELINE:
+            raise ValueError(f"Perfil de pipeline desconhecido: {perfil}")
+        if silabas not in CONTADORES_SILABAS:
+            raise ValueError(f"Modo de contagem de sílabas desconhecido: {silabas}")
+
+        inicio = time.perf_counter()
+        self.perfil = perfil
+        self.nlp = self.carregar_pipeline(perfil)
+        self.modo_silabas = silabas
+        self.contar_silabas = CONTADORES_SILABAS[silabas]
+        #Inicializando o dicionário de hifenização para português
+        self.lexico_positivo = {
+            "bom", "boa", "excelente", "ótimo", "ótima", "maravilhoso", "fantástico",
+            "incrível", "rápido", "eficiente", "eficaz", "funciona", "funcionou",
+            "fácil", "simples", "intuitivo", "útil", "prático", "recomendo", "gosto",
+            "ótimo", "perfeito", "estável", "confiável", "satisfeito", "agilidade",
+            "qualidade", "positivo", "sucesso", "solucionou", "resolvido", "melhor",
+            "melhorou", "ótimo", "excepcional", "nota", "nota 10", "dez"
+        }
+        
+        self.lexico_negativo = {
+            "ruim", "péssimo", "horrível", "terrível", "lento", "lenta", "devagar",
+            "instável", "erro", "problema", "defeito", "falha", "bug", "crasha",
+            "travando", "travou", "congela", "pior", "piorou", "difícil", "complicado",
+            "complexo", "confuso", "inútil", "inutil", "inúteis", "inútil", "inútil",
+            "frustrante", "frustração", "insatisfeito", "decepcionante", "decepção",
+            "negativo", "fracasso", "falhou", "não funciona", "não recomendo",
+            "detesto", "odeio", "horrível", "desastre", "catastrófico"
+        }
+        
+        self.intensificadores = {
+            "muito": 1.5, "muita": 1.5, "extremamente": 2.0, "totalmente": 1.8,
+            "completamente": 1.8, "absolutamente": 2.0, "realmente": 1.3,
+            "verdadeiramente": 1.4, "incrivelmente": 1.7, "fantasticamente": 1.7,
+            "horrivelmente": 2.0, "péssimamente": 2.0, "terrivelmente": 2.0,
+            "bastante": 1.4, "demais": 1.6, "super": 1.5, "ultra": 1.7,
+            "extraordinariamente": 1.9, "excepcionalmente": 1.8
+        }
+        
+        self.negacoes = {"não", "nem", "nunca", "jamais", "tampouco"}
+
+        #Léxicos compilados para a pontuação de sentimento
+        self.motor_sentimento = MotorSentimento(
+            self.lexico_positivo, self.lexico_negativo, self.intensificadores, self.negacoes
+        )
+
+        #Cache de resultados (opcional) e versão usada nas chaves
+        self.cache = cache
+        self.versao = self.calcular_versao()
+
+        #Tempo gasto carregando o modelo e os léxicos (em segundos)
+        self.tempo_carregamento = time.perf_counter() - inicio
+        self.tempo_aquecimento = None
+
+    #Carrega o modelo do spaCy apenas com os componentes do perfil
+    @staticmethod
+    def carregar_pipeline(perfil: str):
+        config = PERFIS_PIPELINE[perfil]
+        nlp = spacy.load(MODELO_SPACY, exclude=config["excluir"])
+        for componente in config["habilitar"]:
+            nlp.enable_pipe(componente)
+        return nlp
+
+    #Versão do pipeline: muda sempre que o modelo, os componentes ou os léxicos mudam
+    def calcular_versao(self) -> str:
+        partes = {
+            "resultado": VERSAO_RESULTADO,
+            "spacy": spacy.__version__,
+            "modelo": MODELO_SPACY,
+            "versao_modelo": self.nlp.meta.get("version"),
+            "componentes": self.nlp.pipe_names,
+            "silabas": self.modo_silabas,
+            "lexico_positivo": sorted(self.lexico_positivo),
+            "lexico_negativo": sorted(self.lexico_negativo),
+            "intensificadores": sorted(self.intensificadores.items()),
+            "negacoes": sorted(self.negacoes),
+        }
+        conteudo = json.dumps(partes, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        return hashlib.sha256(conteudo).hexdigest()[:16]
+
+    #Executa uma análise descartável para aquecer o pipeline (sem passar pelo cache)
+    def aquecer(self) -> float:
+        inicio = time.perf_counter()
+        self.montar_resultado(TEXTO_AQUECIMENTO, self.nlp(TEXTO_AQUECIMENTO))
+        self.tempo_aquecimento = time.perf_counter() - inicio
+        return self.tempo_aquecimento
+
+    #Descrição do pipeline carregado e dos tempos de inicialização
+    def informacoes(self) -> dict:
+        return {
+            "versao": self.versao,
+            "perfil": self.perfil,
+            "componentes": list(self.nlp.pipe_names),
+            "silabas": self.modo_silabas,
+            "cache_silabas": self.contar_silabas.cache_info()._asdict(),
+            "tempo_carregamento": round(self.tempo_carregamento, 3),
+            "tempo_aquecimento": round(self.tempo_aquecimento, 3) if self.tempo_aquecimento is not None else None,
+        }
+
+    #Validação do texto de entrada (retorna o texto sem espaços nas bordas)
+    #Textos acima de NLP_LIMITE_CARACTERES são aceitos até NLP_LIMITE_FLUXO e analisados em blocos
+    @staticmethod
+    def validar_texto(texto: str) -> str:
+        texto = texto.strip()
+
+        if not texto:
+            raise ValueError("Texto vazio.")
+        
+        if len(texto) < 10:
+            raise ValueError("Texto muito curto.")
+
+        if len(texto) > NLP_LIMITE_FLUXO:
+            raise ValueError("Texto muito longo.")
+
+        return texto
+
+    #Análise completa do texto
+    def analisar_texto(self, texto: str) -> dict:
+        texto = self.validar_texto(texto)
+
+        if self.cache is not None:
+            chave = self.cache.gerar_chave(texto, self.versao)
+            resultado = self.cache.obter(chave, self.versao)
+            if resultado is not None:
+                return resultado
+
+        if len(texto) > NLP_LIMITE_CARACTERES:
+            resultado = self.analisar_texto_longo(texto)
+        else:
+            resultado = self.montar_resultado(texto, self.nlp(texto))
+
+        if self.cache is not None:
+            self.cache.salvar(chave, self.versao, resultado)
+        return resultado
+
+    #Análise em fluxo de textos longos: o texto é dividido em blocos alinhados a frases
+    #e as estatísticas parciais de cada bloco são acumuladas, sem manter os docs em memória
+    def analisar_texto_longo(self, texto: str, tamanho_bloco: int = NLP_TAMANHO_BLOCO) -> dict:
+        acumulador = AcumuladorAnalise(self)
+        for doc in self.nlp.pipe(dividir_em_blocos(texto, tamanho_bloco), batch_size=4):
+            acumulador.adicionar(doc.text, doc)
+        return acumulador.resultado()
+
+    #Análise de vários textos de uma vez usando nlp.pipe
+    #Cada item retorna {"resultado": dict, "erro": None} ou {"resultado": None, "erro": str}
+    def analisar_lote(self, textos: List[str], batch_size: int = NLP_BATCH_SIZE, n_process: int = NLP_N_PROCESS) -> List[Dict[str, Any]]:
+        itens = [{"resultado": None, "erro": None} for _ in textos]
+
+        #Textos válidos e ainda não analisados (repetidos no lote são processados uma vez)
+        pendentes = {}
+        for indice, texto in enumerate(textos):
+            try:
+                texto = self.validar_texto(texto)
+            except ValueError as e:
+                itens[indice]["erro"] = str(e)
+                continue
+
+            if texto not in pendentes and self.cache is not None:
+                resultado = self.cache.obter(self.cache.gerar_chave(texto, self.versao), self.versao)
+                if resultado is not None:
+                    itens[indice]["resultado"] = resultado
+                    continue
+            pendentes.setdefault(texto, []).append(indice)
+
+        #Textos longos seguem pela análise em fluxo, os demais pelo nlp.pipe
+        curtos = [texto for texto in pendentes if len(texto) <= NLP_LIMITE_CARACTERES]
+        docs = self.nlp.pipe(
+            curtos,
+            batch_size=batch_size,
+            n_process=n_process,
+        )
+        resultados = ((texto, self.montar_resultado(texto, doc)) for texto, doc in zip(curtos, docs))
+        longos = (
+            (texto, self.analisar_texto_longo(texto))
+            for texto in pendentes if len(texto) > NLP_LIMITE_CARACTERES
+        )
+
+        for texto, resultado in itertools.chain(resultados, longos):
+            indices = pendentes[texto]
+            if self.cache is not None:
+                self.cache.salvar(self.cache.gerar_chave(texto, self.versao), self.versao, resultado)
+            for indice in indices:
+                itens[indice]["resultado"] = copy.deepcopy(resultado) if len(indices) > 1 else resultado
+
+        return itens
+
+    #Monta o resultado da análise a partir do texto validado e do doc do spaCy
+    #(mesmo caminho da análise em fluxo, com um único bloco)
+    def montar_resultado(self, texto: str, doc) -> dict:
+        acumulador = AcumuladorAnalise(self)
+        acumulador.adicionar(texto, doc)
+        return acumulador.resultado()
+
+    #Análise de sentimento para texto em português
+    def analisar_sentimento_portugues(self, texto: str, doc) -> str:
+        pontuacao, total_tokens = self.motor_sentimento.analisar(self.tokens_sentimento(doc))
+        return self.classificar_sentimento(pontuacao, total_tokens)
+
+    #Tokens considerados na pontuação de sentimento (palavras e números, como em "nota 10")
+    def tokens_sentimento(self, doc) -> List[str]:
+        return [token.lower_ for token in doc if token.is_alpha or token.is_digit]
+
+    #Pontuação de sentimento normalizada pelo número de tokens
+    def normalizar_pontuacao(self, pontuacao: float, total_tokens: int) -> float:
+        if not total_tokens:
+            return 0.0
+        return pontuacao / total_tokens
+
+    #Classificação do sentimento a partir da pontuação total
+    def classificar_sentimento(self, pontuacao: float, total_tokens: int) -> str:
+        if not total_tokens:
+            return "Neutro"
+
+        #Normalização da pontuação
+        pontuacao_normalizada = self.normalizar_pontuacao(pontuacao, total_tokens)
+        
+        if pontuacao_normalizada > 0.1:
+            return "Positivo"
+        elif pontuacao_normalizada < -0.1:
+            return "Negativo"
+        else:
+            return "Neutro"
+
+    #Pré-processamento do texto
+    def preprocessar_texto(self, texto: str) -> str:
+        return normalizar(texto)
+
+    #Encontrar a palavra mais frequente no texto
+    def palavra_mais_frequente(self, doc) -> str:     
+        return self.escolher_palavra_mais_frequente(self.contar_palavras_significativas(doc))
+
+    #Contagem de frequência das palavras significativas do doc
+    def contar_palavras_significativas(self, doc) -> Counter:
+        return Counter(
+            token.text for token in doc
+            if token.is_alpha
+            and not token.is_stop
+            and len(token.text) > 2
+        )
+
+    #Palavra mais frequente da contagem (empates ficam com a que apareceu primeiro)
+    def escolher_palavra_mais_frequente(self, cont: Counter) -> str:
+        if not cont:
+            return "Nenhuma palavra significativa encontrada."
+
+        return cont.most_common(1)[0][0]
+    
+    #Extração de entidades nomeadas
+    def extrair_entidades(self, doc) -> list:
+        entidades = []
+
+        #Filtra entidades relevantes
+        for ent in doc.ents:
+            if ent.label_ not in {"PER", "ORG", "LOC"}:
+                continue
+
+            if ent.label_ == "PER" and len(ent.text.split()) < 2:
+                continue
+
+            entidades.append({
+                "texto": ent.text,
+                "tipo": ent.label_,
+            })
+
+        return entidades
+
+    #Contagem de sílabas em uma palavra
+    def cont_silabas(self, palavra: str) -> int:
+        return self.contar_silabas(palavra)
+
+    #Cálculo do nível de legibilidade adaptado para português
+    def lvl_legibilidade_adaptado(self, doc) -> str:
+        
+        frases = self.cont_frases(doc)
+        palavras = [token.text for token in doc if token.is_alpha]
+
+        #Contagem total de sílabas
+        total_silabas = sum(map(self.contar_silabas, palavras))
+        return self.classificar_legibilidade(frases, len(palavras), total_silabas)
+
+    #Classificação da legibilidade a partir dos totais de frases, palavras e sílabas
+    def classificar_legibilidade(self, frases: int, palavras: int, total_silabas: int) -> str:
+        if frases < 1 or palavras < 10:
+            return "Curto demais para avaliar."
+        
+        #Cálculo do índice de legibilidade
+        palavras_por_frase = palavras / frases
+        silabas_por_palavra = total_silabas / palavras
+        
+        #Índice de legibilidade adaptado#
+        indice = 180 - palavras_por_frase - (58.5 * silabas_por_palavra)
+        
+        if indice >= 80:
+            return "Muito fácil (Educação fundamental)"
+        elif indice >= 60:
+            return "Fácil (Ensino médio)"
+        elif indice >= 40:
+            return "Médio (Ensino superior)"
+        elif indice >= 20:
+            return "Difícil (Graduação)"
+        else:
+            return "Muito difícil (Pós-graduação)"
+
+    #Contagem de palavras no texto
+    def cont_palavras(self, texto: str) -> int:
+        palavras = re.findall(r'\b\w+\b', texto)
+        return len(palavras)
+
+    #Contagem de caracteres no texto
+    def cont_caracteres(self, texto: str) -> int:
+        return len(texto)
+
+    #Contagem de frases no texto
+    def cont_frases(self, doc) -> int:
+        return len(list(doc.sents))
+
+
+#Divide o texto em blocos contíguos de até `tamanho` caracteres, cortando no último fim de
+#frase do bloco (ou no último espaço, se não houver). A concatenação dos blocos é o texto original
+def dividir_em_blocos(texto: str, tamanho: int = NLP_TAMANHO_BLOCO) -> Iterator[str]:
+    inicio = 0
+    while len(texto) - inicio > tamanho:
+        janela = texto[inicio:inicio + tamanho]
+
+        corte = None
+        for fim in FIM_DE_FRASE.finditer(janela):
+            corte = fim.end()
+
+        if corte is None:
+            espaco = max(janela.rfind(" "), janela.rfind("\n"))
+            corte = espaco + 1 if espaco > 0 else tamanho
+
+        yield janela[:corte]
+        inicio += corte
+
+    if inicio < len(texto):
+        yield texto[inicio:]
+
+
+#Acumula as estatísticas parciais da análise bloco a bloco
+#Com um único bloco o resultado é o da análise em uma passada
+class AcumuladorAnalise:
+    def __init__(self, nlp_service: NLPService):
+        self.nlp_service = nlp_service
+        self.cont_caracteres = 0
+        self.cont_palavras = 0
+        self.cont_frases = 0
+        self.palavras_alfa = 0
+        self.total_silabas = 0
+        self.frequencias = Counter()
+        self.entidades = []
+
+        #Sentimento: pontuação incremental (expressões podem atravessar blocos)
+        self.sentimento = FluxoSentimento(nlp_service.motor_sentimento)
+
+    #Incorpora as estatísticas de um bloco
+    def adicionar(self, texto: str, doc) -> None:
+        servico = self.nlp_service
+        self.cont_caracteres += servico.cont_caracteres(texto)
+        self.cont_palavras += servico.cont_palavras(texto)
+        self.cont_frases += servico.cont_frases(doc)
+
+        palavras = [token.text for token in doc if token.is_alpha]
+        self.palavras_alfa += len(palavras)
+        self.total_silabas += sum(map(servico.contar_silabas, palavras))
+        self.frequencias.update(servico.contar_palavras_significativas(doc))
+        self.entidades.extend(servico.extrair_entidades(doc))
+        self.sentimento.adicionar(servico.tokens_sentimento(doc))
+
+    #Resultado final, no mesmo formato de analisar_texto
+    def resultado(self) -> dict:
+        pontuacao, total_tokens = self.sentimento.finalizar()
+        servico = self.nlp_service
+        return {
+            "sentimento": servico.classificar_sentimento(pontuacao, total_tokens),
+            "pontuacao_sentimento": round(servico.normalizar_pontuacao(pontuacao, total_tokens), 4),
+            "palavra_mais_frequente": servico.escolher_palavra_mais_frequente(self.frequencias),
+            "entidades": self.entidades,
+            "lvl_legibilidade": servico.classificar_legibilidade(self.cont_frases, self.palavras_alfa, self.total_silabas),
+            "cont_palavras": self.cont_palavras,
+            "cont_caracteres": self.cont_caracteres,
+            "cont_frases": self.cont_frases
+        }
+
+
+#Instância compartilhada do serviço de NLP (carregada uma vez por processo)
+@lru_cache()
+def get_nlp_service() -> NLPService:
+    cache = criar_cache_resultados()
+    nlp_service = NLPService(cache=cache)
+    cache.purgar_versoes_antigas(nlp_service.versao)
+    return nlp_service
@@ -0,0 +1,281 @@
+#Execução da análise de texto fora do event loop
+#Com NLP_POOL_PROCESSOS > 0 a análise roda em um pool de processos, cada um com o seu
+#modelo carregado; com 0 roda em uma thread auxiliar usando o serviço compartilhado
+import asyncio
+import copy
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from starlette.concurrency import run_in_threadpool # type: ignore
+
+from app.core.config import NLP_POOL_PROCESSOS, NLP_POOL_FILA_MAX, NLP_POOL_TIMEOUT, NLP_POOL_CARACTERES_POR_VAGA, NLP_BATCH_SIZE, NLP_N_PROCESS
+from app.services.cache_service import criar_cache_resultados
+from app.services.nlp_service import NLPService, get_nlp_service
+
+
+#Erro quando a fila de análises está cheia (a API responde 503)
+class PoolCheioError(Exception):
+    pass
+
+#Erro quando a análise ultrapassa o tempo limite (a API responde 504)
+class TempoEsgotadoError(Exception):
+    pass
+
+
+#Serviço de NLP do processo worker (carregado uma vez por processo)
+_nlp_worker: Optional[NLPService] = None
+
+def _inicializar_worker():
+    global _nlp_worker
+    _nlp_worker = NLPService()
+    _nlp_worker.aquecer()
+
+def _informacoes_worker() -> dict:
+    return _nlp_worker.informacoes()
+
+def _analisar_no_worker(texto: str) -> dict:
+    return _nlp_worker.analisar_texto(texto)
+
+def _analisar_lote_no_worker(textos: List[str], batch_size: int) -> List[dict]:
+    return [item["resultado"] for item in _nlp_worker.analisar_lote(textos, batch_size=batch_size)]
+
+
+class PoolAnalise:
+    def __init__(self, processos: int = NLP_POOL_PROCESSOS, fila_max: int = NLP_POOL_FILA_MAX, timeout: float = NLP_POOL_TIMEOUT,
+                 caracteres_por_vaga: int = NLP_POOL_CARACTERES_POR_VAGA):
+        self.processos = processos
+        self.fila_max = fila_max
+        #Tempo limite de uma vaga de trabalho (um texto de até caracteres_por_vaga caracteres)
+        self.timeout = timeout
+        self.caracteres_por_vaga = caracteres_por_vaga
+
+        self.executor = None
+        self.loop = None
+        self.nlp_service = None
+        self.cache = None
+        self.versao = None
+        self.info_nlp = {}
+
+        #Vagas ocupadas por tarefas submetidas e ainda não concluídas
+        self._pendentes = 0
+        self._lock = threading.Lock()
+        self.rejeitadas = 0
+        self.tempo_esgotado = 0
+
+    @property
+    def em_processos(self) -> bool:
+        return self.processos > 0
+
+    @property
+    def capacidade(self) -> int:
+        return max(self.processos, 1) + self.fila_max
+
+    #Cria o executor e carrega os modelos (chamado na inicialização da aplicação)
+    async def iniciar(self) -> None:
+        self.loop = asyncio.get_running_loop()
+        if not self.em_processos:
+            self.nlp_service = await run_in_threadpool(get_nlp_service)
+            if self.nlp_service.tempo_aquecimento is None:
+                await run_in_threadpool(self.nlp_service.aquecer)
+            self.cache = self.nlp_service.cache
+            self.versao = self.nlp_service.versao
+            self.info_nlp = self.nlp_service.informacoes()
+            #Uma única thread: o modelo compartilhado não é usado em paralelo
+            self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="nlp")
+            return
+
+        self.cache = criar_cache_resultados()
+        self._criar_executor()
+
+        #Uma tarefa por processo força a criação de todos (cada um carrega e aquece o modelo)
+        loop = asyncio.get_running_loop()
+        infos = await asyncio.gather(*[
+            loop.run_in_executor(self.executor, _informacoes_worker)
+            for _ in range(self.processos)
+        ])
+        self.info_nlp = infos[0]
+        self.versao = infos[0]["versao"]
+        await run_in_threadpool(self.cache.purgar_versoes_antigas, self.versao)
+
+    def _criar_executor(self) -> None:
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.processos,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_inicializar_worker,
+        )
+
+    #Encerra o executor (chamado no desligamento da aplicação)
+    def encerrar(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    #Vagas que uma chamada com esse total de caracteres ocupa (no mínimo uma)
+    def vagas(self, caracteres: int) -> int:
+        return max(1, -(-caracteres // self.caracteres_por_vaga))
+
+    #Reserva vagas na fila ou rejeita a requisição se não houver espaço
+    def _reservar(self, quantidade: int) -> None:
+        with self._lock:
+            if self._pendentes + quantidade > self.capacidade:
+                self.rejeitadas += 1
+                raise PoolCheioError("Serviço de análise sobrecarregado, tente novamente em instantes.")
+            self._pendentes += quantidade
+
+    #Submete as chamadas ao executor e aguarda os resultados com tempo limite. Cada chamada ocupa
+    #as vagas indicadas (uma, se omitidas): o total é reservado de uma vez, limitado à capacidade
+    #(um lote maior que o pool só entra com o pool vazio), e devolvido quando a última termina.
+    #O tempo limite é NLP_POOL_TIMEOUT por vaga do caminho mais longo: a maior chamada ou, com
+    #mais chamadas que processos, a soma dividida entre eles
+    async def _executar(self, chamadas: List[tuple], vagas: Optional[List[int]] = None) -> List[Any]:
+        vagas = vagas or [1] * len(chamadas)
+        reservadas = min(sum(vagas), self.capacidade)
+        self._reservar(reservadas)
+
+        restantes = len(chamadas)
+
+        def liberar(_future: Optional[Future] = None) -> None:
+            nonlocal restantes
+            with self._lock:
+                restantes -= 1
+                if not restantes:
+                    self._pendentes -= reservadas
+
+        futures = []
+        try:
+            for funcao, *args in chamadas:
+                future = self.executor.submit(funcao, *args)
+                future.add_done_callback(liberar)
+                futures.append(future)
+        except BrokenProcessPool:
+            self._reiniciar()
+            raise PoolCheioError("Serviço de análise reiniciado, tente novamente em instantes.")
+        finally:
+            #Chamadas que nem chegaram a ser submetidas liberam a vaga na hora
+            for _ in range(len(chamadas) - len(futures)):
+                liberar()
+
+        #O shield mantém a vaga ocupada até a tarefa terminar de fato, mesmo após o timeout
+        aguardando = [asyncio.shield(asyncio.wrap_future(future)) for future in futures]
+        timeout = self.timeout * max(max(vagas), -(-sum(vagas) // max(self.processos, 1)))
+        try:
+            return await asyncio.wait_for(asyncio.gather(*aguardando), timeout=timeout)
+        except asyncio.TimeoutError:
+            for future in futures:
+                future.cancel()
+            self.tempo_esgotado += 1
+            raise TempoEsgotadoError("Tempo limite da análise excedido.")
+        except BrokenProcessPool:
+            self._reiniciar()
+            raise PoolCheioError("Serviço de análise reiniciado, tente novamente em instantes.")
+
+    #Recria o pool quando um processo worker morre
+    def _reiniciar(self) -> None:
+        if self.executor is not None and self.em_processos:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self._criar_executor()
+
+    async def _obter_cache(self, chave: str) -> Optional[dict]:
+        if self.cache.session_factory is None:
+            return self.cache.obter(chave, self.versao)
+        return await run_in_threadpool(self.cache.obter, chave, self.versao)
+
+    async def _salvar_cache(self, chave: str, resultado: dict) -> None:
+        if self.cache.session_factory is None:
+            self.cache.salvar(chave, self.versao, resultado)
+        else:
+            await run_in_threadpool(self.cache.salvar, chave, self.versao, resultado)
+
+    #Análise de um texto (ValueError para textos inválidos)
+    async def analisar(self, texto: str) -> dict:
+        if not self.em_processos:
+            resultado, = await self._executar([(self.nlp_service.analisar_texto, texto)], [self.vagas(len(texto))])
+            return resultado
+
+        texto = NLPService.validar_texto(texto)
+        chave = self.cache.gerar_chave(texto, self.versao)
+        resultado = await self._obter_cache(chave)
+        if resultado is not None:
+            return resultado
+
+        resultado, = await self._executar([(_analisar_no_worker, texto)], [self.vagas(len(texto))])
+        await self._salvar_cache(chave, resultado)
+        return resultado
+
+    #Análise em lote, no mesmo formato de NLPService.analisar_lote
+    #No modo de processos o lote é dividido entre os workers; no de thread, o nlp.pipe usa NLP_N_PROCESS
+    #(configuração do servidor, nunca escolhida pelo cliente)
+    async def analisar_lote(self, textos: List[str], batch_size: int = NLP_BATCH_SIZE) -> List[Dict[str, Any]]:
+        if not self.em_processos:
+            itens, = await self._executar(
+                [(self.nlp_service.analisar_lote, textos, batch_size, NLP_N_PROCESS)],
+                [self.vagas(sum(len(texto) for texto in textos if isinstance(texto, str)))],
+            )
+            return itens
+
+        itens = [{"resultado": None, "erro": None} for _ in textos]
+        pendentes = {}
+        for indice, texto in enumerate(textos):
+            try:
+                texto = NLPService.validar_texto(texto)
+            except ValueError as e:
+                itens[indice]["erro"] = str(e)
+                continue
+
+            if texto not in pendentes:
+                resultado = await self._obter_cache(self.cache.gerar_chave(texto, self.versao))
+                if resultado is not None:
+                    itens[indice]["resultado"] = resultado
+                    continue
+            pendentes.setdefault(texto, []).append(indice)
+
+        if pendentes:
+            #Divide os textos pendentes em uma parte por processo
+            textos_pendentes = list(pendentes.keys())
+            tamanho_parte = -(-len(textos_pendentes) // self.processos)
+            partes = [textos_pendentes[i:i + tamanho_parte] for i in range(0, len(textos_pendentes), tamanho_parte)]
+            resultados_partes = await self._executar(
+                [(_analisar_lote_no_worker, parte, batch_size) for parte in partes],
+                [self.vagas(sum(len(texto) for texto in parte)) for parte in partes],
+            )
+
+            for parte, resultados in zip(partes, resultados_partes):
+                for texto, resultado in zip(parte, resultados):
+                    await self._salvar_cache(self.cache.gerar_chave(texto, self.versao), resultado)
+                    for indice in pendentes[texto]:
+                        itens[indice]["resultado"] = copy.deepcopy(resultado)
+
+        return itens
+
+    #Versão síncrona de analisar_lote para threads fora do event loop (ex.: workers de jobs)
+    def analisar_lote_sync(self, textos: List[str], batch_size: int = NLP_BATCH_SIZE) -> List[Dict[str, Any]]:
+        future = asyncio.run_coroutine_threadsafe(self.analisar_lote(textos, batch_size), self.loop)
+        return future.result()
+
+    #Informações do modelo e métricas da fila (expostas em /info)
+    def informacoes(self) -> dict:
+        with self._lock:
+            pendentes = self._pendentes
+        return {
+            **self.info_nlp,
+            "pool": {
+                "modo": "processos" if self.em_processos else "thread",
+                "processos": self.processos,
+                "capacidade": self.capacidade,
+                "pendentes": pendentes,
+                "rejeitadas": self.rejeitadas,
+                "tempo_esgotado": self.tempo_esgotado,
+                "timeout": self.timeout,
+                "caracteres_por_vaga": self.caracteres_por_vaga,
+            },
+        }
+
+
+#Pool compartilhado pelas rotas (um por processo da aplicação)
+@lru_cache()
+def get_pool_analise() -> PoolAnalise:
+    return PoolAnalise()
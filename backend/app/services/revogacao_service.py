@@ -0,0 +1,159 @@
+#Revogação de tokens (logout) com filtro de Bloom em memória
+#O filtro contém os jti revogados ainda não expirados: quando o jti não está no filtro o token
+#com certeza não foi revogado e o banco não é consultado; só os "talvez" vão ao banco
+import asyncio
+import datetime
+import hashlib
+import logging
+import threading
+from functools import lru_cache
+from typing import Callable, List, Set
+
+from sqlalchemy import delete, select # type: ignore
+from sqlalchemy.exc import IntegrityError # type: ignore
+from sqlalchemy.ext.asyncio import AsyncSession # type: ignore
+from sqlalchemy.orm import Session # type: ignore
+
+from app.core.bloom import FiltroBloom
+from app.core.config import REVOGACAO_BLOOM_FP, REVOGACAO_SINCRONIZAR, REVOGACAO_PURGA_INTERVALO
+from app.models.analysis import TokenRevogado
+
+logger = logging.getLogger("uvicorn.error")
+
+
+#Identificador do token: o jti, ou o hash do token para tokens emitidos antes do jti
+def identificador_token(token: str, payload: dict) -> str:
+    return payload.get("jti") or hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class Revogacoes:
+    def __init__(self, taxa_falso_positivo: float = REVOGACAO_BLOOM_FP):
+        self.taxa_falso_positivo = taxa_falso_positivo
+        self.filtro = FiltroBloom(taxa_falso_positivo=taxa_falso_positivo)
+        #Enquanto o filtro não for carregado do banco, toda consulta vai ao banco
+        self.pronto = False
+        self._ultimo_id = 0
+        self._lock = threading.Lock()
+        #jti revogados neste processo durante cada reconstrução em andamento, reaplicados ao novo
+        #filtro na troca (a leitura do banco pode ter sido feita antes do commit deles)
+        self._reconstrucoes: List[Set[str]] = []
+
+        #Contadores expostos para métricas
+        self.negativos = 0
+        self.consultas_banco = 0
+        self.falsos_positivos = 0
+
+    #Revoga o token até a sua expiração
+    async def revogar(self, session: AsyncSession, jti: str, expira_em: datetime.datetime) -> None:
+        session.add(TokenRevogado(jti=jti, expira_em=expira_em))
+        try:
+            await session.commit()
+        except IntegrityError:
+            #Já revogado
+            await session.rollback()
+        with self._lock:
+            self.filtro.adicionar(jti)
+            for revogados in self._reconstrucoes:
+                revogados.add(jti)
+
+    #Verifica se o jti foi revogado (o banco só é consultado quando o filtro responde "talvez")
+    async def revogado(self, session: AsyncSession, jti: str) -> bool:
+        if self.pronto and jti not in self.filtro:
+            self.negativos += 1
+            return False
+
+        self.consultas_banco += 1
+        encontrado = (await session.execute(select(TokenRevogado.id).where(TokenRevogado.jti == jti))).first() is not None
+        if self.pronto and not encontrado:
+            self.falsos_positivos += 1
+        return encontrado
+
+    #Recria o filtro a partir das revogações ainda válidas (dimensionado para o dobro delas)
+    def reconstruir(self, session_factory: Callable[[], Session]) -> None:
+        revogados: Set[str] = set()
+        with self._lock:
+            self._reconstrucoes.append(revogados)
+        try:
+            agora = datetime.datetime.utcnow()
+            with session_factory() as session:
+                #O último id é lido antes das revogações: as gravadas entre as duas consultas por
+                #outros processos ficam acima dele e entram na próxima sincronização
+                ultimo_id = session.execute(select(TokenRevogado.id).order_by(TokenRevogado.id.desc()).limit(1)).scalar() or 0
+                linhas = session.execute(
+                    select(TokenRevogado.id, TokenRevogado.jti).where(TokenRevogado.expira_em > agora)
+                ).all()
+
+            filtro = FiltroBloom(capacidade=max(2 * len(linhas), 1024), taxa_falso_positivo=self.taxa_falso_positivo)
+            filtro.adicionar_varios(jti for _, jti in linhas)
+            with self._lock:
+                filtro.adicionar_varios(revogados)
+                self.filtro = filtro
+                self._ultimo_id = ultimo_id
+                self.pronto = True
+        finally:
+            with self._lock:
+                self._reconstrucoes.remove(revogados)
+
+    #Adiciona ao filtro as revogações feitas por outros processos desde a última sincronização
+    def sincronizar(self, session_factory: Callable[[], Session]) -> None:
+        with session_factory() as session:
+            linhas = session.execute(
+                select(TokenRevogado.id, TokenRevogado.jti)
+                .where(TokenRevogado.id > self._ultimo_id)
+                .order_by(TokenRevogado.id)
+            ).all()
+
+        if not linhas:
+            return
+        with self._lock:
+            self.filtro.adicionar_varios(jti for _, jti in linhas)
+            self._ultimo_id = max(self._ultimo_id, linhas[-1][0])
+
+        #Filtro acima da capacidade: a taxa de falsos positivos sobe, então é recriado
+        if self.filtro.itens > self.filtro.capacidade:
+            self.reconstruir(session_factory)
+
+    #Remove as revogações de tokens já expirados e recria o filtro sem elas
+    def purgar(self, session_factory: Callable[[], Session]) -> int:
+        with session_factory() as session:
+            resultado = session.execute(delete(TokenRevogado).where(TokenRevogado.expira_em <= datetime.datetime.utcnow()))
+            session.commit()
+
+        self.reconstruir(session_factory)
+        if resultado.rowcount:
+            logger.info("%d revogação(ões) expirada(s) removida(s)", resultado.rowcount)
+        return resultado.rowcount
+
+    #Métricas do filtro e das consultas
+    def estatisticas(self) -> dict:
+        return {
+            "pronto": self.pronto,
+            "filtro": self.filtro.estatisticas(),
+            "negativos": self.negativos,
+            "consultas_banco": self.consultas_banco,
+            "falsos_positivos": self.falsos_positivos,
+        }
+
+
+#Tarefa de fundo: sincroniza o filtro com as revogações de outros processos e purga as expiradas
+#(as consultas rodam em thread para não bloquear o event loop)
+async def manter_revogacoes(revogacoes: Revogacoes, session_factory: Callable[[], Session],
+                            intervalo: float = REVOGACAO_SINCRONIZAR, intervalo_purga: float = REVOGACAO_PURGA_INTERVALO) -> None:
+    loop = asyncio.get_running_loop()
+    ultima_purga = loop.time()
+    while True:
+        await asyncio.sleep(intervalo)
+        try:
+            if loop.time() - ultima_purga >= intervalo_purga:
+                await loop.run_in_executor(None, revogacoes.purgar, session_factory)
+                ultima_purga = loop.time()
+            else:
+                await loop.run_in_executor(None, revogacoes.sincronizar, session_factory)
+        except Exception:
+            logger.exception("Falha ao atualizar o filtro de tokens revogados")
+
+
+#Instância compartilhada (uma por processo)
+@lru_cache()
+def get_revogacoes() -> Revogacoes:
+    return Revogacoes()
@@ -0,0 +1,169 @@
+#Motor de pontuação de sentimento pré-compilado
+#Os léxicos são normalizados (minúsculas e sem acentos) e convertidos em ids uma única vez;
+#a pontuação de um texto é feita com tabelas numpy indexadas pelos ids dos tokens
+import unicodedata
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np #type: ignore
+
+#Limite de formas de token memorizadas por motor (formas novas continuam sendo resolvidas)
+LIMITE_FORMAS = 200_000
+
+
+#Normalização usada nos léxicos e nos tokens: minúsculas e sem acentos
+def normalizar(texto: str) -> str:
+    texto = texto.lower()
+    return ''.join(c for c in unicodedata.normalize('NFD', texto) if unicodedata.category(c) != 'Mn')
+
+
+class MotorSentimento:
+    def __init__(self, lexico_positivo: Set[str], lexico_negativo: Set[str],
+                 intensificadores: Dict[str, float], negacoes: Set[str]):
+        #Vocabulário: id 0 é reservado para tokens fora dos léxicos
+        self.vocabulario = {}
+        polaridade = {}
+        frases = {}
+
+        for entradas, peso in ((lexico_positivo, 1.0), (lexico_negativo, -1.0)):
+            for entrada in entradas:
+                ids = tuple(self._registrar(parte) for parte in normalizar(entrada).split())
+                if len(ids) == 1:
+                    polaridade[ids[0]] = peso
+                else:
+                    frases[ids] = peso
+
+        intensidade = {self._registrar(normalizar(p)): fator for p, fator in intensificadores.items()}
+        negacao = {self._registrar(normalizar(p)) for p in negacoes}
+
+        tamanho = len(self.vocabulario) + 1
+        self.polaridade = np.zeros(tamanho, dtype=np.float64)
+        self.intensidade = np.ones(tamanho, dtype=np.float64)
+        self.negacao = np.zeros(tamanho, dtype=bool)
+        self.inicio_frase = np.zeros(tamanho, dtype=bool)
+        for id_token, peso in polaridade.items():
+            self.polaridade[id_token] = peso
+        for id_token, fator in intensidade.items():
+            self.intensidade[id_token] = fator
+        for id_token in negacao:
+            self.negacao[id_token] = True
+
+        #Expressões de várias palavras indexadas pelo primeiro token, mais longas primeiro
+        self.frases = {}
+        for ids, peso in sorted(frases.items(), key=lambda item: -len(item[0])):
+            self.frases.setdefault(ids[0], []).append((ids, peso))
+            self.inicio_frase[ids[0]] = True
+        self.maior_frase = max((len(ids) for ids in frases), default=1)
+
+        #Forma do token (minúscula) -> id, preenchido sob demanda
+        self._formas = {}
+
+    def _registrar(self, palavra: str) -> int:
+        return self.vocabulario.setdefault(palavra, len(self.vocabulario) + 1)
+
+    #Converte tokens (em minúsculas) nos ids do vocabulário
+    def ids(self, tokens: List[str]) -> np.ndarray:
+        formas = self._formas
+        ids = [formas.get(token) for token in tokens]
+        if None in ids:
+            #Formas ainda não vistas: normaliza uma vez e memoriza
+            for i, token in enumerate(tokens):
+                if ids[i] is None:
+                    ids[i] = self.vocabulario.get(normalizar(token), 0)
+                    if len(formas) < LIMITE_FORMAS:
+                        formas[token] = ids[i]
+        return np.array(ids, dtype=np.int32)
+
+    #Resolve as expressões de várias palavras (casamento guloso, da esquerda para a direita,
+    #preferindo a mais longa) e devolve as tabelas de polaridade, intensidade e negação por token.
+    #Sem `final`, só são resolvidos os tokens cujas expressões já cabem inteiras em `ids`;
+    #o último valor retornado é quantos tokens foram resolvidos
+    def resolver(self, ids: np.ndarray, final: bool = True) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int]:
+        polaridade = self.polaridade[ids]
+        intensidade = self.intensidade[ids]
+        negacao = self.negacao[ids]
+
+        limite = len(ids) if final else max(len(ids) - self.maior_frase + 1, 0)
+        resolvidos = limite
+        inicios = np.flatnonzero(self.inicio_frase[ids]).tolist()
+        if not inicios:
+            return polaridade[:resolvidos], intensidade[:resolvidos], negacao[:resolvidos], resolvidos
+
+        sequencia = ids.tolist()
+        fim_anterior = 0
+        for inicio in inicios:
+            if inicio >= limite:
+                break
+            if inicio < fim_anterior:
+                continue
+
+            for frase, peso in self.frases[sequencia[inicio]]:
+                fim = inicio + len(frase)
+                if tuple(sequencia[inicio:fim]) == frase:
+                    #A expressão substitui os tokens que a compõem
+                    polaridade[inicio] = peso
+                    polaridade[inicio + 1:fim] = 0.0
+                    intensidade[inicio:fim] = 1.0
+                    negacao[inicio:fim] = False
+                    fim_anterior = fim
+                    resolvidos = max(resolvidos, fim)
+                    break
+
+        return polaridade[:resolvidos], intensidade[:resolvidos], negacao[:resolvidos], resolvidos
+
+    #Pontuação por token: a polaridade é multiplicada pelo intensificador anterior e invertida
+    #por uma negação anterior ("não recomendo", "não muito bom")
+    @staticmethod
+    def pontuar(polaridade: np.ndarray, intensidade: np.ndarray, negacao: np.ndarray) -> np.ndarray:
+        pontos = polaridade.copy()
+        pontos[1:] *= intensidade[:-1]
+
+        negado = np.zeros(len(negacao), dtype=bool)
+        negado[1:] = negacao[:-1]
+        negado[2:] |= negacao[:-2] & (intensidade[1:-1] != 1.0)
+        pontos[negado] *= -1.0
+        return pontos
+
+    #Pontuação total e número de tokens de uma sequência completa
+    def analisar(self, tokens: List[str]) -> Tuple[float, int]:
+        if not tokens:
+            return 0.0, 0
+        polaridade, intensidade, negacao, _ = self.resolver(self.ids(tokens))
+        return float(self.pontuar(polaridade, intensidade, negacao).sum()), len(tokens)
+
+
+#Pontuação incremental para textos analisados em blocos
+#O resultado é o mesmo de pontuar todos os tokens de uma vez
+class FluxoSentimento:
+    def __init__(self, motor: MotorSentimento):
+        self.motor = motor
+        self.pontuacao = 0.0
+        self.total_tokens = 0
+        #Ids ainda não resolvidos (podem iniciar uma expressão que continua no próximo bloco)
+        self._pendentes = np.zeros(0, dtype=np.int32)
+        #Últimos dois tokens resolvidos, usados como contexto dos modificadores
+        self._contexto: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+
+    def adicionar(self, tokens: List[str], final: bool = False) -> None:
+        novos = self.motor.ids(tokens)
+        self.total_tokens += len(novos)
+        ids = np.concatenate((self._pendentes, novos))
+
+        polaridade, intensidade, negacao, resolvidos = self.motor.resolver(ids, final=final)
+        self._pendentes = ids[resolvidos:]
+        if not resolvidos:
+            return
+
+        contexto = 0
+        if self._contexto is not None:
+            contexto = len(self._contexto[0])
+            polaridade = np.concatenate((self._contexto[0], polaridade))
+            intensidade = np.concatenate((self._contexto[1], intensidade))
+            negacao = np.concatenate((self._contexto[2], negacao))
+
+        self.pontuacao += float(self.motor.pontuar(polaridade, intensidade, negacao)[contexto:].sum())
+        self._contexto = (polaridade[-2:], intensidade[-2:], negacao[-2:])
+
+    #Resolve os tokens pendentes e retorna (pontuação total, número de tokens)
+    def finalizar(self) -> Tuple[float, int]:
+        self.adicionar([], final=True)
+        return self.pontuacao, self.total_tokens
@@ -0,0 +1,121 @@
+#Armazenamento dos textos analisados, endereçado pelo conteúdo
+#Cada texto distinto é gravado uma única vez em "textos", comprimido, e as análises guardam
+#apenas o SHA-256; textos repetidos (reenvios, lotes com duplicatas) não ocupam espaço de novo
+import datetime
+from typing import Dict, Iterable
+
+from sqlalchemy import LargeBinary, bindparam, delete, exists, func, select # type: ignore
+from sqlalchemy.engine import Connection # type: ignore
+from sqlalchemy.orm import Session # type: ignore
+
+from app.core.compressao import comprimir
+from app.core.dialeto import insert_dialeto
+from app.models.analysis import Analysis, TextoArmazenado
+
+#Caracteres do texto original guardados sem compressão para o resumo do histórico
+TAMANHO_TRECHO = 160
+
+#Hashes consultados por SELECT ... IN
+TAMANHO_CONSULTA = 500
+
+
+#Grava os textos (hash -> texto) que ainda não existem; retorna quantos foram inseridos. Textos
+#gravados ao mesmo tempo por outra transação são ignorados pelo ON CONFLICT (o RETURNING devolve
+#só os inseridos). No PostgreSQL os textos já
+#existentes ficam bloqueados (FOR KEY SHARE) até o commit, para que uma purga concorrente não os
+#remova antes de a análise que os referencia ser gravada
+def gravar_textos(conexao: Connection, textos: Dict[str, str]) -> int:
+    hashes = list(textos)
+    existentes = set()
+    for inicio in range(0, len(hashes), TAMANHO_CONSULTA):
+        existentes.update(conexao.execute(
+            select(TextoArmazenado.hash).where(TextoArmazenado.hash.in_(hashes[inicio:inicio + TAMANHO_CONSULTA]))
+            .with_for_update(key_share=True)
+        ).scalars())
+
+    agora = datetime.datetime.utcnow()
+    linhas = []
+    for hash_texto, texto in textos.items():
+        if hash_texto in existentes:
+            continue
+        #Comprimido aqui (e não pelo tipo da coluna) para registrar o tamanho armazenado
+        conteudo = comprimir(texto)
+        linhas.append({
+            "hash": hash_texto,
+            "conteudo_comprimido": conteudo,
+            "trecho": texto[:TAMANHO_TRECHO],
+            "tamanho": len(texto.encode("utf-8")),
+            "tamanho_armazenado": len(conteudo),
+            "criado_em": agora,
+        })
+    if not linhas:
+        return 0
+
+    comando = insert_dialeto(conexao, TextoArmazenado).values(
+        conteudo=bindparam("conteudo_comprimido", type_=LargeBinary)
+    ).on_conflict_do_nothing(index_elements=[TextoArmazenado.hash]).returning(TextoArmazenado.hash)
+    return len(conexao.execute(comando, linhas).scalars().all())
+
+
+#Listener do evento "before_flush" da Session: grava os textos das análises novas antes delas
+def armazenar_textos_flush(session: Session, contexto, instancias) -> None:
+    textos: Dict[str, str] = {}
+    for objeto in session.new:
+        texto = getattr(objeto, "_texto", None) if isinstance(objeto, Analysis) else None
+        if texto is not None:
+            textos.setdefault(objeto.texto_hash, texto)
+
+    if textos:
+        gravar_textos(session.connection(), textos)
+
+
+def _orfaos():
+    return ~exists().where(Analysis.texto_hash == TextoArmazenado.hash)
+
+
+#Espaço ocupado pelos textos: tamanho lógico (um texto por análise), distinto e armazenado
+def relatorio_textos(session: Session) -> dict:
+    analises, bytes_logicos = session.execute(
+        select(func.count(), func.coalesce(func.sum(TextoArmazenado.tamanho), 0))
+        .select_from(Analysis)
+        .join(TextoArmazenado, Analysis.texto_hash == TextoArmazenado.hash)
+    ).one()
+    textos, bytes_distintos, bytes_armazenados = session.execute(
+        select(
+            func.count(),
+            func.coalesce(func.sum(TextoArmazenado.tamanho), 0),
+            func.coalesce(func.sum(TextoArmazenado.tamanho_armazenado), 0),
+        ).select_from(TextoArmazenado)
+    ).one()
+    orfaos = session.scalar(select(func.count()).select_from(TextoArmazenado).where(_orfaos()))
+
+    return {
+        "analises": analises,
+        "textos_distintos": textos,
+        "textos_sem_analise": orfaos,
+        "bytes_logicos": bytes_logicos,
+        "bytes_distintos": bytes_distintos,
+        "bytes_armazenados": bytes_armazenados,
+        "economia_deduplicacao": round(1 - bytes_distintos / bytes_logicos, 4) if bytes_logicos else 0.0,
+        "economia_total": round(1 - bytes_armazenados / bytes_logicos, 4) if bytes_logicos else 0.0,
+    }
+
+
+#Remove os textos que nenhuma análise referencia mais; não faz commit. O índice de busca já não
+#tem esses textos: cada registro dele sai junto com a última análise do usuário com o texto
+def purgar_textos(session: Session) -> int:
+    return len(session.execute(delete(TextoArmazenado).where(_orfaos()).returning(TextoArmazenado.hash)).scalars().all())
+
+
+#Remove, entre os hashes informados, os textos que nenhuma análise referencia mais, na transação
+#que apagou as análises; não faz commit
+def purgar_hashes(conexao: Connection, hashes: Iterable[str]) -> int:
+    hashes = list(set(hashes))
+    removidos = 0
+    for inicio in range(0, len(hashes), TAMANHO_CONSULTA):
+        removidos += len(conexao.execute(
+            delete(TextoArmazenado)
+            .where(TextoArmazenado.hash.in_(hashes[inicio:inicio + TAMANHO_CONSULTA]), _orfaos())
+            .returning(TextoArmazenado.hash)
+        ).scalars().all())
+    return removidos
@@ -0,0 +1,204 @@
+#Treino incremental (out-of-core) do classificador de tópicos
+#O corpus rotulado é lido do disco em mini-lotes, vetorizado com HashingVectorizer (sem estado,
+#não precisa ver o corpus inteiro) e aprendido com MultinomialNB.partial_fit, então a memória
+#usada não depende do tamanho do corpus
+import csv
+import datetime
+import fcntl
+import gzip
+import hashlib
+import itertools
+import json
+import logging
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import joblib # type: ignore
+import sklearn # type: ignore
+from sklearn.feature_extraction.text import HashingVectorizer # type: ignore
+from sklearn.naive_bayes import MultinomialNB # type: ignore
+from sklearn.pipeline import Pipeline # type: ignore
+
+from app.core.config import TOPICOS_HASH_FEATURES, TOPICOS_TAMANHO_LOTE_TREINO, TOPICOS_CHECKPOINT_A_CADA
+from app.services.ml_service import DIRETORIO_MODELOS, TOPICOS, TopicClassifier, caminhos_artefato
+
+logger = logging.getLogger("uvicorn.error")
+
+#Nome do artefato do modelo incremental e do seu checkpoint de treino
+CHAVE_INCREMENTAL = "incremental"
+CHAVE_CHECKPOINT = "incremental.checkpoint"
+
+
+#Pipeline sem estado de vocabulário: HashingVectorizer + Naive Bayes (aceita partial_fit)
+def criar_pipeline_incremental(n_features: int = TOPICOS_HASH_FEATURES) -> Pipeline:
+    return Pipeline([
+        ('hash', HashingVectorizer(
+            n_features=n_features,
+            ngram_range=(1, 2),
+            alternate_sign=False,
+            norm='l2',
+        )),
+        ('clf', MultinomialNB(alpha=0.01))
+    ])
+
+
+#Lê (texto, tópico) de um arquivo CSV (colunas "texto" e "topico") ou NDJSON, compactado ou não
+def ler_corpus(caminho: Path, formato: Optional[str] = None) -> Iterator[Tuple[str, str]]:
+    caminho = Path(caminho)
+    sufixos = [sufixo.lower() for sufixo in caminho.suffixes]
+    compactado = sufixos[-1:] == [".gz"]
+    formato = formato or ("csv" if ".csv" in sufixos else "ndjson")
+    abrir = gzip.open if compactado else open
+
+    with abrir(caminho, "rt", encoding="utf-8", newline="") as arquivo:
+        if formato == "csv":
+            for linha in csv.DictReader(arquivo):
+                yield linha.get("texto") or "", linha.get("topico") or ""
+        else:
+            for linha in arquivo:
+                if linha.strip():
+                    registro = json.loads(linha)
+                    yield registro.get("texto") or "", registro.get("topico") or ""
+
+
+#Agrupa os exemplos em mini-lotes de índices de tópico, descartando tópicos desconhecidos
+def lotes_rotulados(exemplos: Iterable[Tuple[str, str]], topicos: List[str], tamanho: int) -> Iterator[Tuple[List[str], List[int], int, int]]:
+    indices = {topico: indice for indice, topico in enumerate(topicos)}
+    iterador = iter(exemplos)
+    while True:
+        bloco = list(itertools.islice(iterador, tamanho))
+        if not bloco:
+            return
+
+        textos, rotulos = [], []
+        for texto, topico in bloco:
+            indice = indices.get(topico.strip().lower())
+            if indice is None or not texto.strip():
+                continue
+            textos.append(TopicClassifier.simplificar_texto(texto))
+            rotulos.append(indice)
+        yield textos, rotulos, len(bloco), len(bloco) - len(textos)
+
+
+#Grava o pipeline e os metadados sob uma chave (arquivo temporário + os.replace)
+def salvar_artefato(pipeline: Pipeline, metadados: dict, chave: str, diretorio: Path = DIRETORIO_MODELOS) -> dict:
+    diretorio.mkdir(parents=True, exist_ok=True)
+    caminho_modelo, caminho_meta = caminhos_artefato(chave, diretorio)
+
+    descritor, temporario = tempfile.mkstemp(dir=diretorio, suffix=".joblib.tmp")
+    os.close(descritor)
+    joblib.dump(pipeline, temporario)
+    with open(temporario, "rb") as arquivo:
+        sha256 = hashlib.sha256(arquivo.read()).hexdigest()
+    os.replace(temporario, caminho_modelo)
+
+    metadados = dict(
+        metadados,
+        chave=chave,
+        arquivo=caminho_modelo.name,
+        sha256=sha256,
+        sklearn=sklearn.__version__,
+        criado_em=datetime.datetime.utcnow().isoformat(),
+    )
+    descritor, temporario = tempfile.mkstemp(dir=diretorio, suffix=".json.tmp")
+    with os.fdopen(descritor, "w", encoding="utf-8") as arquivo:
+        json.dump(metadados, arquivo, ensure_ascii=False, indent=2)
+    os.replace(temporario, caminho_meta)
+    return metadados
+
+
+#Carrega um artefato para escrita (sem mmap, pois partial_fit altera os arrays)
+def carregar_para_treino(chave: str, diretorio: Path = DIRETORIO_MODELOS) -> Tuple[Optional[Pipeline], Optional[dict]]:
+    caminho_modelo, caminho_meta = caminhos_artefato(chave, diretorio)
+    if not caminho_modelo.exists() or not caminho_meta.exists():
+        return None, None
+    with open(caminho_meta, encoding="utf-8") as arquivo:
+        metadados = json.load(arquivo)
+    return joblib.load(caminho_modelo), metadados
+
+
+#Trava exclusiva entre processos para atualizar o modelo incremental
+@contextmanager
+def trava_modelo(diretorio: Path = DIRETORIO_MODELOS):
+    diretorio.mkdir(parents=True, exist_ok=True)
+    with open(diretorio / f"topicos-{CHAVE_INCREMENTAL}.lock", "w") as arquivo:
+        fcntl.flock(arquivo, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(arquivo, fcntl.LOCK_UN)
+
+
+#Treina o modelo incremental a partir de um corpus em disco, com checkpoints periódicos.
+#Com `retomar`, continua do último checkpoint do mesmo corpus pulando os exemplos já vistos
+def treinar_incremental(caminho: Path, formato: Optional[str] = None, diretorio: Path = DIRETORIO_MODELOS,
+                        topicos: Optional[List[str]] = None, tamanho_lote: int = TOPICOS_TAMANHO_LOTE_TREINO,
+                        checkpoint_a_cada: int = TOPICOS_CHECKPOINT_A_CADA, retomar: bool = False) -> dict:
+    caminho = Path(caminho).resolve()
+    corpus = {"caminho": str(caminho), "tamanho": caminho.stat().st_size}
+
+    pipeline, estado = (carregar_para_treino(CHAVE_CHECKPOINT, diretorio) if retomar else (None, None))
+    if pipeline is not None and estado["corpus"] != corpus:
+        raise ValueError("O checkpoint existente é de outro corpus; treine sem --retomar.")
+
+    if pipeline is None:
+        topicos = [topico.strip().lower() for topico in (topicos or TOPICOS)]
+        pipeline = criar_pipeline_incremental()
+        estado = {"corpus": corpus, "topicos": topicos, "exemplos": 0, "linhas": 0, "ignorados": 0, "lotes": 0}
+    else:
+        topicos = estado["topicos"]
+        logger.info("Retomando o treino após %d linhas", estado["linhas"])
+
+    vetorizador = pipeline.named_steps["hash"]
+    classificador = pipeline.named_steps["clf"]
+    classes = list(range(len(topicos)))
+
+    inicio = time.perf_counter()
+    exemplos = itertools.islice(ler_corpus(caminho, formato), estado["linhas"], None)
+    for textos, rotulos, linhas, ignorados in lotes_rotulados(exemplos, topicos, tamanho_lote):
+        if textos:
+            classificador.partial_fit(vetorizador.transform(textos), rotulos, classes=classes)
+
+        estado["exemplos"] += len(textos)
+        estado["linhas"] += linhas
+        estado["ignorados"] += ignorados
+        estado["lotes"] += 1
+        if estado["lotes"] % checkpoint_a_cada == 0:
+            salvar_artefato(pipeline, estado, CHAVE_CHECKPOINT, diretorio)
+            logger.info("Checkpoint: %d linhas, %d exemplos", estado["linhas"], estado["exemplos"])
+
+    if not estado["exemplos"]:
+        raise ValueError("Nenhum exemplo com tópico conhecido no corpus.")
+
+    with trava_modelo(diretorio):
+        metadados = salvar_artefato(pipeline, dict(estado, tempo_treino=round(time.perf_counter() - inicio, 3)), CHAVE_INCREMENTAL, diretorio)
+
+    #Treino concluído: o checkpoint não é mais necessário
+    for caminho_checkpoint in caminhos_artefato(CHAVE_CHECKPOINT, diretorio):
+        caminho_checkpoint.unlink(missing_ok=True)
+    return metadados
+
+
+#Aprende novos exemplos rotulados no modelo incremental salvo, sem retreinar do zero
+#Retorna os metadados atualizados e quantos exemplos foram aprendidos (tópicos desconhecidos são ignorados)
+def aprender_exemplos(exemplos: List[Tuple[str, str]], diretorio: Path = DIRETORIO_MODELOS) -> Tuple[dict, int]:
+    with trava_modelo(diretorio):
+        pipeline, metadados = carregar_para_treino(CHAVE_INCREMENTAL, diretorio)
+        if pipeline is None:
+            raise FileNotFoundError("Modelo incremental ainda não foi treinado.")
+
+        topicos = metadados["topicos"]
+        textos, rotulos, _, ignorados = next(lotes_rotulados(exemplos, topicos, len(exemplos)))
+        if textos:
+            pipeline.named_steps["clf"].partial_fit(
+                pipeline.named_steps["hash"].transform(textos), rotulos, classes=list(range(len(topicos)))
+            )
+
+        metadados["exemplos"] += len(textos)
+        metadados["ignorados"] += ignorados
+        metadados["exemplos_adicionados"] = metadados.get("exemplos_adicionados", 0) + len(textos)
+        return salvar_artefato(pipeline, metadados, CHAVE_INCREMENTAL, diretorio), len(textos)
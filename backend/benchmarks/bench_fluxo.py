@@ -0,0 +1,44 @@
+#Compara a análise em uma passada com a análise em fluxo (blocos) do mesmo texto
+#Verifica se os resultados coincidem e mede tempo e pico de memória de cada modo
+#Uso (a partir de backend/): python -m benchmarks.bench_fluxo --caracteres 20000
+import argparse
+import time
+import tracemalloc
+
+from app.services.nlp_service import NLPService
+from benchmarks.corpus import gerar_texto_longo
+
+
+def medir(funcao):
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    resultado = funcao()
+    decorrido = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, decorrido, pico
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--caracteres", type=int, default=20000)
+    parser.add_argument("--tamanho-bloco", type=int, default=5000)
+    args = parser.parse_args()
+
+    texto = gerar_texto_longo(args.caracteres)
+    nlp_service = NLPService()
+    nlp_service.aquecer()
+
+    completo, tempo_completo, pico_completo = medir(lambda: nlp_service.montar_resultado(texto, nlp_service.nlp(texto)))
+    fluxo, tempo_fluxo, pico_fluxo = medir(lambda: nlp_service.analisar_texto_longo(texto, args.tamanho_bloco))
+
+    print(f"texto: {len(texto)} caracteres, blocos de {args.tamanho_bloco}")
+    print(f"uma passada: {tempo_completo:.2f}s, pico {pico_completo / 1e6:.1f} MB")
+    print(f"em fluxo:    {tempo_fluxo:.2f}s, pico {pico_fluxo / 1e6:.1f} MB")
+    for campo in completo:
+        situacao = "igual" if completo[campo] == fluxo[campo] else f"DIFERENTE ({completo[campo]!r} x {fluxo[campo]!r})"
+        print(f"  {campo:<24} {situacao}")
+
+
+if __name__ == "__main__":
+    main()
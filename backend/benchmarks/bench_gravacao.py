@@ -0,0 +1,91 @@
+#Mede a vazão de gravação de análises no SQLite com requisições concorrentes
+#Compara a configuração padrão, WAL com os pragmas de app.core.sqlite e WAL com commit em grupo
+#Uso (a partir de backend/): python -m benchmarks.bench_gravacao --requisicoes 2000 --concorrencia 64
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from typing import Tuple
+
+from sqlalchemy import create_engine, event, func, select # type: ignore
+from sqlalchemy.exc import OperationalError # type: ignore
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine # type: ignore
+from sqlalchemy.orm import sessionmaker # type: ignore
+
+from app.core.sqlite import configurar_sqlite
+from app.models.analysis import Analysis, Base
+from app.services.analysis_service import nova_analise
+from app.services.gravacao_service import GravadorEmGrupo
+
+RESULTADO = {
+    "sentimento": "Positivo",
+    "pontuacao_sentimento": 0.25,
+    "palavra_mais_frequente": "produto",
+    "entidades": [{"texto": "Brasil", "tipo": "LOC"}],
+    "lvl_legibilidade": "Fácil",
+    "cont_palavras": 40,
+    "cont_caracteres": 240,
+    "cont_frases": 3,
+}
+
+
+#Retorna o tempo total e quantas requisições falharam (por exemplo, "database is locked")
+async def executar(caminho: str, pragmas: bool, em_grupo: bool, requisicoes: int, concorrencia: int) -> Tuple[float, int]:
+    #Mesma divisão da API: engine assíncrona para as requisições e síncrona para o gravador
+    engine = create_async_engine(f"sqlite+aiosqlite:///{caminho}")
+    engine_sync = create_engine(f"sqlite:///{caminho}", connect_args={"check_same_thread": False})
+    if pragmas:
+        for motor in (engine.sync_engine, engine_sync):
+            event.listen(motor, "connect", configurar_sqlite)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    gravador = GravadorEmGrupo(sessionmaker(bind=engine_sync, expire_on_commit=False), habilitado=em_grupo)
+    gravador.iniciar()
+
+    #Cada requisição grava uma análise, como em criar_analise
+    erros = 0
+
+    async def requisicao(indice: int) -> None:
+        nonlocal erros
+        async with session_factory() as session:
+            try:
+                await gravador.gravar(session, [nova_analise(1, f"Texto de teste número {indice}. " * 8, RESULTADO)])
+            except OperationalError:
+                erros += 1
+
+    semaforo = asyncio.Semaphore(concorrencia)
+
+    async def limitada(indice: int) -> None:
+        async with semaforo:
+            await requisicao(indice)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(limitada(indice) for indice in range(requisicoes)))
+    decorrido = time.perf_counter() - inicio
+    await gravador.encerrar()
+
+    async with session_factory() as session:
+        total = await session.scalar(select(func.count()).select_from(Analysis))
+    await engine.dispose()
+    engine_sync.dispose()
+    assert total + erros == requisicoes, (total, erros)
+    return decorrido, erros
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requisicoes", type=int, default=2000)
+    parser.add_argument("--concorrencia", type=int, default=64)
+    args = parser.parse_args()
+
+    for nome, pragmas, em_grupo in (("padrão", False, False), ("wal", True, False), ("wal + grupo", True, True)):
+        with tempfile.TemporaryDirectory() as diretorio:
+            caminho = os.path.join(diretorio, "bench.db")
+            Base.metadata.create_all(create_engine(f"sqlite:///{caminho}"))
+            decorrido, erros = asyncio.run(executar(caminho, pragmas, em_grupo, args.requisicoes, args.concorrencia))
+        gravadas = args.requisicoes - erros
+        print(f"  {nome:<12} {decorrido * 1000:9.1f} ms  ({gravadas / decorrido:8.0f} análises/s, {erros} falhas)")
+
+
+if __name__ == "__main__":
+    main()
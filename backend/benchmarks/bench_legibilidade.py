@@ -0,0 +1,86 @@
+#Mede o custo da etapa de legibilidade (contagem de sílabas) em textos longos
+#Compara a contagem anterior (sem memorização) com os modos "regras" e "pyphen" do NLPService
+#Uso (a partir de backend/): python -m benchmarks.bench_legibilidade --caracteres 20000
+import argparse
+import time
+
+from app.services.nlp_service import NLPService, contar_silabas_regras, contar_silabas_pyphen
+from benchmarks.corpus import gerar_texto_longo
+
+
+#Contagem de sílabas anterior à versão por tabela (mantida aqui apenas como referência)
+def cont_silabas_anterior(palavra: str) -> int:
+    palavra = ''.join(c for c in palavra if c.isalpha()).lower()
+    if not palavra:
+        return 0
+
+    vogais = 'aeiouáéíóúâêîôûàèìòùãõ'
+    ditongos = ['ai', 'au', 'ei', 'eu', 'oi', 'ou', 'ui',
+               'ãe', 'ão', 'õe', 'ae', 'ao', 'ia', 'ie',
+               'io', 'iu', 'ua', 'ue', 'uo', 'uã', 'uõ']
+    tritongos = ['uai', 'uei', 'uão', 'uãe', 'uõe']
+
+    palavra_simplificada = palavra
+    for vogal_acentuada in 'áéíóúâêîôûàèìòùãõ':
+        if vogal_acentuada in palavra_simplificada:
+            palavra_simplificada = palavra_simplificada.replace(vogal_acentuada, vogal_acentuada[0])
+
+    silabas = 0
+    i = 0
+    while i < len(palavra_simplificada):
+        if i <= len(palavra_simplificada) - 3 and palavra_simplificada[i:i+3] in tritongos:
+            silabas += 1
+            i += 3
+            continue
+        if i <= len(palavra_simplificada) - 2 and palavra_simplificada[i:i+2] in ditongos:
+            silabas += 1
+            i += 2
+            continue
+        if palavra_simplificada[i] in vogais:
+            silabas += 1
+        i += 1
+
+    if silabas == 0 and any(c in vogais for c in palavra_simplificada):
+        silabas = 1
+    return max(silabas, 1)
+
+
+def medir(funcao, palavras, repeticoes):
+    melhor = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        total = sum(map(funcao, palavras))
+        decorrido = time.perf_counter() - inicio
+        melhor = decorrido if melhor is None else min(melhor, decorrido)
+    return total, melhor
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--caracteres", type=int, default=20000)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    nlp_service = NLPService()
+    texto = gerar_texto_longo(args.caracteres)
+    doc = nlp_service.nlp(texto)
+    palavras = [token.text for token in doc if token.is_alpha]
+    print(f"texto: {len(texto)} caracteres, {len(palavras)} palavras ({len(set(palavras))} distintas)")
+
+    referencia, tempo = medir(cont_silabas_anterior, palavras, args.repeticoes)
+    print(f"  {'anterior':<16} {tempo * 1000:8.2f} ms  {referencia} sílabas")
+
+    for nome, contador in (("regras", contar_silabas_regras), ("pyphen", contar_silabas_pyphen)):
+        #Primeira passada com o cache vazio, depois com as palavras já memorizadas
+        contador.cache_clear()
+        total, frio = medir(contador, palavras, 1)
+        _, quente = medir(contador, palavras, args.repeticoes)
+        print(f"  {nome + ' (frio)':<16} {frio * 1000:8.2f} ms  {total} sílabas")
+        print(f"  {nome + ' (quente)':<16} {quente * 1000:8.2f} ms")
+
+    divergentes = sum(1 for p in set(palavras) if contar_silabas_regras(p) != cont_silabas_anterior(p))
+    print(f"  palavras com contagem diferente da anterior (regras): {divergentes}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+#Compara a análise texto a texto com a análise em lote (nlp.pipe)
+#Uso (a partir de backend/): python -m benchmarks.bench_lote --textos 500 --batch-size 64
+import argparse
+import time
+
+from app.services.nlp_service import NLPService
+from benchmarks.corpus import gerar_corpus
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--textos", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--n-process", type=int, default=1)
+    args = parser.parse_args()
+
+    corpus = gerar_corpus(args.textos)
+    nlp_service = NLPService()
+    nlp_service.aquecer()
+
+    inicio = time.perf_counter()
+    for texto in corpus:
+        nlp_service.analisar_texto(texto)
+    tempo_individual = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    nlp_service.analisar_lote(corpus, batch_size=args.batch_size, n_process=args.n_process)
+    tempo_lote = time.perf_counter() - inicio
+
+    print(f"textos: {len(corpus)}")
+    print(f"individual: {tempo_individual:.2f}s ({len(corpus) / tempo_individual:.1f} docs/s)")
+    print(f"lote:       {tempo_lote:.2f}s ({len(corpus) / tempo_lote:.1f} docs/s)")
+    print(f"ganho:      {tempo_individual / tempo_lote:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
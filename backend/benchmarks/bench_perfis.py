@@ -0,0 +1,52 @@
+#Compara os perfis de pipeline do NLPService no mesmo corpus
+#Mede o tempo de análise e a concordância de cada perfil com o perfil "completo"
+#Uso (a partir de backend/): python -m benchmarks.bench_perfis --textos 500
+import argparse
+import time
+
+from app.services.nlp_service import NLPService, PERFIS_PIPELINE
+from benchmarks.corpus import gerar_corpus
+
+CAMPOS = ["cont_frases", "lvl_legibilidade", "entidades", "sentimento", "palavra_mais_frequente"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--textos", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    corpus = gerar_corpus(args.textos, min_frases=3, max_frases=12)
+    caracteres = sum(len(texto) for texto in corpus)
+    referencia = None
+
+    print(f"corpus: {len(corpus)} textos, {caracteres} caracteres")
+    for perfil in PERFIS_PIPELINE:
+        inicio = time.perf_counter()
+        nlp_service = NLPService(perfil=perfil)
+        tempo_carregamento = time.perf_counter() - inicio
+        nlp_service.aquecer()
+
+        #Melhor tempo entre as repetições (sem cache)
+        melhor = None
+        for _ in range(args.repeticoes):
+            inicio = time.perf_counter()
+            itens = nlp_service.analisar_lote(corpus, batch_size=args.batch_size)
+            decorrido = time.perf_counter() - inicio
+            melhor = decorrido if melhor is None else min(melhor, decorrido)
+
+        resultados = [item["resultado"] for item in itens]
+        if referencia is None:
+            referencia = resultados
+
+        print(f"\n[{perfil}] componentes: {', '.join(nlp_service.nlp.pipe_names)}")
+        print(f"  carregamento: {tempo_carregamento:.2f}s")
+        print(f"  análise:      {melhor:.2f}s ({len(corpus) / melhor:.1f} docs/s, {caracteres / melhor / 1000:.0f}k caracteres/s)")
+        for campo in CAMPOS:
+            iguais = sum(1 for a, b in zip(resultados, referencia) if a[campo] == b[campo])
+            print(f"  {campo:<24} {100 * iguais / len(corpus):6.2f}% igual ao perfil completo")
+
+
+if __name__ == "__main__":
+    main()
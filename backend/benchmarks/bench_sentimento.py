@@ -0,0 +1,79 @@
+#Compara o motor de sentimento compilado com a pontuação token a token usada antes dele
+#Mede apenas a pontuação (os docs do spaCy são gerados antes) e conta as divergências de rótulo
+#Uso (a partir de backend/): python -m benchmarks.bench_sentimento --textos 1000
+import argparse
+import time
+
+from app.services.nlp_service import NLPService
+from benchmarks.corpus import gerar_corpus
+
+
+#Pontuação anterior ao motor compilado (mantida aqui apenas como referência)
+def pontuar_token_anterior(servico: NLPService, tokens, i) -> float:
+    pontuacao = 0.0
+    token_lower = tokens[i].lower()
+    is_negacao = token_lower in servico.negacoes
+    intensificador = servico.intensificadores.get(token_lower, 1.0)
+
+    if token_lower in servico.lexico_positivo:
+        pontuacao += -1.0 * intensificador if is_negacao else 1.0 * intensificador
+        if i > 0 and tokens[i-1] in ["muito", "bastante"]:
+            pontuacao += 0.5
+    elif token_lower in servico.lexico_negativo:
+        pontuacao += 1.0 * intensificador if is_negacao else -1.0 * intensificador
+        if i > 0 and tokens[i-1] in ["muito", "bastante"]:
+            pontuacao -= 0.5
+
+    if i + 1 < len(tokens):
+        bigrama = f"{token_lower} {tokens[i+1]}"
+        if any(expr in bigrama for expr in ["muito bom", "muito boa", "muito útil"]):
+            pontuacao += 2.0
+        elif any(expr in bigrama for expr in ["muito ruim", "muito lento", "não funciona"]):
+            pontuacao -= 2.0
+    return pontuacao
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--textos", type=int, default=1000)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    nlp_service = NLPService()
+    corpus = gerar_corpus(args.textos, min_frases=3, max_frases=12)
+    docs = list(nlp_service.nlp.pipe(corpus, batch_size=64))
+    anteriores = [[token.text.lower() for token in doc if token.is_alpha] for doc in docs]
+    compilados = [nlp_service.tokens_sentimento(doc) for doc in docs]
+    total_tokens = sum(len(tokens) for tokens in compilados)
+
+    def anterior():
+        return [
+            nlp_service.classificar_sentimento(
+                sum(pontuar_token_anterior(nlp_service, tokens, i) for i in range(len(tokens))), len(tokens)
+            )
+            for tokens in anteriores
+        ]
+
+    def compilado():
+        return [
+            nlp_service.classificar_sentimento(*nlp_service.motor_sentimento.analisar(tokens))
+            for tokens in compilados
+        ]
+
+    print(f"corpus: {len(corpus)} textos, {total_tokens} tokens")
+    rotulos = {}
+    for nome, funcao in (("anterior", anterior), ("compilado", compilado)):
+        melhor = None
+        for _ in range(args.repeticoes):
+            inicio = time.perf_counter()
+            rotulos[nome] = funcao()
+            decorrido = time.perf_counter() - inicio
+            melhor = decorrido if melhor is None else min(melhor, decorrido)
+        print(f"  {nome:<10} {melhor * 1000:8.1f} ms  ({melhor / total_tokens * 1e9:7.0f} ns/token)")
+
+    divergentes = sum(1 for a, b in zip(rotulos["anterior"], rotulos["compilado"]) if a != b)
+    print(f"  rótulos diferentes: {divergentes} de {len(corpus)} (expressões e negações agora são consideradas)")
+
+
+if __name__ == "__main__":
+    main()
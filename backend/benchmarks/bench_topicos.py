@@ -0,0 +1,34 @@
+#Compara a classificação de tópicos texto a texto (predict) com a classificação em lote (predict_many)
+#Uso (a partir de backend/): python -m benchmarks.bench_topicos --textos 5000
+import argparse
+import time
+
+from app.services.ml_service import TopicClassifier
+from benchmarks.corpus import gerar_corpus
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--textos", type=int, default=5000)
+    parser.add_argument("--k", type=int, default=2)
+    args = parser.parse_args()
+
+    classificador = TopicClassifier()
+    corpus = gerar_corpus(args.textos)
+    print(f"corpus: {len(corpus)} textos")
+
+    inicio = time.perf_counter()
+    individuais = [classificador.predict(texto, k=args.k) for texto in corpus]
+    tempo_individual = time.perf_counter() - inicio
+    print(f"  predict      {tempo_individual * 1000:9.1f} ms  ({len(corpus) / tempo_individual:8.0f} textos/s)")
+
+    inicio = time.perf_counter()
+    lote = classificador.predict_many(corpus, k=args.k)
+    tempo_lote = time.perf_counter() - inicio
+    print(f"  predict_many {tempo_lote * 1000:9.1f} ms  ({len(corpus) / tempo_lote:8.0f} textos/s)")
+
+    print(f"  resultados iguais: {sum(1 for a, b in zip(individuais, lote) if a == b)} de {len(corpus)}")
+
+
+if __name__ == "__main__":
+    main()
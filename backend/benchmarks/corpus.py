@@ -0,0 +1,36 @@
+#Corpus sintético de avaliações em português usado pelos benchmarks
+import random
+
+FRASES = [
+    "O aplicativo funciona muito bem e a instalação foi simples.",
+    "Achei o sistema lento e a interface é confusa.",
+    "João Silva recomendou o serviço da Petrobras para a equipe no Brasil.",
+    "Não recomendo, o programa travou várias vezes durante o uso.",
+    "O atendimento foi rápido e resolveu o problema em poucos minutos.",
+    "A nova versão melhorou a estabilidade, mas ainda tem alguns erros.",
+    "Produto excelente, nota 10, superou todas as expectativas.",
+    "O relatório mensal apresenta os resultados da empresa em São Paulo.",
+    "Depois da atualização o sistema não funciona mais no meu computador.",
+    "É uma ferramenta prática, intuitiva e bastante eficiente para o dia a dia.",
+]
+
+
+#Gera `quantidade` textos com entre `min_frases` e `max_frases` frases cada
+def gerar_corpus(quantidade: int = 200, min_frases: int = 2, max_frases: int = 6, semente: int = 42) -> list:
+    aleatorio = random.Random(semente)
+    return [
+        " ".join(aleatorio.choices(FRASES, k=aleatorio.randint(min_frases, max_frases)))
+        for _ in range(quantidade)
+    ]
+
+
+#Gera um texto longo com aproximadamente `caracteres` caracteres
+def gerar_texto_longo(caracteres: int = 20000, semente: int = 42) -> str:
+    aleatorio = random.Random(semente)
+    partes = []
+    total = 0
+    while total < caracteres:
+        frase = aleatorio.choice(FRASES)
+        partes.append(frase)
+        total += len(frase) + 1
+    return " ".join(partes)[:caracteres].rsplit(" ", 1)[0]
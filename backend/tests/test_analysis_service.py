@@ -0,0 +1,59 @@
+#Testes das funções compartilhadas das análises
+import datetime
+
+import pytest # type: ignore
+from sqlalchemy import create_engine, event, select # type: ignore
+from sqlalchemy.orm import sessionmaker # type: ignore
+from sqlalchemy.pool import StaticPool # type: ignore
+
+from app.models.analysis import Analysis, Base, ItemJobAnalise, JobAnalise, Usuario
+from app.services.analysis_service import desvincular_itens_jobs_flush, utc_sem_fuso
+from app.services.textos_service import armazenar_textos_flush
+
+
+def ativar_chaves_estrangeiras(conexao_dbapi, registro_conexao) -> None:
+    conexao_dbapi.execute("PRAGMA foreign_keys=ON")
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    event.listen(engine, "connect", ativar_chaves_estrangeiras)
+    Base.metadata.create_all(engine)
+    fabrica = sessionmaker(bind=engine)
+    #Os mesmos listeners registrados em app.models.db
+    event.listen(fabrica, "before_flush", armazenar_textos_flush)
+    event.listen(fabrica, "before_flush", desvincular_itens_jobs_flush)
+    yield fabrica
+    engine.dispose()
+
+
+def test_remover_analise_criada_por_job(session_factory):
+    with session_factory() as session:
+        usuario = Usuario(nome="a", email="a@a.com", senha="x")
+        session.add(usuario)
+        session.flush()
+        analise = Analysis(
+            usuario_id=usuario.id, texto_original="Texto analisado pelo job.", sentimento="Neutro", palavra_mais_frequente="texto",
+            entidades=[], lvl_legibilidade="Fácil", cont_palavras=4, cont_caracteres=25, cont_frases=1,
+        )
+        job = JobAnalise(usuario_id=usuario.id, total=1, status="concluido")
+        session.add_all([analise, job])
+        session.flush()
+        session.add(ItemJobAnalise(job_id=job.id, indice=0, texto="Texto analisado pelo job.", status="concluido", analysis_id=analise.id))
+        session.commit()
+
+        session.delete(analise)
+        session.commit()
+
+        assert session.scalar(select(Analysis)) is None
+        item = session.scalar(select(ItemJobAnalise))
+        assert (item.status, item.analysis_id) == ("concluido", None)
+
+
+def test_datas_com_fuso_viram_utc_sem_fuso():
+    brasilia = datetime.timezone(datetime.timedelta(hours=-3))
+    assert utc_sem_fuso(datetime.datetime(2026, 1, 1, 21, 30, tzinfo=brasilia)) == datetime.datetime(2026, 1, 2, 0, 30)
+    assert utc_sem_fuso(datetime.datetime(2026, 1, 1, 12, 0, tzinfo=datetime.timezone.utc)) == datetime.datetime(2026, 1, 1, 12, 0)
+    assert utc_sem_fuso(datetime.datetime(2026, 1, 1, 12, 0)) == datetime.datetime(2026, 1, 1, 12, 0)
+    assert utc_sem_fuso(None) is None
@@ -0,0 +1,110 @@
+#Testes do índice de busca por usuário (SQLite/FTS5)
+import asyncio
+
+import pytest # type: ignore
+from sqlalchemy import create_engine, event, text # type: ignore
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine # type: ignore
+from sqlalchemy.orm import sessionmaker # type: ignore
+
+from app.models.analysis import Analysis, Base, Usuario
+from app.services.busca_service import buscar, faixa_usuario, indexar_busca_flush, remover_da_busca_flush, remover_do_indice
+from app.services.textos_service import armazenar_textos_flush
+
+
+def nova(usuario_id: int, texto: str) -> Analysis:
+    return Analysis(
+        usuario_id=usuario_id, texto_original=texto, sentimento="Neutro", palavra_mais_frequente="texto", entidades=[],
+        lvl_legibilidade="Fácil", cont_palavras=len(texto.split()), cont_caracteres=len(texto), cont_frases=1,
+    )
+
+
+@pytest.fixture
+def banco(tmp_path):
+    url = f"sqlite:///{tmp_path / 'busca.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    fabrica = sessionmaker(bind=engine)
+    #Os mesmos listeners registrados em app.models.db
+    event.listen(fabrica, "before_flush", armazenar_textos_flush)
+    event.listen(fabrica, "before_flush", remover_da_busca_flush)
+    event.listen(fabrica, "after_flush", indexar_busca_flush)
+    with fabrica() as session:
+        session.add_all([Usuario(nome="a", email="a@a.com", senha="x"), Usuario(nome="b", email="b@b.com", senha="x")])
+        session.commit()
+    yield fabrica, url.replace("sqlite://", "sqlite+aiosqlite://")
+    engine.dispose()
+
+
+def procurar(url: str, usuario_id: int, consulta: str, **opcoes) -> list:
+    async def executar():
+        engine = create_async_engine(url)
+        try:
+            async with AsyncSession(engine) as session:
+                return await buscar(session, usuario_id, consulta, **opcoes)
+        finally:
+            await engine.dispose()
+    return asyncio.run(executar())
+
+
+def registros(session, usuario_id: int) -> int:
+    inicio, fim = faixa_usuario(usuario_id)
+    return session.execute(
+        text("SELECT count(*) FROM textos_busca WHERE rowid BETWEEN :inicio AND :fim"), {"inicio": inicio, "fim": fim}
+    ).scalar()
+
+
+def test_busca_so_encontra_textos_do_usuario(banco):
+    fabrica, url = banco
+    with fabrica() as session:
+        compartilhado = "A entrega chegou atrasada em São Paulo."
+        session.add_all([nova(1, compartilhado), nova(1, compartilhado), nova(1, "Outra entrega sem problemas."), nova(2, compartilhado)])
+        session.commit()
+        #Um registro por texto distinto de cada usuário
+        assert (registros(session, 1), registros(session, 2)) == (2, 1)
+
+    assert sorted(item["id"] for item in procurar(url, 1, "entrega")) == [1, 2, 3]
+    assert [item["id"] for item in procurar(url, 2, "sao paulo")] == [4]
+    assert procurar(url, 2, "problemas") == []
+    [resultado] = procurar(url, 1, "entrega -atrasada")
+    assert resultado["id"] == 3 and "<mark>entrega</mark>" in resultado["trecho"]
+
+
+def test_remover_analise_tira_o_texto_do_indice_do_usuario(banco):
+    fabrica, url = banco
+    with fabrica() as session:
+        texto = "Reclamação sobre a fatura do cartão."
+        session.add_all([nova(1, texto), nova(1, texto), nova(2, texto)])
+        session.commit()
+
+        session.delete(session.get(Analysis, 1))
+        session.commit()
+        #Ainda há outra análise do usuário 1 com o texto
+        assert [item["id"] for item in procurar(url, 1, "fatura")] == [2]
+
+        session.delete(session.get(Analysis, 2))
+        session.commit()
+        assert registros(session, 1) == 0
+        assert procurar(url, 1, "fatura") == []
+        assert [item["id"] for item in procurar(url, 2, "fatura")] == [3]
+
+
+def test_remocao_em_massa(banco):
+    fabrica, url = banco
+    with fabrica() as session:
+        session.add_all([nova(1, f"Pedido número {numero} cancelado.") for numero in range(5)])
+        session.commit()
+        hashes = session.scalars(text("SELECT texto_hash FROM analyses")).all()
+        session.execute(text("DELETE FROM analyses"))
+        remover_do_indice(session.connection(), 1, hashes)
+        session.commit()
+        assert registros(session, 1) == 0
+
+
+def test_relevancia_limitada_aos_candidatos_mais_recentes(banco):
+    fabrica, url = banco
+    with fabrica() as session:
+        session.add_all([nova(1, f"Produto {numero} com defeito.") for numero in range(10)])
+        session.commit()
+
+    assert len(procurar(url, 1, "defeito")) == 10
+    assert sorted(item["id"] for item in procurar(url, 1, "defeito", candidatos=3)) == [8, 9, 10]
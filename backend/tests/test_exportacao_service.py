@@ -0,0 +1,47 @@
+#Testes da exportação do histórico
+import asyncio
+
+import pytest # type: ignore
+from sqlalchemy import create_engine, literal_column, select, text # type: ignore
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine # type: ignore
+
+from app.models.analysis import Base
+from app.services.exportacao_service import consulta_exportacao, exportar
+
+
+@pytest.fixture
+def url(tmp_path):
+    url = f"sqlite:///{tmp_path / 'exportacao.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    engine.dispose()
+    return url.replace("sqlite://", "sqlite+aiosqlite://")
+
+
+def executar(url: str, consulta, formato: str) -> list:
+    async def coletar():
+        engine = create_async_engine(url)
+        try:
+            session, blocos = await exportar(async_sessionmaker(engine), consulta, formato)
+            return [bloco async for bloco in blocos]
+        finally:
+            await engine.dispose()
+    return asyncio.run(coletar())
+
+
+def test_csv_vazio_tem_so_o_cabecalho(url):
+    [bloco] = executar(url, consulta_exportacao(1), "csv")
+    assert bloco.startswith("id,texto_original,")
+    assert executar(url, consulta_exportacao(1), "ndjson") == []
+
+
+def test_erro_na_consulta_acontece_antes_dos_blocos(url):
+    #O erro sai de exportar (ainda na rota), antes de qualquer bloco da resposta
+    async def abrir():
+        engine = create_async_engine(url)
+        try:
+            await exportar(async_sessionmaker(engine), select(literal_column("nao_existe")).select_from(text("analyses")), "ndjson")
+        finally:
+            await engine.dispose()
+    with pytest.raises(Exception, match="nao_existe"):
+        asyncio.run(abrir())
@@ -0,0 +1,108 @@
+#Testes da leitura de arquivos importados como jobs de análise
+import datetime
+import gzip
+import io
+
+import pytest # type: ignore
+from sqlalchemy import create_engine, func, select # type: ignore
+from sqlalchemy.orm import sessionmaker # type: ignore
+from sqlalchemy.pool import StaticPool # type: ignore
+
+from app.core.config import NLP_LIMITE_FLUXO
+from app.models.analysis import Base, ItemJobAnalise, JobAnalise, Usuario
+from app.services.importacao_service import LIMITE_CAMPO_CSV, importar_arquivo, ler_textos, remover_importacoes_abandonadas
+
+
+def ler(conteudo: str, formato: str = "csv", compactar: bool = False) -> list:
+    dados = conteudo.encode("utf-8")
+    return list(ler_textos(io.BytesIO(gzip.compress(dados) if compactar else dados), formato))
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    fabrica = sessionmaker(bind=engine)
+    with fabrica() as session:
+        session.add(Usuario(nome="a", email="a@a.com", senha="x"))
+        session.commit()
+    yield fabrica
+    engine.dispose()
+
+
+def test_campo_maior_que_o_limite_padrao_do_csv():
+    texto = "a" * 140000
+    assert ler(f"texto\n{texto}\nok\n") == [(texto, None), ("ok", None)]
+
+
+def test_texto_maior_que_nlp_limite_fluxo_vira_item_com_falha():
+    (texto, erro), seguinte = ler(f"texto\n{'a' * (NLP_LIMITE_FLUXO + 1)}\nok\n")
+    assert texto is None and "limite" in erro
+    assert seguinte == ("ok", None)
+
+
+def test_texto_maior_que_nlp_limite_fluxo_em_ndjson():
+    [(texto, erro)] = ler('{"texto": "' + "a" * (NLP_LIMITE_FLUXO + 1) + '"}\n', "ndjson", compactar=True)
+    assert texto is None and "limite" in erro
+
+
+def test_campo_acima_do_limite_do_csv_recusa_o_arquivo():
+    with pytest.raises(ValueError, match="CSV malformado na linha 2"):
+        ler(f"texto\n{'a' * (LIMITE_CAMPO_CSV + 1)}\n")
+
+
+def test_csv_malformado_recusa_o_arquivo():
+    with pytest.raises(ValueError, match="CSV malformado na linha 3"):
+        ler('texto\nok\n"aspas"sem separador\n')
+
+
+def test_importacao_de_csv_malformado_nao_deixa_job(session_factory):
+    arquivo = io.BytesIO('texto\nok\n"aspas"sem separador\n'.encode("utf-8"))
+    with pytest.raises(ValueError):
+        importar_arquivo(session_factory, 1, arquivo, "csv")
+    with session_factory() as session:
+        assert session.scalar(select(func.count()).select_from(JobAnalise)) == 0
+        assert session.scalar(select(func.count()).select_from(ItemJobAnalise)) == 0
+
+
+def test_importacao_com_campo_grande(session_factory):
+    arquivo = io.BytesIO(("texto\n" + "a" * 140000 + "\n\"\"\n").encode("utf-8"))
+    job_id = importar_arquivo(session_factory, 1, arquivo, "csv")
+    with session_factory() as session:
+        job = session.get(JobAnalise, job_id)
+        assert (job.status, job.total, job.falhas) == ("pendente", 2, 1)
+        itens = session.scalars(select(ItemJobAnalise).order_by(ItemJobAnalise.indice)).all()
+        assert [(len(item.texto), item.status) for item in itens] == [(140000, "pendente"), (0, "falhou")]
+
+
+def test_importacao_abandonada_e_removida_com_os_itens(session_factory):
+    agora = datetime.datetime.utcnow()
+    with session_factory() as session:
+        abandonada = JobAnalise(usuario_id=1, status="importando", total=0, heartbeat_em=agora - datetime.timedelta(hours=1))
+        em_andamento = JobAnalise(usuario_id=1, status="importando", total=0, heartbeat_em=agora)
+        pendente = JobAnalise(usuario_id=1, status="pendente", total=1, heartbeat_em=agora - datetime.timedelta(hours=1))
+        session.add_all([abandonada, em_andamento, pendente])
+        session.flush()
+        session.add_all([ItemJobAnalise(job_id=job.id, indice=0, texto="ok", status="pendente") for job in (abandonada, em_andamento, pendente)])
+        session.commit()
+
+        assert remover_importacoes_abandonadas(session, agora - datetime.timedelta(minutes=5)) == 1
+        session.commit()
+        assert session.scalars(select(JobAnalise.id).order_by(JobAnalise.id)).all() == [em_andamento.id, pendente.id]
+        assert session.scalars(select(ItemJobAnalise.job_id).order_by(ItemJobAnalise.job_id)).all() == [em_andamento.id, pendente.id]
+
+
+def test_importacao_descartada_durante_a_leitura_falha(session_factory):
+    #Outro processo remove o job como abandonado enquanto o arquivo ainda é lido
+    class Arquivo(io.BytesIO):
+        def read(self, *args):
+            with session_factory() as session:
+                remover_importacoes_abandonadas(session, datetime.datetime.utcnow() + datetime.timedelta(hours=1))
+                session.commit()
+            return super().read(*args)
+
+    with pytest.raises(TimeoutError):
+        importar_arquivo(session_factory, 1, Arquivo(b"texto\num\ndois\n"), "csv")
+    with session_factory() as session:
+        assert session.scalar(select(func.count()).select_from(JobAnalise)) == 0
+        assert session.scalar(select(func.count()).select_from(ItemJobAnalise)) == 0